@@ -1,47 +1,341 @@
+import datetime
+import hashlib
+
+from django.conf import settings
 from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import PAGE_VAR
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Case, CharField, F, Value, When
+from django.utils.functional import cached_property
 from django.utils.html import format_html
-from .models import Medicine, Supplier, Customer, Purchase, Sale, ContactSubmission
+
+from . import archive
+from .models import (
+    Medicine, Supplier, Customer, Purchase, Batch, Invoice, Sale, SaleAllocation, StockMovement, ExpirySnapshot,
+    ReorderForecast, PurchaseOrder, PurchaseOrderLine, Stocktake, ArchivedPeriod, ContactSubmission,
+)
+
+
+# ─── High-volume changelists ──────────────────────────────────────────────────
+# Above this many rows an unfiltered changelist on PostgreSQL shows the
+# planner's row estimate instead of running COUNT(*)
+ESTIMATE_ABOVE = 100_000
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Changelist paginator that does not count big tables on every page:
+    unfiltered on PostgreSQL it reads ``pg_class.reltuples``; otherwise the
+    exact count is cached for ADMIN_COUNT_CACHE_TIMEOUT seconds per query.
+    """
+
+    @cached_property
+    def count(self):
+        queryset   = self.object_list
+        connection = connections[queryset.db]
+        if not queryset.query.where and connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            if row and row[0] > ESTIMATE_ABOVE:
+                return row[0]
+        sql, params = queryset.query.sql_with_params()
+        key   = 'pharmacy:admin-count:' + hashlib.sha1(repr((sql, params)).encode()).hexdigest()
+        count = cache.get(key)
+        if count is None:
+            count = queryset.count()
+            cache.set(key, count, settings.ADMIN_COUNT_CACHE_TIMEOUT)
+        return count
+
+
+class AutocompleteFilter(admin.FieldListFilter):
+    """
+    Foreign key filter picked with the admin's autocomplete widget, so the
+    sidebar loads the selected row only instead of every customer or
+    supplier. The related model's admin needs ``search_fields``.
+    """
+    template = 'admin/pharmacy/autocomplete_filter.html'
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.lookup_kwarg = f'{field_path}__{field.target_field.name}__exact'
+        self.model_admin  = model_admin
+        if params.get(self.lookup_kwarg) in ([''], ''):
+            # The widget was cleared
+            params.pop(self.lookup_kwarg)
+        super().__init__(field, request, params, model, model_admin, field_path)
+        values = self.used_parameters.get(self.lookup_kwarg)
+        self.lookup_val = values[-1] if isinstance(values, list) else values
+
+    def expected_parameters(self):
+        return [self.lookup_kwarg]
+
+    def choices(self, changelist):
+        widget = AutocompleteSelect(
+            self.field, self.model_admin.admin_site, attrs={'onchange': 'this.form.submit()', 'style': 'width: 100%'},
+        )
+        form_field = self.field.formfield(widget=widget, required=False)
+        yield {
+            'selected':     self.lookup_val is None,
+            'query_string': changelist.get_query_string(remove=[self.lookup_kwarg]),
+            'display':      'All',
+            'widget':       form_field.widget.render(self.lookup_kwarg, self.lookup_val),
+            'hidden':       [(k, v) for k, v in changelist.params.items() if k not in (self.lookup_kwarg, PAGE_VAR)],
+        }
+
+
+def month_filter(field_name):
+    """
+    Bounded date drill-down on ``field_name``: the current month and the
+    ADMIN_RECENT_MONTHS before it, then "Older" – listed without the
+    DISTINCT date scan ``date_hierarchy`` runs over the whole table.
+    """
+
+    class MonthFilter(admin.SimpleListFilter):
+        title          = 'month'
+        parameter_name = 'month'
+
+        def lookups(self, request, model_admin):
+            months = [archive.cutoff(n) for n in range(settings.ADMIN_RECENT_MONTHS + 1)]
+            return [(f'{m:%Y-%m}', f'{m:%B %Y}') for m in months] + [('older', 'Older')]
+
+        def queryset(self, request, queryset):
+            value = self.value()
+            if not value:
+                return queryset
+            if value == 'older':
+                return queryset.filter(**{f'{field_name}__lt': archive.cutoff(settings.ADMIN_RECENT_MONTHS)})
+            try:
+                month = datetime.datetime.strptime(value, '%Y-%m').date()
+            except ValueError as exc:
+                raise IncorrectLookupParameters(exc)
+            return queryset.filter(**{f'{field_name}__gte': month, f'{field_name}__lt': archive.next_month(month)})
+
+    return MonthFilter
+
+
+class HighVolumeAdmin(admin.ModelAdmin):
+    """Changelist defaults for tables with millions of rows."""
+    paginator              = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets            = admin.ShowFacets.NEVER
+
+    @property
+    def media(self):
+        # select2 for AutocompleteFilter
+        return super().media + AutocompleteSelect(None, self.admin_site).media
+
+
+# ─── Model admins ─────────────────────────────────────────────────────────────
 
 
 @admin.register(Supplier)
 class SupplierAdmin(admin.ModelAdmin):
-    list_display  = ('name', 'phone', 'email', 'created')
+    list_display  = ('name', 'phone', 'email', 'medicine_count', 'created')
     search_fields = ('name', 'email', 'phone')
 
 
 @admin.register(Medicine)
-class MedicineAdmin(admin.ModelAdmin):
-    list_display  = ('name', 'category', 'stock', 'price', 'expiry_date', 'supplier', 'stock_badge')
-    list_filter   = ('category', 'supplier')
+class MedicineAdmin(HighVolumeAdmin):
+    list_display  = ('name', 'category', 'stock', 'reorder_point', 'price', 'expiry_date', 'supplier', 'stock_badge')
+    list_filter   = ('category', ('supplier', AutocompleteFilter))
+    list_select_related = ('supplier',)
     search_fields = ('name',)
     date_hierarchy = 'expiry_date'
 
+    def get_queryset(self, request):
+        # Stock status computed by the list query rather than per row
+        return super().get_queryset(request).annotate(stock_level=Case(
+            When(stock=0, then=Value('out')),
+            When(stock__lte=F('reorder_point'), then=Value('low')),
+            default=Value('ok'), output_field=CharField(),
+        ))
+
     def stock_badge(self, obj):
-        color = {'ok': 'green', 'low': 'orange', 'out': 'red'}[obj.stock_status]
+        color = {'ok': 'green', 'low': 'orange', 'out': 'red'}[obj.stock_level]
         return format_html('<span style="color:{}">{}</span>', color, obj.stock)
     stock_badge.short_description = 'Stock Status'
+    stock_badge.admin_order_field = 'stock'
+
+    def get_deleted_objects(self, objs, request):
+        # Ledger rows cannot be deleted on their own, but go with their medicine
+        to_delete, model_count, perms_needed, protected = super().get_deleted_objects(objs, request)
+        perms_needed.discard(StockMovement._meta.verbose_name)
+        return to_delete, model_count, perms_needed, protected
+
+    def delete_queryset(self, request, queryset):
+        # Per-object delete so supplier / customer counters are updated
+        for obj in queryset:
+            obj.delete()
 
 
 @admin.register(Customer)
 class CustomerAdmin(admin.ModelAdmin):
-    list_display  = ('name', 'phone', 'email', 'created')
+    list_display  = ('name', 'phone', 'email', 'sale_count', 'total_spent', 'last_purchase', 'created')
     search_fields = ('name', 'email', 'phone')
 
 
 @admin.register(Purchase)
-class PurchaseAdmin(admin.ModelAdmin):
+class PurchaseAdmin(HighVolumeAdmin):
     list_display  = ('pk', 'medicine', 'supplier', 'quantity', 'total_price', 'purchase_date')
-    list_filter   = ('purchase_date', 'supplier')
+    list_filter   = ('purchase_date', month_filter('purchase_date'), ('supplier', AutocompleteFilter))
+    list_select_related = ('medicine', 'supplier')
     search_fields = ('medicine__name',)
-    date_hierarchy = 'purchase_date'
+    autocomplete_fields = ('medicine', 'supplier')
+    raw_id_fields = ('order',)
+
+    def delete_queryset(self, request, queryset):
+        # Per-object delete so each row's stock is reversed through the ledger
+        for obj in queryset:
+            obj.delete()
+
+
+@admin.register(Batch)
+class BatchAdmin(admin.ModelAdmin):
+    list_display  = ('medicine', 'lot_number', 'expiry_date', 'quantity', 'remaining', 'purchase')
+    search_fields = ('medicine__name', 'lot_number')
+    list_select_related = ('medicine', 'purchase')
+    raw_id_fields = ('medicine', 'purchase')
+    date_hierarchy = 'expiry_date'
+    # Units move through purchases, sales and stock edits only
+    readonly_fields = ('quantity', 'remaining')
+
+    def has_add_permission(self, request):
+        return False
+
+
+class SaleAllocationInline(admin.TabularInline):
+    model  = SaleAllocation
+    fields = ('batch', 'quantity')
+    readonly_fields = fields
+    extra  = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(Sale)
-class SaleAdmin(admin.ModelAdmin):
+class SaleAdmin(HighVolumeAdmin):
     list_display  = ('pk', 'medicine', 'customer', 'quantity', 'total_price', 'sale_date')
-    list_filter   = ('sale_date', 'customer')
-    search_fields = ('medicine__name', 'customer__name')
-    date_hierarchy = 'sale_date'
+    list_filter   = ('sale_date', month_filter('sale_date'), ('customer', AutocompleteFilter))
+    list_select_related = ('medicine', 'customer')
+    search_fields = ('medicine__name', 'customer__name', 'client_key')
+    readonly_fields = ('client_key',)
+    autocomplete_fields = ('medicine', 'customer')
+    raw_id_fields = ('invoice',)
+    inlines = [SaleAllocationInline]
+
+    def delete_queryset(self, request, queryset):
+        # Per-object delete so each row's stock is reversed through the ledger
+        for obj in queryset:
+            obj.delete()
+
+
+class InvoiceLineInline(admin.TabularInline):
+    model  = Sale
+    fields = ('medicine', 'quantity', 'total_price')
+    readonly_fields = fields
+    extra  = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Invoice)
+class InvoiceAdmin(admin.ModelAdmin):
+    list_display  = ('pk', 'customer', 'total_price', 'invoice_date')
+    search_fields = ('customer__name',)
+    list_select_related = ('customer',)
+    raw_id_fields = ('customer',)
+    inlines = [InvoiceLineInline]
+
+
+@admin.register(StockMovement)
+class StockMovementAdmin(HighVolumeAdmin):
+    list_display  = ('created', 'medicine', 'quantity', 'reason', 'reference')
+    list_filter   = ('reason',)
+    search_fields = ('medicine__name', 'reference')
+    list_select_related = ('medicine',)
+    readonly_fields = ('medicine', 'quantity', 'reason', 'reference', 'created')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ExpirySnapshot)
+class ExpirySnapshotAdmin(admin.ModelAdmin):
+    list_display  = ('as_of', 'days', 'medicines', 'units', 'created')
+    date_hierarchy = 'as_of'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Stocktake)
+class StocktakeAdmin(admin.ModelAdmin):
+    # Counts are recorded and applied through the app (see stocktake.py)
+    list_display  = ('pk', 'name', 'category', 'status', 'created', 'applied', 'adjusted')
+    list_filter   = ('status', 'category')
+    search_fields = ('name',)
+    readonly_fields = ('status', 'applied', 'adjusted')
+
+
+@admin.register(ArchivedPeriod)
+class ArchivedPeriodAdmin(admin.ModelAdmin):
+    list_display  = ('month', 'kind', 'rows', 'quantity', 'total', 'location', 'created')
+    list_filter   = ('kind',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ReorderForecast)
+class ReorderForecastAdmin(admin.ModelAdmin):
+    list_display  = ('medicine', 'daily_demand', 'demand_std', 'lead_time_days', 'safety_stock', 'order_up_to', 'computed')
+    search_fields = ('medicine__name',)
+    list_select_related = ('medicine',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+class PurchaseOrderLineInline(admin.TabularInline):
+    model  = PurchaseOrderLine
+    fields = ('medicine', 'quantity', 'unit_cost')
+    raw_id_fields = ('medicine',)
+    extra  = 0
+
+
+@admin.register(PurchaseOrder)
+class PurchaseOrderAdmin(admin.ModelAdmin):
+    list_display  = ('pk', 'supplier', 'status', 'ordered_on', 'received_on', 'created')
+    list_filter   = ('status', 'supplier')
+    list_select_related = ('supplier',)
+    # Status moves through the reorder page so receiving records purchases
+    readonly_fields = ('status', 'ordered_on', 'received_on')
+    inlines = [PurchaseOrderLineInline]
 
 
 @admin.register(ContactSubmission)
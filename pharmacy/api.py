@@ -0,0 +1,206 @@
+"""
+PharmaFlow JSON API
+-------------------
+Read-only JSON lists of medicines, suppliers, customers, purchases and
+sales for POS terminals and reporting scripts, and of the sales and
+purchases of closed months (``sales-archive``, ``purchases-archive``, read
+from the archive tables; see archive.py). Archived rows never change, so
+those page on ``created`` and give related rows as ids only.
+
+    ?fields=a,b,…   only these fields (default: all of the resource's)
+    ?since=<iso>    only rows changed (``updated``) at or after this time
+    ?cursor=…       next page; pages run oldest change first, so a client
+                    syncs by following ``next`` and keeping the last row's
+                    change time as its next ``since``
+
+``/api/<kind>/deleted/`` lists the rows that have left a resource since
+– deleted, or archived – from the Tombstone rows written by signals.py and
+archive.py, with the same ``?since=`` / ``?cursor=`` paging on ``deleted``.
+
+Every response carries an ETag and Last-Modified built from two small
+aggregates – the resource's latest change time, row count and highest id,
+and its latest tombstone – so a poll with If-None-Match / If-Modified-Since
+is answered 304 before the list query runs, and deletions move both.
+"""
+import hashlib
+from datetime import datetime
+
+from django.db import connection
+from django.db.models import Count, DateTimeField, Max, Value
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Customer, Medicine, Purchase, PurchaseArchive, Sale, SaleArchive, Supplier, Tombstone
+from .pagination import KeysetPaginator
+
+
+class Resource:
+    def __init__(self, queryset, changed, fields):
+        self.queryset = queryset
+        self.changed  = changed     # timestamp column for ?since= and the validators
+        self.fields   = fields      # {name: lookup path}
+
+    @property
+    def tombstones(self):
+        return Tombstone.objects.filter(model_name=self.queryset.model._meta.model_name)
+
+    def validators(self):
+        """``(latest change or removal, row count, highest id)`` in two aggregate queries."""
+        row = self.queryset.order_by().aggregate(latest=Max(self.changed), count=Count('pk'), last=Max('pk'))
+        removed = self.tombstones.aggregate(latest=Max('deleted'))['latest']
+        return max(filter(None, (row['latest'], removed)), default=None), row['count'], row['last']
+
+    def removal_validators(self):
+        """``(latest removal, tombstone count, highest tombstone id)`` for the deleted feed."""
+        row = self.tombstones.aggregate(latest=Max('deleted'), count=Count('pk'), last=Max('pk'))
+        return row['latest'], row['count'], row['last']
+
+
+RESOURCES = {
+    'medicines': Resource(
+        Medicine.objects.all(), 'updated', {
+            'id': 'id', 'name': 'name', 'category': 'category', 'price': 'price', 'stock': 'stock',
+            'reorder_point': 'reorder_point', 'expiry_date': 'expiry_date',
+            'supplier_id': 'supplier_id', 'supplier': 'supplier__name', 'updated': 'updated',
+        },
+    ),
+    'suppliers': Resource(
+        Supplier.objects.all(), 'updated', {
+            'id': 'id', 'name': 'name', 'phone': 'phone', 'email': 'email', 'address': 'address',
+            'medicine_count': 'medicine_count', 'created': 'created', 'updated': 'updated',
+        },
+    ),
+    'customers': Resource(
+        Customer.objects.all(), 'updated', {
+            'id': 'id', 'name': 'name', 'phone': 'phone', 'email': 'email', 'address': 'address',
+            'sale_count': 'sale_count', 'total_spent': 'total_spent', 'last_purchase': 'last_purchase',
+            'created': 'created', 'updated': 'updated',
+        },
+    ),
+    'purchases': Resource(
+        Purchase.objects.all(), 'updated', {
+            'id': 'id', 'date': 'purchase_date', 'medicine_id': 'medicine_id', 'medicine': 'medicine__name',
+            'supplier_id': 'supplier_id', 'supplier': 'supplier__name', 'quantity': 'quantity',
+            'total_price': 'total_price', 'lot_number': 'lot_number', 'expiry_date': 'expiry_date',
+            'order_id': 'order_id', 'notes': 'notes', 'created': 'created', 'updated': 'updated',
+        },
+    ),
+    'sales': Resource(
+        Sale.objects.all(), 'updated', {
+            'id': 'id', 'date': 'sale_date', 'medicine_id': 'medicine_id', 'medicine': 'medicine__name',
+            'customer_id': 'customer_id', 'customer': 'customer__name', 'quantity': 'quantity',
+            'total_price': 'total_price', 'invoice_id': 'invoice_id', 'notes': 'notes', 'created': 'created',
+            'updated': 'updated',
+        },
+    ),
+    'purchases-archive': Resource(
+        PurchaseArchive.objects.all(), 'created', {
+            'id': 'id', 'date': 'purchase_date', 'medicine_id': 'medicine_id', 'supplier_id': 'supplier_id',
+            'quantity': 'quantity', 'total_price': 'total_price', 'lot_number': 'lot_number',
+            'expiry_date': 'expiry_date', 'order_id': 'order_id', 'notes': 'notes', 'created': 'created',
+        },
+    ),
+    'sales-archive': Resource(
+        SaleArchive.objects.all(), 'created', {
+            'id': 'id', 'date': 'sale_date', 'medicine_id': 'medicine_id', 'customer_id': 'customer_id',
+            'quantity': 'quantity', 'total_price': 'total_price', 'invoice_id': 'invoice_id', 'notes': 'notes',
+            'created': 'created',
+        },
+    ),
+}
+
+
+class InvalidQuery(ValueError):
+    """A malformed ``fields`` or ``since`` parameter."""
+
+
+def select_fields(resource, param):
+    if not param:
+        return list(resource.fields)
+    names = [name.strip() for name in param.split(',') if name.strip()]
+    unknown = [name for name in names if name not in resource.fields]
+    if unknown:
+        raise InvalidQuery(f"Unknown field(s): {', '.join(unknown)}.")
+    return names
+
+
+def parse_since(value):
+    if not value:
+        return None
+    since = parse_datetime(value)
+    if since is None:
+        day = parse_date(value)
+        if day is None:
+            raise InvalidQuery('since must be an ISO 8601 date or datetime.')
+        since = datetime.combine(day, datetime.min.time())
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    return since
+
+
+# ─── Conditional GET ──────────────────────────────────────────────────────────
+def etag(kind, validators, query_string):
+    """Strong ETag for one resource state and one set of query parameters."""
+    raw = f'{kind}|{validators}|{query_string}'
+    return '"' + hashlib.sha1(raw.encode()).hexdigest() + '"'
+
+
+# ─── Rows ─────────────────────────────────────────────────────────────────────
+def _value(obj, lookup):
+    for attr in lookup.split('__'):
+        if obj is None:
+            return None
+        obj = getattr(obj, attr)
+    return obj
+
+
+def page(kind, names, since=None, cursor=None, per_page=None):
+    """
+    KeysetPage of ``kind`` in change order, with ``rows`` serialised to
+    ``names``. Only the selected columns are loaded, joining the related
+    tables they need.
+    """
+    resource = RESOURCES[kind]
+    lookups  = [resource.fields[name] for name in names]
+    related  = {lookup.split('__')[0] for lookup in lookups if '__' in lookup}
+    queryset = resource.queryset.select_related(*related).only(*{*lookups, resource.changed})
+    if since is not None:
+        queryset = queryset.filter(**{f'{resource.changed}__gte': since})
+    paginator = KeysetPaginator(queryset, per_page=per_page, ordering=[resource.changed])
+    result = paginator.page(cursor)
+    result.rows = [
+        dict(zip(names, (_value(obj, lookup) for lookup in lookups)))
+        for obj in result.object_list
+    ]
+    return result
+
+
+def removals(kind, since=None, cursor=None, per_page=None):
+    """KeysetPage of ``kind``'s tombstones in removal order, with ``rows`` serialised."""
+    queryset = RESOURCES[kind].tombstones
+    if since is not None:
+        queryset = queryset.filter(deleted__gte=since)
+    paginator = KeysetPaginator(queryset, per_page=per_page, ordering=['deleted'])
+    result = paginator.page(cursor)
+    result.rows = [
+        {'id': tombstone.object_id, 'deleted': tombstone.deleted, 'archived': tombstone.archived}
+        for tombstone in result.object_list
+    ]
+    return result
+
+
+# ─── Tombstones ───────────────────────────────────────────────────────────────
+def bury(rows, archived=False):
+    """
+    Record a tombstone for every row of the ``rows`` queryset with one
+    INSERT … SELECT, for bulk removals that bypass ``post_delete``.
+    """
+    qn = connection.ops.quote_name
+    select_sql, params = rows.order_by().annotate(
+        tombstone_model=Value(rows.model._meta.model_name),
+        tombstone_archived=Value(archived),
+        tombstone_deleted=Value(timezone.now(), output_field=DateTimeField()),
+    ).values('pk', 'tombstone_model', 'tombstone_archived', 'tombstone_deleted').query.sql_with_params()
+    columns = ', '.join(qn(column) for column in ('object_id', 'model_name', 'archived', 'deleted'))
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {qn(Tombstone._meta.db_table)} ({columns}) {select_sql}", params)
@@ -0,0 +1,218 @@
+"""
+PharmaFlow Archive
+------------------
+Moves closed months of Sale and Purchase out of the hot tables, so the
+lists, exports, admin date drill-downs and write paths only ever touch the
+open months, however many years of history build up.
+
+``archive_month`` moves one month in one transaction:
+  * the rows go to SaleArchive / PurchaseArchive with one INSERT … SELECT –
+    on PostgreSQL into that month's partition, created on demand – or to a
+    gzip-compressed CSV file,
+  * a sale month's per-customer totals go to ArchivedCustomerTotal, so the
+    customer counters keep counting them (see counters.py),
+  * links from batches are dropped (SaleAllocation rows, Batch.purchase),
+  * the hot rows go with one plain DELETE – not through ``Sale.delete()``,
+    which would put their stock back – after a Tombstone each, so API
+    clients syncing with ``?since=`` drop them (see api.py).
+
+DailyRollup rows are left alone: reports and the dashboard keep the totals
+of archived months, and ``rollups.rebuild()`` never recomputes a closed
+month. Every month moved is recorded as an ArchivedPeriod; everything up
+to the latest one is closed, and ``check_open`` refuses new sales and
+purchases dated in it – Sale / Purchase ``clean()`` and ``save()``, so the
+forms and the admin, checkout, the POS sync and the purchase import.
+"""
+import csv
+import datetime
+import gzip
+from decimal import Decimal
+from pathlib import Path
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db.models import Count, DateField, Max, Sum
+from django.utils import timezone
+
+from . import api
+from .models import (
+    ArchivedCustomerTotal, ArchivedPeriod, Batch, Purchase, PurchaseArchive, Sale, SaleAllocation, SaleArchive,
+)
+
+
+class Side:
+    def __init__(self, model, archive, date_field):
+        self.model      = model
+        self.archive    = archive
+        self.date_field = date_field
+
+    @property
+    def columns(self):
+        """Archive columns; each has a same-named column in the hot table."""
+        return [field.column for field in self.archive._meta.concrete_fields]
+
+    def month(self, month):
+        return self.model.objects.filter(**{
+            f'{self.date_field}__gte': month, f'{self.date_field}__lt': next_month(month),
+        })
+
+
+# Suffix of an ArchivedPeriod.location that is a file rather than a table
+FILE_SUFFIX = '.csv.gz'
+
+SIDES = {
+    ArchivedPeriod.SALES:     Side(Sale, SaleArchive, 'sale_date'),
+    ArchivedPeriod.PURCHASES: Side(Purchase, PurchaseArchive, 'purchase_date'),
+}
+
+
+# ─── Periods ──────────────────────────────────────────────────────────────────
+def next_month(month):
+    return (month.replace(day=1) + datetime.timedelta(days=32)).replace(day=1)
+
+
+def cutoff(keep_months, today=None):
+    """First day of the oldest month kept hot: the current month and ``keep_months`` before it stay."""
+    month = (today or timezone.now().date()).replace(day=1)
+    for _ in range(keep_months):
+        month = (month - datetime.timedelta(days=1)).replace(day=1)
+    return month
+
+
+def closed_until(kind=None):
+    """First day after the latest archived month (of ``kind``), or None."""
+    periods = ArchivedPeriod.objects.filter(kind=kind) if kind else ArchivedPeriod.objects.all()
+    latest  = periods.aggregate(latest=Max('month'))['latest']
+    return next_month(latest) if latest else None
+
+
+class ClosedMonth(ValidationError):
+    """A sale or purchase dated in an archived (closed) month."""
+
+
+def check_open(kind, day):
+    """Raise ClosedMonth if ``day`` falls in an archived month of ``kind``."""
+    day    = DateField().to_python(day)     # unsaved rows still hold their default, timezone.now()
+    closed = closed_until(kind)
+    if day is not None and closed is not None and day < closed:
+        raise ClosedMonth(f"{day} is in an archived month; only dates from {closed} on can be recorded.")
+
+
+def file_periods(kind, start=None, end=None):
+    """ArchivedPeriods of ``kind`` moved to a file rather than a table, overlapping ``start``–``end``."""
+    periods = ArchivedPeriod.objects.filter(kind=kind, location__endswith=FILE_SUFFIX)
+    if start:
+        periods = periods.filter(month__gte=start.replace(day=1))
+    if end:
+        periods = periods.filter(month__lte=end)
+    return list(periods.order_by('month'))
+
+
+def pending_months(kind, before):
+    """Months before ``before`` that still have rows in the hot table, oldest first."""
+    side  = SIDES[kind]
+    first = side.model.objects.filter(**{f'{side.date_field}__lt': before}).order_by(side.date_field) \
+        .values_list(side.date_field, flat=True).first()
+    month = first and first.replace(day=1)
+    while month and month < before:
+        yield month
+        month = next_month(month)
+
+
+# ─── Moving rows ──────────────────────────────────────────────────────────────
+def archive(kind, before, directory=None):
+    """Archive every month of ``kind`` before ``before``; returns the ArchivedPeriods written."""
+    periods = [archive_month(kind, month, directory) for month in pending_months(kind, before)]
+    return [period for period in periods if period]
+
+
+def archive_month(kind, month, directory=None):
+    """
+    Move one month of ``kind`` to its archive table, or to a ``.csv.gz``
+    file in ``directory``. Returns the ArchivedPeriod, or None for an empty
+    month.
+    """
+    side, path = SIDES[kind], None
+    rows = side.month(month)
+    try:
+        with transaction.atomic():
+            totals = rows.aggregate(rows=Count('pk'), quantity=Sum('quantity'), total=Sum('total_price'))
+            if not totals['rows']:
+                return None
+            if kind == ArchivedPeriod.SALES:
+                _keep_customer_totals(rows, month)
+            if directory:
+                path = location = _write_file(side, rows, kind, month, directory)
+            else:
+                location = _copy_to_table(side, rows, month)
+            if kind == ArchivedPeriod.SALES:
+                SaleAllocation.objects.filter(sale__in=rows).delete()
+            else:
+                Batch.objects.filter(purchase__in=rows).update(purchase=None)
+            api.bury(rows, archived=True)
+            _delete(side, month)
+            return ArchivedPeriod.objects.create(
+                kind=kind, month=month, rows=totals['rows'], quantity=totals['quantity'],
+                total=totals['total'].quantize(Decimal('0.01')), location=location,
+            )
+    except BaseException:
+        if path:
+            Path(path).unlink(missing_ok=True)
+        raise
+
+
+def _keep_customer_totals(rows, month):
+    ArchivedCustomerTotal.objects.bulk_create([
+        ArchivedCustomerTotal(
+            customer_id=row['customer_id'], month=month, sale_count=row['count'],
+            total_spent=row['spent'], last_purchase=row['last'],
+        )
+        for row in rows.filter(customer__isnull=False).order_by().values('customer_id').annotate(
+            count=Count('pk'), spent=Sum('total_price'), last=Max('sale_date'),
+        )
+    ])
+
+
+def _copy_to_table(side, rows, month):
+    """INSERT … SELECT the month into the archive table; returns the table (partition) name."""
+    table = side.archive._meta.db_table
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            partition = f'{table}_{month:%Y_%m}'
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {qn(partition)} PARTITION OF {qn(table)} "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month(month).isoformat()}')"
+            )
+            table = partition
+        select_sql, params = rows.order_by().values(*side.columns).query.sql_with_params()
+        cursor.execute(
+            f"INSERT INTO {qn(side.archive._meta.db_table)} ({', '.join(qn(c) for c in side.columns)}) {select_sql}",
+            params,
+        )
+    return table
+
+
+def _write_file(side, rows, kind, month, directory):
+    """Write the month to ``<directory>/<kind>-YYYY-MM.csv.gz`` (numbered if it exists); returns the path."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    path, n = directory / f'{kind}-{month:%Y-%m}{FILE_SUFFIX}', 1
+    while path.exists():
+        n += 1
+        path = directory / f'{kind}-{month:%Y-%m}.{n}{FILE_SUFFIX}'
+    with gzip.open(path, 'wt', newline='') as out:
+        writer = csv.writer(out)
+        writer.writerow(side.columns)
+        for row in rows.order_by(side.date_field, 'pk').values_list(*side.columns).iterator(chunk_size=2000):
+            writer.writerow(row)
+    return str(path)
+
+
+def _delete(side, month):
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {qn(side.model._meta.db_table)} WHERE {qn(side.date_field)} >= %s AND {qn(side.date_field)} < %s",
+            [month, next_month(month)],
+        )
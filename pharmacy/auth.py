@@ -0,0 +1,43 @@
+"""
+PharmaFlow Cached Auth
+----------------------
+``CachedModelBackend`` is Django's ModelBackend with the per-request user
+lookup served from the cache. Together with the ``cached_db`` session
+engine this takes both the ``django_session`` and the ``auth_user`` query
+out of every signed-in request.
+
+The cached row is dropped whenever the user is saved or deleted (login
+stamps, password changes, deactivation – see signals.py), but only from
+the cache of the process that made the change. With the default
+local-memory cache every other worker keeps checking the session auth
+hash and ``is_active`` against its own copy until it expires, so a
+password change or deactivation takes up to ``USER_CACHE_TIMEOUT``
+seconds to reach them. A shared ``CACHE_BACKEND`` (Redis, memcached,
+files) drops the copy everywhere at once. Permissions are not cached:
+they are loaded only when a view asks.
+"""
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+KEY_PREFIX = 'pharmacy:user:'
+
+
+def timeout():
+    return getattr(settings, 'USER_CACHE_TIMEOUT', 60)
+
+
+def invalidate_user(pk):
+    cache.delete(f'{KEY_PREFIX}{pk}')
+
+
+class CachedModelBackend(ModelBackend):
+    def get_user(self, user_id):
+        key  = f'{KEY_PREFIX}{user_id}'
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            cache.set(key, user, timeout())
+        return user if self.user_can_authenticate(user) else None
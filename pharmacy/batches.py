@@ -0,0 +1,305 @@
+"""
+PharmaFlow Batches
+------------------
+Lot tracking under ``Medicine.stock``. Every unit in stock sits in a Batch
+with its own expiry date; purchases receive a new batch and sales take
+units first-expiry-first-out (FEFO) from unexpired batches, recording a
+SaleAllocation per batch touched.
+
+Allocation reads the candidate batches through the (medicine, expiry_date)
+partial index without locking, then takes the planned units in one
+``UPDATE ... SET remaining = remaining - CASE id ... END WHERE id IN (...)
+AND remaining >= CASE ...`` – only the touched rows are locked, and a
+concurrent sale that got there first makes the update fall short, in
+which case the plan is recomputed. The stock engine (stock.py) still
+guards ``Medicine.stock``; ``drift()`` lists medicines whose batches no
+longer add up to it.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Batch, Medicine, SaleAllocation
+from .stock import InsufficientStock, PerRow
+
+# Attempts before a FEFO plan that keeps losing races gives up
+ALLOCATION_RETRIES = 5
+
+OPENING_LOT = 'Opening stock'
+
+
+class _Raced(Exception):
+    """A planned batch was drained by a concurrent writer."""
+
+
+def _per_row(values):
+    """CASE id WHEN … THEN value … END for a ``{batch_id: value}`` mapping."""
+    return PerRow(values)
+
+
+def _expiry(medicine_id):
+    return Medicine.objects.filter(pk=medicine_id).values_list('expiry_date', flat=True).get()
+
+
+# ─── Stock in ─────────────────────────────────────────────────────────────────
+def receive(medicine_id, quantity, expiry_date, purchase=None, lot_number=''):
+    """Create a batch of ``quantity`` fresh units."""
+    return Batch.objects.create(
+        medicine_id=medicine_id, purchase=purchase, lot_number=lot_number,
+        expiry_date=expiry_date, quantity=quantity, remaining=quantity,
+    )
+
+
+def restock(medicine_id, quantity, lot_number=OPENING_LOT):
+    """
+    Put units back that cannot be traced to a batch (manual adjustments,
+    sales recorded before lot tracking) into the medicine's house batch,
+    dated with ``Medicine.expiry_date``.
+    """
+    expiry_date = _expiry(medicine_id)
+    house = Batch.objects.filter(
+        medicine_id=medicine_id, purchase=None, lot_number=lot_number, expiry_date=expiry_date,
+    )
+    if not house.update(quantity=F('quantity') + quantity, remaining=F('remaining') + quantity):
+        receive(medicine_id, quantity, expiry_date, lot_number=lot_number)
+
+
+def restock_many(additions, lot_number=OPENING_LOT):
+    """``restock`` for ``{medicine_id: quantity}``, in a fixed number of queries."""
+    additions = {pk: qty for pk, qty in additions.items() if qty > 0}
+    if not additions:
+        return
+    houses = {}
+    for batch_id, medicine_id in Batch.objects.filter(
+        medicine_id__in=additions, purchase=None, lot_number=lot_number, expiry_date=F('medicine__expiry_date'),
+    ).order_by('id').values_list('id', 'medicine_id'):
+        houses.setdefault(medicine_id, batch_id)
+    units = {batch_id: additions[medicine_id] for medicine_id, batch_id in houses.items()}
+    if units:
+        Batch.objects.filter(pk__in=units).update(
+            quantity=F('quantity') + _per_row(units), remaining=F('remaining') + _per_row(units),
+        )
+    new = {pk: qty for pk, qty in additions.items() if pk not in houses}
+    Batch.objects.bulk_create([
+        Batch(medicine_id=pk, lot_number=lot_number, expiry_date=expiry_date, quantity=new[pk], remaining=new[pk])
+        for pk, expiry_date in Medicine.objects.filter(pk__in=new).values_list('pk', 'expiry_date')
+    ])
+
+
+def put_back(allocations):
+    """Return ``{batch_id: quantity}`` to their batches in one UPDATE."""
+    allocations = {pk: qty for pk, qty in allocations.items() if qty}
+    if allocations:
+        Batch.objects.filter(pk__in=allocations).update(remaining=F('remaining') + _per_row(allocations))
+
+
+# ─── Stock out ────────────────────────────────────────────────────────────────
+def take(demand, sellable_only=True):
+    """
+    Take ``{medicine_id: quantity}`` from batches, earliest expiry first, and
+    return ``{medicine_id: [(batch_id, quantity), …]}``. With
+    ``sellable_only`` expired batches are skipped. All-or-nothing: raises
+    InsufficientStock (``available`` = units in usable batches) if any
+    medicine cannot be covered.
+    """
+    demand = {pk: qty for pk, qty in demand.items() if qty > 0}
+    if not demand:
+        return {}
+    for _ in range(ALLOCATION_RETRIES):
+        candidates = Batch.objects.filter(medicine_id__in=demand, remaining__gt=0)
+        if sellable_only:
+            candidates = candidates.filter(expiry_date__gte=timezone.now().date())
+        available = defaultdict(list)
+        for batch_id, medicine_id, remaining in (
+            candidates.order_by('medicine_id', 'expiry_date', 'id').values_list('id', 'medicine_id', 'remaining')
+        ):
+            available[medicine_id].append((batch_id, remaining))
+
+        plan, allocations = {}, defaultdict(list)
+        for medicine_id, needed in sorted(demand.items()):
+            for batch_id, remaining in available[medicine_id]:
+                if not needed:
+                    break
+                units = min(remaining, needed)
+                plan[batch_id] = units
+                allocations[medicine_id].append((batch_id, units))
+                needed -= units
+            if needed:
+                raise InsufficientStock(medicine_id, demand[medicine_id], demand[medicine_id] - needed)
+        try:
+            with transaction.atomic():
+                updated = Batch.objects.filter(pk__in=plan, remaining__gte=_per_row(plan)).update(
+                    remaining=F('remaining') - _per_row(plan),
+                )
+                if updated != len(plan):
+                    raise _Raced
+        except _Raced:
+            continue
+        return dict(allocations)
+    medicine_id, quantity = min(demand.items())
+    raise InsufficientStock(medicine_id, quantity, 0)
+
+
+def allocate_sales(sales):
+    """Take the units for saved Sale rows FEFO and record their allocations."""
+    demand = defaultdict(int)
+    for sale in sales:
+        demand[sale.medicine_id] += sale.quantity
+    taken = {pk: list(rows) for pk, rows in take(demand).items()}
+    allocations = []
+    for sale in sales:
+        needed, rows = sale.quantity, taken[sale.medicine_id]
+        while needed:
+            batch_id, units = rows[0]
+            used = min(units, needed)
+            allocations.append(SaleAllocation(sale_id=sale.pk, batch_id=batch_id, quantity=used))
+            needed -= used
+            if used == units:
+                rows.pop(0)
+            else:
+                rows[0] = (batch_id, units - used)
+    return SaleAllocation.objects.bulk_create(allocations)
+
+
+def release_sale(sale_id, line):
+    """
+    Return a sale's units to the batches they came from; ``line`` is its
+    ``(medicine_id, quantity)`` for sales recorded before lot tracking.
+    """
+    allocations = SaleAllocation.objects.filter(sale_id=sale_id)
+    rows = defaultdict(int)
+    for batch_id, quantity in allocations.values_list('batch_id', 'quantity'):
+        rows[batch_id] += quantity
+    if rows:
+        put_back(rows)
+        allocations.delete()
+    else:
+        restock(*line)
+
+
+# ─── Purchases ────────────────────────────────────────────────────────────────
+def sync_purchase(purchase, before):
+    """Keep a purchase's batch in line with it; ``before`` is the old ``(medicine_id, quantity)``."""
+    expiry_date = purchase.expiry_date or _expiry(purchase.medicine_id)
+    if before == (purchase.medicine_id, purchase.quantity):
+        Batch.objects.filter(purchase=purchase).update(lot_number=purchase.lot_number, expiry_date=expiry_date)
+        return
+    if before:
+        withdraw_purchase(purchase.pk, *before)
+    receive(purchase.medicine_id, purchase.quantity, expiry_date, purchase, purchase.lot_number)
+
+
+def add_purchases(purchases):
+    """Batches for Purchase objects created with bulk_create."""
+    missing  = {p.medicine_id for p in purchases if not p.expiry_date}
+    defaults = dict(Medicine.objects.filter(pk__in=missing).values_list('pk', 'expiry_date')) if missing else {}
+    return Batch.objects.bulk_create([
+        Batch(
+            medicine_id=p.medicine_id, purchase=p, lot_number=p.lot_number,
+            expiry_date=p.expiry_date or defaults[p.medicine_id],
+            quantity=p.quantity, remaining=p.quantity,
+        )
+        for p in purchases
+    ])
+
+
+def withdraw_purchase(purchase_id, medicine_id, quantity):
+    """
+    Take a cancelled purchase's units back out: from its own batch first,
+    the rest (already sold on) from the medicine's other batches FEFO.
+    """
+    own = Batch.objects.filter(purchase_id=purchase_id, medicine_id=medicine_id, remaining__gt=0)
+    for batch_id, remaining in own.values_list('id', 'remaining'):
+        units = min(remaining, quantity)
+        if units and Batch.objects.filter(pk=batch_id, remaining__gte=units).update(remaining=F('remaining') - units):
+            quantity -= units
+    take({medicine_id: quantity}, sellable_only=False)
+
+
+# ─── Adjustments ──────────────────────────────────────────────────────────────
+def adjust(medicine_id, quantity):
+    """A manual stock correction: additions go to the house batch, removals
+    come out of the earliest-expiring batches, expired ones included."""
+    if quantity > 0:
+        restock(medicine_id, quantity)
+    elif quantity < 0:
+        take({medicine_id: -quantity}, sellable_only=False)
+
+
+def adjust_many(deltas):
+    """``adjust`` for ``{medicine_id: quantity}`` (stocktakes), in a fixed number of queries."""
+    restock_many({pk: qty for pk, qty in deltas.items() if qty > 0})
+    take({pk: -qty for pk, qty in deltas.items() if qty < 0}, sellable_only=False)
+
+
+# ─── Queries ──────────────────────────────────────────────────────────────────
+def expired(today=None):
+    """Batches past their expiry that still hold units."""
+    return Batch.objects.filter(remaining__gt=0, expiry_date__lt=today or timezone.now().date())
+
+
+def expired_stock(today=None):
+    """Exists() expression for annotating Medicine rows as ``expired_stock``."""
+    return Exists(expired(today).filter(medicine=OuterRef('pk')))
+
+
+def sellable_stock(today=None):
+    """Correlated subquery: units in the outer medicine's unexpired batches (0 if none)."""
+    return Coalesce(Subquery(
+        Batch.objects.filter(medicine=OuterRef('pk'), remaining__gt=0, expiry_date__gte=today or timezone.now().date())
+        .order_by().values('medicine')
+        .annotate(total=Sum('remaining')).values('total')
+    ), 0)
+
+
+def expiring(days, today=None):
+    """Unexpired batches holding units that expire within ``days``."""
+    today = today or timezone.now().date()
+    return Batch.objects.filter(remaining__gt=0, expiry_date__range=(today, today + timedelta(days=days)))
+
+
+def expiring_stock(days, today=None):
+    """Exists() expression: the outer medicine has stock expiring within ``days``."""
+    return Exists(expiring(days, today).filter(medicine=OuterRef('pk')))
+
+
+# ─── Consistency ──────────────────────────────────────────────────────────────
+def batch_totals():
+    """Correlated subquery: units left in the outer medicine's batches."""
+    return Subquery(
+        Batch.objects.filter(medicine=OuterRef('pk'), remaining__gt=0)
+        .order_by().values('medicine')
+        .annotate(total=Sum('remaining')).values('total')
+    )
+
+
+def drift():
+    """Medicines whose stock disagrees with their batches, annotated ``batch_stock``."""
+    return Medicine.objects.annotate(
+        batch_stock=Coalesce(batch_totals(), 0),
+    ).exclude(stock=F('batch_stock'))
+
+
+def rebuild_batches():
+    """
+    Bring every drifted medicine's batches back to its stock: missing units
+    go into an opening batch dated with ``Medicine.expiry_date``, surplus
+    units come out FEFO. Returns the number of medicines fixed.
+    """
+    rows = list(drift().values_list('pk', 'stock', 'batch_stock', 'expiry_date'))
+    with transaction.atomic():
+        Batch.objects.bulk_create([
+            Batch(
+                medicine_id=pk, lot_number=OPENING_LOT, expiry_date=expiry_date,
+                quantity=units - in_batches, remaining=units - in_batches,
+            )
+            for pk, units, in_batches, expiry_date in rows if units > in_batches
+        ], batch_size=2000)
+        surplus = {pk: in_batches - units for pk, units, in_batches, _ in rows if in_batches > units}
+        if surplus:
+            take(surplus, sellable_only=False)
+    return len(rows)
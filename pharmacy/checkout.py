@@ -0,0 +1,98 @@
+"""
+PharmaFlow Checkout
+-------------------
+Turns a basket of ``(medicine_id, quantity)`` lines into one Invoice with a
+Sale row per line, using a fixed number of queries whatever the basket
+size: one ``SELECT ... WHERE id IN (...)`` to validate, one INSERT for the
+invoice, one ``bulk_create`` for the lines, one UPDATE for all the stock,
+one ``bulk_create`` for the ledger, a fixed few to take the units from
+their batches first-expiry-first-out and for the daily rollups – all in a
+single transaction.
+"""
+from collections import OrderedDict
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import archive, batches, counters, events, rollups, stock
+from .models import ArchivedPeriod, Medicine, Invoice, Sale, StockMovement
+
+
+class CheckoutError(Exception):
+    """Raised with a list of human-readable problems; nothing was saved."""
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        super().__init__('; '.join(self.errors))
+
+
+def merge_lines(lines):
+    """Sum quantities per medicine, keeping first-seen order."""
+    merged = OrderedDict()
+    for medicine_id, quantity in lines:
+        merged[int(medicine_id)] = merged.get(int(medicine_id), 0) + int(quantity)
+    return merged
+
+
+def validate(basket):
+    """Load every basket medicine in one query and check quantities against stock."""
+    errors = []
+    medicines = Medicine.objects.only('id', 'name', 'price', 'stock').in_bulk(list(basket))
+    for medicine_id, quantity in basket.items():
+        med = medicines.get(medicine_id)
+        if med is None:
+            errors.append(f"Medicine #{medicine_id} does not exist.")
+        elif quantity < 1:
+            errors.append(f"Quantity for '{med.name}' must be at least 1.")
+        elif quantity > med.stock:
+            errors.append(f"Insufficient stock. Only {med.stock} units of '{med.name}' available.")
+    if not basket:
+        errors.append('The basket is empty.')
+    if errors:
+        raise CheckoutError(errors)
+    return medicines
+
+
+def checkout(lines, customer=None, invoice_date=None, notes=''):
+    """
+    Record a multi-line sale and return the Invoice. Line totals are unit
+    price × quantity. Raises CheckoutError (and saves nothing) if any line
+    is invalid, its stock has been sold in the meantime or the date is in
+    an archived month.
+    """
+    basket       = merge_lines(lines)
+    medicines    = validate(basket)
+    invoice_date = invoice_date or timezone.now().date()
+    try:
+        archive.check_open(ArchivedPeriod.SALES, invoice_date)
+    except archive.ClosedMonth as exc:
+        raise CheckoutError(exc.messages) from exc
+
+    with transaction.atomic():
+        invoice = Invoice.objects.create(
+            customer=customer, invoice_date=invoice_date, notes=notes,
+            total_price=sum((medicines[pk].price * qty for pk, qty in basket.items()), Decimal('0')),
+        )
+        lines = Sale.objects.bulk_create([
+            Sale(
+                invoice=invoice, medicine_id=pk, customer=customer, quantity=qty,
+                total_price=medicines[pk].price * qty, sale_date=invoice_date, notes=notes,
+            )
+            for pk, qty in basket.items()
+        ])
+        try:
+            stock.apply_movements(
+                {pk: -qty for pk, qty in basket.items()},
+                StockMovement.SALE, f'Invoice #{invoice.pk}',
+            )
+            batches.allocate_sales(lines)
+        except stock.InsufficientStock as exc:
+            name = medicines[exc.medicine_id].name if exc.medicine_id in medicines else 'a medicine'
+            raise CheckoutError([
+                f"Insufficient stock. Only {exc.available} units of '{name}' available."
+            ]) from exc
+        rollups.add_sales(lines)
+        counters.add_sales(lines)
+        events.sales_recorded(lines)
+    return invoice
@@ -0,0 +1,195 @@
+"""
+PharmaFlow Counters
+-------------------
+Denormalised per-row totals the list pages sort and filter on:
+``Supplier.medicine_count`` and ``Customer.sale_count`` / ``total_spent`` /
+``last_purchase``.
+
+Medicine and Sale ``save()`` / ``delete()`` adjust them in the same
+transaction with one ``UPDATE ... SET x = x + delta`` per supplier or
+customer touched (bumping its ``updated`` time for API clients); bulk write
+paths (checkout, imports) call ``add_sales`` / ``refresh_suppliers``, and
+``seed --scale`` adds its generated totals with ``add_totals``. ``drift()`` /
+``rebuild()`` compare and recompute every counter from the source tables in
+one statement per model; sales of archived months are counted from their
+per-customer totals.
+"""
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+
+from django.db.models import Count, DateField, DecimalField, F, IntegerField, Max, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest, NullIf, Round
+from django.utils import timezone
+
+from .models import ArchivedCustomerTotal, Customer, Medicine, Sale, Supplier
+from .rollups import _day
+from .stock import PerRow
+
+# Customers per bulk counter UPDATE
+CHUNK_SIZE = 500
+
+
+# ─── Correlated subqueries ────────────────────────────────────────────────────
+def _per_parent(model, parent, aggregate):
+    return Subquery(
+        model.objects.filter(**{parent: OuterRef('pk')})
+        .order_by().values(parent)
+        .annotate(value=aggregate).values('value')
+    )
+
+
+def medicine_counts():
+    return Coalesce(_per_parent(Medicine, 'supplier', Count('pk')), 0, output_field=IntegerField())
+
+
+# Customer counters cover archived months too (ArchivedCustomerTotal, see archive.py)
+def sale_counts():
+    integer = IntegerField()
+    return (
+        Coalesce(_per_parent(Sale, 'customer', Count('pk')), 0, output_field=integer)
+        + Coalesce(_per_parent(ArchivedCustomerTotal, 'customer', Sum('sale_count')), 0, output_field=integer)
+    )
+
+
+def sale_totals():
+    money, zero = DecimalField(max_digits=14, decimal_places=2), Value(Decimal('0'))
+    return (
+        Coalesce(_per_parent(Sale, 'customer', Sum('total_price')), zero, output_field=money)
+        + Coalesce(_per_parent(ArchivedCustomerTotal, 'customer', Sum('total_spent')), zero, output_field=money)
+    )
+
+
+def last_sales():
+    never = Value(date.min)
+    return NullIf(Greatest(
+        Coalesce(_per_parent(Sale, 'customer', Max('sale_date')), never),
+        Coalesce(_per_parent(ArchivedCustomerTotal, 'customer', Max('last_purchase')), never),
+    ), never)
+
+
+# ─── Suppliers ────────────────────────────────────────────────────────────────
+def move_medicine(before, after):
+    """A medicine's supplier changed from ``before`` to ``after`` (either may be None)."""
+    if before == after:
+        return
+    if before:
+        Supplier.objects.filter(pk=before).update(medicine_count=F('medicine_count') - 1, updated=timezone.now())
+    if after:
+        Supplier.objects.filter(pk=after).update(medicine_count=F('medicine_count') + 1, updated=timezone.now())
+
+
+def refresh_suppliers(supplier_ids):
+    """Recount the given suppliers after a bulk write."""
+    supplier_ids = {pk for pk in supplier_ids if pk}
+    if supplier_ids:
+        Supplier.objects.filter(pk__in=supplier_ids).update(medicine_count=medicine_counts(), updated=timezone.now())
+
+
+# ─── Customers ────────────────────────────────────────────────────────────────
+def sync_sale(before, after):
+    """
+    Adjust customer counters for a sale that changed from ``before`` to
+    ``after`` – each ``(customer_id, total_price, sale_date)`` or None.
+    """
+    before = before and (before[0], Decimal(before[1]), _day(before[2]))
+    after  = after and (after[0], Decimal(after[1]), _day(after[2]))
+    if before == after:
+        return
+    deltas = defaultdict(lambda: [0, Decimal('0'), None, False])   # count, spent, newest date, removed
+    for row, sign in ((before, -1), (after, +1)):
+        if row and row[0]:
+            customer_id, total, day = row
+            delta = deltas[customer_id]
+            delta[0] += sign
+            delta[1] += sign * Decimal(total)
+            if sign > 0:
+                delta[2] = day
+            else:
+                delta[3] = True
+    for customer_id, (count, spent, day, removed) in deltas.items():
+        _apply(customer_id, count, spent, day, removed)
+
+
+def _apply(customer_id, count, spent, day, removed):
+    changes = {}
+    if count:
+        changes['sale_count'] = F('sale_count') + count
+    if spent:
+        changes['total_spent'] = F('total_spent') + spent
+    if removed:
+        # The removed sale may have been the latest one
+        changes['last_purchase'] = last_sales()
+    elif day:
+        changes['last_purchase'] = Greatest(Coalesce('last_purchase', Value(day)), Value(day))
+    if changes:
+        Customer.objects.filter(pk=customer_id).update(**changes, updated=timezone.now())
+
+
+def add_sales(sales):
+    """Record Sale objects created with bulk_create."""
+    totals = defaultdict(lambda: [0, Decimal('0'), None])
+    for sale in sales:
+        if sale.customer_id:
+            row = totals[sale.customer_id]
+            row[0] += 1
+            row[1] += Decimal(sale.total_price)
+            row[2] = max(row[2] or _day(sale.sale_date), _day(sale.sale_date))
+    add_totals(totals)
+
+
+def add_totals(totals):
+    """
+    Add ``{customer_id: [sale_count, total_spent, last_sale_date]}`` to the
+    customer counters: one UPDATE per ``CHUNK_SIZE`` customers, in id order.
+    """
+    customer_ids = sorted(totals)
+    money = DecimalField(max_digits=14, decimal_places=2)
+    for start in range(0, len(customer_ids), CHUNK_SIZE):
+        chunk = {pk: totals[pk] for pk in customer_ids[start:start + CHUNK_SIZE]}
+        day   = PerRow({pk: row[2] for pk, row in chunk.items()}, output_field=DateField())
+        Customer.objects.filter(pk__in=chunk).update(
+            sale_count=F('sale_count') + PerRow({pk: row[0] for pk, row in chunk.items()}),
+            total_spent=F('total_spent') + PerRow({pk: row[1] for pk, row in chunk.items()}, output_field=money),
+            last_purchase=Greatest(Coalesce('last_purchase', day), day),
+            updated=timezone.now(),
+        )
+
+
+def refresh_customers(customer_ids):
+    """Recount the given customers after rows were removed in bulk (e.g. a cascade)."""
+    customer_ids = {pk for pk in customer_ids if pk}
+    if customer_ids:
+        Customer.objects.filter(pk__in=customer_ids).update(
+            sale_count=sale_counts(), total_spent=sale_totals(), last_purchase=last_sales(), updated=timezone.now(),
+        )
+
+
+# ─── Reconciliation ───────────────────────────────────────────────────────────
+def drift():
+    """``(suppliers, customers)`` querysets of rows whose counters disagree with the source tables."""
+    suppliers = Supplier.objects.annotate(actual_medicines=medicine_counts()).exclude(
+        medicine_count=F('actual_medicines'),
+    )
+    never = Value(date.min)   # compare "no sales yet" as a date
+    customers = Customer.objects.annotate(
+        actual_sales=sale_counts(), actual_spent=sale_totals(),
+        # Rounded: SQLite sums decimals as floats
+        stored_cents=Round('total_spent', 2), actual_cents=Round(sale_totals(), 2),
+        stored_last=Coalesce('last_purchase', never), actual_last=Coalesce(last_sales(), never),
+    ).filter(
+        ~Q(sale_count=F('actual_sales')) | ~Q(stored_cents=F('actual_cents')) | ~Q(stored_last=F('actual_last'))
+    )
+    return suppliers, customers
+
+
+def rebuild():
+    """Recompute every drifted counter in one UPDATE per model; returns ``(suppliers, customers)`` fixed."""
+    suppliers, customers = drift()
+    fixed_suppliers = Supplier.objects.filter(pk__in=suppliers.values('pk')).update(
+        medicine_count=medicine_counts(), updated=timezone.now(),
+    )
+    fixed_customers = Customer.objects.filter(pk__in=customers.values('pk')).update(
+        sale_count=sale_counts(), total_spent=sale_totals(), last_purchase=last_sales(), updated=timezone.now(),
+    )
+    return fixed_suppliers, fixed_customers
@@ -0,0 +1,148 @@
+"""
+PharmaFlow Dashboard Stats
+--------------------------
+Counters and totals for the home dashboard, computed with one
+conditional-aggregation pass per table – sale / purchase totals come from
+the DailyRollup summary rows, expired stock from the batches – and kept in
+Django's cache. "Expiring within N days" counts are read from the nightly
+ExpirySnapshot rows instead of the batches.
+Writes to Medicine, Supplier, Customer, Purchase and Sale drop the cached
+entry (see signals.py), so the next dashboard load recomputes it, and
+move the alert panels' fragment version (see fragments.py).
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from . import batches, fragments
+from .models import Medicine, Supplier, Customer, Purchase, Sale, DailyRollup, ExpirySnapshot
+
+CACHE_KEY          = 'pharmacy:dashboard:stats'
+ALERT_LIST_LIMIT   = 25
+RECENT_LIST_LIMIT  = 6
+
+
+def _timeout():
+    return getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 300)
+
+
+def horizons():
+    """Configured expiry windows in days, ascending."""
+    return sorted(set(getattr(settings, 'EXPIRY_HORIZONS', (30, 60, 90))))
+
+
+# ─── Stats ────────────────────────────────────────────────────────────────────
+def compute_stats(today=None):
+    """Run the aggregate queries and return a plain dict of counters."""
+    today = today or timezone.now().date()
+    med = Medicine.objects.aggregate(
+        total=Count('pk'),
+        out_of_stock=Count('pk', filter=Q(stock=0)),
+        low_stock=Count('pk', filter=Q(stock__gte=1, stock__lte=F('reorder_point'))),
+    )
+    # Covered by the partial (expiry_date, medicine, remaining) batch index
+    expired = batches.expired(today).aggregate(
+        medicines=Count('medicine', distinct=True), units=Sum('remaining'),
+    )
+    totals = DailyRollup.objects.aggregate(
+        sales=Sum('sales_count'), revenue=Sum('revenue'),
+        purchases=Sum('purchases_count'), cost=Sum('cost'),
+    )
+    return {
+        'as_of':               today,
+        'total_medicines':     med['total'],
+        'out_of_stock_count':  med['out_of_stock'],
+        'low_stock_count':     med['low_stock'],
+        'expired_count':       expired['medicines'],
+        'expired_units':       expired['units'] or 0,
+        'total_suppliers':     Supplier.objects.count(),
+        'total_customers':     Customer.objects.count(),
+        'total_sales':         totals['sales'] or 0,
+        'revenue_total':       totals['revenue'] or 0,
+        'total_purchases':     totals['purchases'] or 0,
+        'purchase_total':      totals['cost'] or 0,
+        'expiry_horizons':     expiry_horizons(today),
+    }
+
+
+def get_stats():
+    """Return cached dashboard stats, recomputing on a miss or a new day."""
+    today = timezone.now().date()
+    stats = cache.get(CACHE_KEY)
+    if stats is None or stats['as_of'] != today:
+        stats = compute_stats(today)
+        cache.set(CACHE_KEY, stats, _timeout())
+    return stats
+
+
+def invalidate_stats():
+    cache.delete(CACHE_KEY)
+    fragments.invalidate_alerts()
+
+
+# ─── Expiry horizons ──────────────────────────────────────────────────────────
+def count_expiring(today=None):
+    """
+    ``{days: (medicines, units)}`` for every horizon, in one aggregate over
+    the batches expiring between today and the widest horizon – a range scan
+    of the partial (expiry_date, medicine, remaining) index.
+    """
+    today = today or timezone.now().date()
+    windows = horizons()
+    if not windows:
+        return {}
+    aggregates = {}
+    for days in windows:
+        within = Q(expiry_date__lte=today + timedelta(days=days))
+        aggregates[f'medicines_{days}'] = Count('medicine', distinct=True, filter=within)
+        aggregates[f'units_{days}']     = Sum('remaining', filter=within)
+    row = batches.expiring(windows[-1], today).aggregate(**aggregates)
+    return {days: (row[f'medicines_{days}'], row[f'units_{days}'] or 0) for days in windows}
+
+
+def snapshot_expiry(today=None, refresh=False):
+    """Store today's expiry counts (replacing them with ``refresh``); returns the rows."""
+    today = today or timezone.now().date()
+    with transaction.atomic():
+        if refresh:
+            ExpirySnapshot.objects.filter(as_of=today).delete()
+        ExpirySnapshot.objects.bulk_create([
+            ExpirySnapshot(as_of=today, days=days, medicines=medicines, units=units)
+            for days, (medicines, units) in count_expiring(today).items()
+        ], ignore_conflicts=True)
+        # Read back inside the transaction so it comes from the primary
+        return list(ExpirySnapshot.objects.filter(as_of=today, days__in=horizons()))
+
+
+def expiry_horizons(today=None):
+    """[{'days', 'medicines', 'units'}] from today's snapshot, taking it if the nightly run has not."""
+    today = today or timezone.now().date()
+    rows = list(ExpirySnapshot.objects.filter(as_of=today, days__in=horizons()))
+    if len(rows) < len(horizons()):
+        rows = snapshot_expiry(today)
+    return [{'days': r.days, 'medicines': r.medicines, 'units': r.units} for r in rows]
+
+
+# ─── Bounded lists ────────────────────────────────────────────────────────────
+def alert_lists(today=None):
+    """Small, LIMIT-ed lists for the dashboard alert panels (expired ones are batches)."""
+    today = today or timezone.now().date()
+    meds  = Medicine.objects.only('id', 'name', 'stock', 'expiry_date', 'reorder_point')
+    return {
+        'expired':      batches.expired(today).select_related('medicine')
+                        .only('id', 'expiry_date', 'remaining', 'lot_number', 'medicine__id', 'medicine__name')
+                        .order_by('expiry_date', 'id')[:ALERT_LIST_LIMIT],
+        'low_stock':    meds.filter(stock__gte=1, stock__lte=F('reorder_point')).order_by('stock', 'name')[:ALERT_LIST_LIMIT],
+        'out_of_stock': meds.filter(stock=0).order_by('name')[:ALERT_LIST_LIMIT],
+    }
+
+
+def recent_activity():
+    return {
+        'recent_sales':     Sale.objects.select_related('medicine', 'customer').order_by('-created')[:RECENT_LIST_LIMIT],
+        'recent_purchases': Purchase.objects.select_related('medicine', 'supplier').order_by('-created')[:RECENT_LIST_LIMIT],
+    }
@@ -0,0 +1,276 @@
+"""
+PharmaFlow Live Events
+----------------------
+In-process event bus behind the dashboard's live updates: ``stream()`` is
+the Server-Sent Events body of ``/dashboard/events/``.
+
+Committed writes publish compact deltas:
+  * ``sale`` / ``purchase`` – new rows, with their count and amount; the
+    dashboard adds them to its counters and recent-activity lists,
+  * ``stock`` – medicines whose stock status (ok / low / out) changed, with
+    the current out-of-stock and low-stock counts,
+  * ``stats`` – any other write that moves the counters (edits, deletes,
+    catalogue changes): the counters themselves.
+Single saves publish from signals.py, the bulk paths (checkout, POS sync,
+importers) call ``sales_recorded`` / ``purchases_recorded`` next to their
+rollups and counters, and every stock change goes through stock.py.
+
+Publishing only records ids and amounts, under a lock, from the
+``on_commit`` hook – no queries. The names, statuses and counters an event
+carries are looked up once, by the first stream that sends it, and shared
+with every other stream in the process; lookups run on one worker thread,
+so hundreds of open dashboards cost the queries of one, and none at all
+when nobody is watching. Streams also send the cached counters every
+``LIVE_EVENTS_HEARTBEAT`` seconds, which keeps proxies from closing them
+and corrects any drift.
+
+Each process has its own bus and only sees its own writes: serve the app
+as one ASGI service (pharmaflow/asgi.py). A stream resuming from an event
+id this bus no longer holds (a restart, another worker, a long absence)
+starts with a fresh ``stats`` event instead.
+"""
+import asyncio
+import json
+import secrets
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections, transaction
+from django.db.models import Count, F, Q
+
+from .models import Customer, Medicine, Supplier
+
+# Counters sent in ``stats`` events (the dashboard's stat cards and badges)
+COUNTERS = (
+    'total_medicines', 'out_of_stock_count', 'low_stock_count', 'expired_count', 'total_suppliers',
+    'total_customers', 'total_sales', 'revenue_total', 'total_purchases', 'purchase_total',
+)
+# Client reconnect delay, milliseconds
+RETRY_MS = 5000
+
+# Event payloads are looked up here, one at a time, on one DB connection
+_lookups = ThreadPoolExecutor(max_workers=1, thread_name_prefix='pharmacy-events')
+
+
+def _buffer_size():
+    return getattr(settings, 'LIVE_EVENTS_BUFFER', 500)
+
+
+def _heartbeat():
+    return getattr(settings, 'LIVE_EVENTS_HEARTBEAT', 15)
+
+
+def status(stock, reorder_point):
+    """Same rule as ``Medicine.stock_status``."""
+    if stock == 0:
+        return 'out'
+    return 'low' if stock <= reorder_point else 'ok'
+
+
+# ─── Bus ──────────────────────────────────────────────────────────────────────
+class Event:
+    def __init__(self, cursor, kind, data, resolve=None):
+        self.cursor   = cursor
+        self.kind     = kind
+        self.data     = data
+        self._resolve = resolve
+        self._payload = None
+        self._lock    = asyncio.Lock()
+
+    async def payload(self):
+        """The event's JSON body (None to skip it), looked up on first use."""
+        if self._resolve:
+            async with self._lock:
+                if self._resolve:
+                    self._payload = await lookup(self._resolve, self.data)
+                    self._resolve = None
+        elif self._payload is None:
+            self._payload = self.data
+        return self._payload
+
+
+class EventBus:
+    """Ring buffer of the latest events; cursors are ``<boot>-<n>``."""
+
+    def __init__(self, size):
+        self.boot    = secrets.token_hex(4)
+        self.last    = 0
+        self.events  = deque(maxlen=size)
+        self.waiters = set()
+        self.lock    = threading.Lock()
+
+    def cursor(self):
+        return f'{self.boot}-{self.last}'
+
+    def publish(self, kind, data, resolve=None):
+        with self.lock:
+            self.last += 1
+            self.events.append(Event(f'{self.boot}-{self.last}', kind, data, resolve))
+            waiters = list(self.waiters)
+        for loop, flag in waiters:
+            try:
+                loop.call_soon_threadsafe(flag.set)
+            except RuntimeError:
+                # The stream's event loop has closed
+                with self.lock:
+                    self.waiters.discard((loop, flag))
+
+    def since(self, cursor):
+        """Events after ``cursor``, or None if this bus cannot tell (unknown or expired cursor)."""
+        boot, _, n = (cursor or '').partition('-')
+        if boot != self.boot or not n.isdigit():
+            return None
+        n = int(n)
+        with self.lock:
+            first = self.last - len(self.events) + 1
+            if n > self.last or n < first - 1:
+                return None
+            return list(islice(self.events, n - first + 1, None))
+
+    async def wait(self, cursor, timeout):
+        """Wait up to ``timeout`` seconds for an event after ``cursor``; True if there is one."""
+        entry = (asyncio.get_running_loop(), asyncio.Event())
+        with self.lock:
+            self.waiters.add(entry)
+        try:
+            if self.since(cursor) != []:
+                return True
+            await asyncio.wait_for(entry[1].wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self.lock:
+                self.waiters.discard(entry)
+
+
+bus = EventBus(_buffer_size())
+
+
+async def lookup(func, *args):
+    return await sync_to_async(_lookup, thread_sensitive=False, executor=_lookups)(func, *args)
+
+
+def _lookup(func, *args):
+    close_old_connections()
+    try:
+        return func(*args)
+    finally:
+        close_old_connections()
+
+
+# ─── Publishing ───────────────────────────────────────────────────────────────
+def _publish_on_commit(kind, data, resolve=None):
+    transaction.on_commit(lambda: bus.publish(kind, data, resolve))
+
+
+def sales_recorded(sales):
+    _publish_on_commit('sale', [
+        (s.pk, s.medicine_id, s.customer_id, s.quantity, s.total_price, s.sale_date) for s in sales
+    ], _sales_payload)
+
+
+def purchases_recorded(purchases):
+    _publish_on_commit('purchase', [
+        (p.pk, p.medicine_id, p.supplier_id, p.quantity, p.total_price, p.purchase_date) for p in purchases
+    ], _purchases_payload)
+
+
+def stock_moved(deltas):
+    """``{medicine_id: quantity}`` just applied to stock."""
+    _publish_on_commit('stock', dict(deltas), _stock_payload)
+
+
+def stats_changed():
+    _publish_on_commit('stats', None, _stats_payload)
+
+
+# ─── Payloads ─────────────────────────────────────────────────────────────────
+def _rows(rows, party_model, party_key):
+    """Newest rows (as many as the dashboard lists), with medicine and party names."""
+    from . import dashboard
+    newest    = sorted(rows, key=lambda row: row[0], reverse=True)[:dashboard.RECENT_LIST_LIMIT]
+    medicines = dict(Medicine.objects.filter(pk__in={row[1] for row in newest}).values_list('pk', 'name'))
+    parties   = dict(party_model.objects.filter(pk__in={row[2] for row in newest if row[2]}).values_list('pk', 'name'))
+    return {
+        'count': len(rows),
+        'total': sum((row[4] for row in rows), Decimal('0')),
+        'rows': [
+            {'id': pk, 'medicine': medicines.get(medicine_id, ''), party_key: parties.get(party_id, ''),
+             'quantity': quantity, 'total': total, 'date': date}
+            for pk, medicine_id, party_id, quantity, total, date in newest
+        ],
+    }
+
+
+def _sales_payload(rows):
+    return _rows(rows, Customer, 'customer')
+
+
+def _purchases_payload(rows):
+    return _rows(rows, Supplier, 'supplier')
+
+
+def _stock_payload(deltas):
+    changes = []
+    for pk, name, stock, reorder_point in Medicine.objects.filter(pk__in=deltas).values_list(
+        'pk', 'name', 'stock', 'reorder_point',
+    ):
+        now, was = status(stock, reorder_point), status(max(stock - deltas[pk], 0), reorder_point)
+        if now != was:
+            changes.append({'id': pk, 'name': name, 'stock': stock, 'status': now, 'was': was})
+    if not changes:
+        return None
+    counts = Medicine.objects.aggregate(
+        out_of_stock_count=Count('pk', filter=Q(stock=0)),
+        low_stock_count=Count('pk', filter=Q(stock__gte=1, stock__lte=F('reorder_point'))),
+    )
+    return {'changes': changes, **counts}
+
+
+def _stats_payload(_=None):
+    from . import dashboard
+    stats = dashboard.get_stats()
+    return {key: stats[key] for key in COUNTERS}
+
+
+# ─── Stream ───────────────────────────────────────────────────────────────────
+def _message(kind, payload, cursor=None):
+    lines = [f'id: {cursor}'] if cursor else []
+    lines += [f'event: {kind}', f'data: {json.dumps(payload, cls=DjangoJSONEncoder, separators=(",", ":"))}']
+    return '\n'.join(lines) + '\n\n'
+
+
+def _in_order(events):
+    """Deltas in order, then one ``stats`` (the newest) if any: absolute counters go last."""
+    stats = [event for event in events if event.kind == 'stats']
+    return [event for event in events if event.kind != 'stats'] + stats[-1:]
+
+
+async def stream(cursor=None):
+    """SSE body: events after ``cursor``, as they are published, until the client goes away."""
+    yield f'retry: {RETRY_MS}\n\n'
+    while True:
+        events = bus.since(cursor)
+        if events is None:
+            cursor = bus.cursor()
+            yield _message('stats', await lookup(_stats_payload), cursor)
+        elif events:
+            sent = cursor
+            for event in _in_order(events):
+                payload = await event.payload()
+                if payload is not None:
+                    yield _message(event.kind, payload, event.cursor)
+                    sent = event.cursor
+            cursor = events[-1].cursor
+            if sent != cursor:
+                # Move the client's Last-Event-ID past the skipped / merged events
+                yield f'id: {cursor}\n\n'
+        elif not await bus.wait(cursor, _heartbeat()):
+            yield _message('stats', await lookup(_stats_payload))
@@ -0,0 +1,167 @@
+"""
+PharmaFlow Exports
+------------------
+Constant-memory CSV exports of sales, purchases and inventory. Rows are
+pulled with ``values_list(...).iterator(chunk_size=...)`` (a server-side
+cursor on PostgreSQL) and written straight to the response or file, with
+optional streaming gzip compression.
+
+Sales and purchases of closed months are read from their archive tables
+(see archive.py), names looked up by id, ahead of the hot rows. Months
+archived to files are not read: an export that covers one raises
+ArchivedToFile naming the files instead.
+"""
+import csv
+import zlib
+
+from django.db.models import OuterRef, Subquery
+
+from . import archive
+from .models import ArchivedPeriod, Medicine, Purchase, PurchaseArchive, Sale, SaleArchive
+
+CHUNK_SIZE = 2000
+
+
+class Echo:
+    """File-like object whose write() just returns the line csv.writer produced."""
+
+    def write(self, value):
+        return value
+
+
+# ─── Export definitions ───────────────────────────────────────────────────────
+# kind: (queryset, date field for start/end, category lookup, [(header, field)])
+EXPORTS = {
+    'sales': (
+        Sale.objects.order_by('sale_date', 'created', 'id'), 'sale_date', 'medicine__category', [
+            ('id', 'id'), ('date', 'sale_date'), ('medicine', 'medicine__name'),
+            ('category', 'medicine__category'), ('customer', 'customer__name'),
+            ('quantity', 'quantity'), ('total_price', 'total_price'),
+            ('invoice', 'invoice_id'), ('notes', 'notes'),
+        ],
+    ),
+    'purchases': (
+        Purchase.objects.order_by('purchase_date', 'created', 'id'), 'purchase_date', 'medicine__category', [
+            ('id', 'id'), ('date', 'purchase_date'), ('medicine', 'medicine__name'),
+            ('category', 'medicine__category'), ('supplier', 'supplier__name'),
+            ('quantity', 'quantity'), ('total_price', 'total_price'),
+            ('lot_number', 'lot_number'), ('expiry_date', 'expiry_date'), ('notes', 'notes'),
+        ],
+    ),
+    'inventory': (
+        Medicine.objects.order_by('name', 'id'), None, 'category', [
+            ('id', 'id'), ('name', 'name'), ('category', 'category'), ('stock', 'stock'),
+            ('price', 'price'), ('expiry_date', 'expiry_date'), ('supplier', 'supplier__name'),
+            ('updated', 'updated'),
+        ],
+    ),
+}
+
+
+# kind: (ArchivedPeriod kind, archive queryset) for the closed months of an export
+ARCHIVES = {
+    'sales':     (ArchivedPeriod.SALES, SaleArchive.objects.order_by('sale_date', 'created', 'id')),
+    'purchases': (ArchivedPeriod.PURCHASES, PurchaseArchive.objects.order_by('purchase_date', 'created', 'id')),
+}
+
+
+class ArchivedToFile(Exception):
+    """The export covers months archived to files, which only those files hold."""
+
+    def __init__(self, periods):
+        self.periods = list(periods)
+        super().__init__(
+            'Months in this range were archived to files; export a later range or read them from '
+            + ', '.join(f'{period.location} ({period.month:%Y-%m})' for period in self.periods) + '.'
+        )
+
+
+def export_rows(kind, start=None, end=None, category=None):
+    """
+    Header row, then one tuple per record, streamed from the database –
+    archived months first. Raises ArchivedToFile, before anything is read,
+    if the range covers a month archived to a file.
+    """
+    queryset, date_field, category_lookup, columns = EXPORTS[kind]
+    parts = [_archived(kind, start, end, category)] if kind in ARCHIVES else []
+    if date_field and start:
+        queryset = queryset.filter(**{f'{date_field}__gte': start})
+    if date_field and end:
+        queryset = queryset.filter(**{f'{date_field}__lte': end})
+    if category:
+        queryset = queryset.filter(**{category_lookup: category})
+    parts.append((queryset, [field for _, field in columns]))
+    return _stream([header for header, _ in columns], [part for part in parts if part])
+
+
+def _stream(header, parts):
+    yield header
+    for queryset, fields in parts:
+        yield from queryset.values_list(*fields).iterator(chunk_size=CHUNK_SIZE)
+
+
+def _archived(kind, start, end, category):
+    """``(queryset, fields)`` over the archive table for the range, or None if no closed month is in it."""
+    queryset, date_field, category_lookup, columns = EXPORTS[kind]
+    period_kind, archived = ARCHIVES[kind]
+    closed = archive.closed_until(period_kind)
+    if closed is None or (start and start >= closed):
+        return None
+    in_files = archive.file_periods(period_kind, start, end)
+    if in_files:
+        raise ArchivedToFile(in_files)
+    if start:
+        archived = archived.filter(**{f'{date_field}__gte': start})
+    if end:
+        archived = archived.filter(**{f'{date_field}__lte': end})
+    if category:
+        # Related rows are kept as plain ids in the archive
+        fk, related, attr = _related(queryset.model, category_lookup)
+        archived = archived.filter(**{f'{fk}_id__in': related.objects.filter(**{attr: category}).values('pk')})
+    fields = []
+    for _, field in columns:
+        if '__' in field:
+            fk, related, attr = _related(queryset.model, field)
+            name = f'{fk}_{attr}'
+            archived = archived.annotate(**{name: Subquery(
+                related.objects.filter(pk=OuterRef(f'{fk}_id')).values(attr)[:1]
+            )})
+            field = name
+        fields.append(field)
+    return archived, fields
+
+
+def _related(model, lookup):
+    """``(foreign key, related model, attribute)`` for a ``fk__attr`` lookup."""
+    fk, attr = lookup.split('__')
+    return fk, model._meta.get_field(fk).related_model, attr
+
+
+def csv_stream(rows, compress=False, batch=500):
+    """
+    Encode ``rows`` as CSV bytes, yielding roughly every ``batch`` rows.
+    With ``compress`` the bytes form a single gzip stream.
+    """
+    writer     = csv.writer(Echo())
+    compressor = zlib.compressobj(wbits=31) if compress else None   # 31 → gzip container
+    buffer     = []
+    for i, row in enumerate(rows, start=1):
+        buffer.append(writer.writerow(row))
+        if i % batch == 0:
+            data = ''.join(buffer).encode()
+            buffer = []
+            data = compressor.compress(data) if compressor else data
+            if data:
+                yield data
+    data = ''.join(buffer).encode()
+    if compressor:
+        data = compressor.compress(data) + compressor.flush()
+    if data:
+        yield data
+
+
+def filename(kind, start=None, end=None, compress=False):
+    parts = [f'pharmaflow-{kind}']
+    if start or end:
+        parts.append(f"{start or 'start'}_{end or 'today'}")
+    return '-'.join(parts) + ('.csv.gz' if compress else '.csv')
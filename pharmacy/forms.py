@@ -21,7 +21,10 @@ class RegisterForm(UserCreationForm):
         fields = ['username', 'email', 'password1', 'password2']
 from django import forms
 from django.contrib.auth.forms import AuthenticationForm
-from .models import Medicine, Supplier, Customer, Purchase, Sale, ContactSubmission
+from django.core.exceptions import ValidationError
+from django.urls import reverse_lazy
+from django.utils import timezone
+from .models import Medicine, Supplier, Customer, Purchase, Sale, Stocktake, ContactSubmission
 
 # ── Shared widget helpers ─────────────────────────────────────────────────────
 def ctrl(placeholder='', type_='text', extra=''):
@@ -37,6 +40,49 @@ def textarea(rows=3, placeholder=''):
     return forms.Textarea(attrs={'class': 'form-control', 'rows': rows, 'placeholder': placeholder})
 
 
+class AutocompleteSelect(forms.Select):
+    """
+    A <select> that renders only the currently selected option; main.js
+    fills it from the autocomplete endpoint as the user types, so a form
+    render never loads the whole related table.
+    """
+    def __init__(self, kind, attrs=None):
+        super().__init__(attrs={
+            'class': 'form-select',
+            'data-autocomplete': kind,
+            'data-autocomplete-url': reverse_lazy('autocomplete'),
+            **(attrs or {}),
+        })
+
+    def optgroups(self, name, value, attrs=None):
+        field    = self.choices.field
+        selected = self._valid_pks(value)
+        objects  = list(self.choices.queryset.filter(pk__in=selected)) if selected else []
+        options  = [self.create_option(name, '', field.empty_label or '', not objects, 0)]
+        for index, obj in enumerate(objects, start=1):
+            option = self.create_option(name, obj.pk, field.label_from_instance(obj), True, index)
+            if hasattr(obj, 'price'):
+                option['attrs']['data-price'] = obj.price
+            options.append(option)
+        return [(None, options, 0)]
+
+    def _valid_pks(self, value):
+        """Bound values that can be primary keys; the field reports the others."""
+        pk, valid = self.choices.queryset.model._meta.pk, []
+        for v in value:
+            if v in (None, ''):
+                continue
+            try:
+                valid.append(pk.to_python(v))
+            except (ValidationError, ValueError, TypeError):
+                continue
+        return valid
+
+
+def autocomplete(kind):
+    return AutocompleteSelect(kind)
+
+
 # ── Auth ──────────────────────────────────────────────────────────────────────
 class LoginForm(AuthenticationForm):
     username = forms.CharField(widget=forms.TextInput(attrs={
@@ -65,6 +111,14 @@ class SupplierForm(forms.ModelForm):
 
 # ── Medicine ──────────────────────────────────────────────────────────────────
 class MedicineForm(forms.ModelForm):
+    # The stock the user was shown; a stock edit is applied relative to it
+    shown_stock = forms.IntegerField(required=False, min_value=0, widget=forms.HiddenInput)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk:
+            self.fields['shown_stock'].initial = self.instance.stock
+
     class Meta:
         model  = Medicine
         fields = ['name', 'category', 'stock', 'price', 'expiry_date', 'supplier']
@@ -95,13 +149,15 @@ class CustomerForm(forms.ModelForm):
 class PurchaseForm(forms.ModelForm):
     class Meta:
         model  = Purchase
-        fields = ['medicine', 'supplier', 'quantity', 'total_price', 'purchase_date', 'notes']
+        fields = ['medicine', 'supplier', 'quantity', 'total_price', 'purchase_date', 'lot_number', 'expiry_date', 'notes']
         widgets = {
-            'medicine':      select(),
-            'supplier':      select(),
+            'medicine':      autocomplete('medicine'),
+            'supplier':      autocomplete('supplier'),
             'quantity':      forms.NumberInput(attrs={'class': 'form-control', 'min': 1}),
             'total_price':   forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01', 'min': 0}),
             'purchase_date': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
+            'lot_number':    forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Optional'}),
+            'expiry_date':   forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
             'notes':         textarea(2, 'Optional notes…'),
         }
 
@@ -112,8 +168,8 @@ class SaleForm(forms.ModelForm):
         model  = Sale
         fields = ['medicine', 'customer', 'quantity', 'total_price', 'sale_date', 'notes']
         widgets = {
-            'medicine':   select(),
-            'customer':   select(),
+            'medicine':   autocomplete('medicine'),
+            'customer':   autocomplete('customer'),
             'quantity':   forms.NumberInput(attrs={'class': 'form-control', 'min': 1}),
             'total_price':forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01', 'min': 0}),
             'sale_date':  forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
@@ -131,6 +187,59 @@ class SaleForm(forms.ModelForm):
         return cleaned
 
 
+# ── Checkout (multi-line sale) ────────────────────────────────────────────────
+class CheckoutForm(forms.Form):
+    """Invoice header; the basket lines are posted as parallel medicine/quantity lists."""
+    customer     = forms.ModelChoiceField(
+        queryset=Customer.objects.all(), required=False, widget=autocomplete('customer'),
+    )
+    invoice_date = forms.DateField(
+        initial=timezone.now, widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
+    )
+    notes        = forms.CharField(required=False, widget=textarea(2, 'Optional notes…'))
+
+
+# ── Bulk import ───────────────────────────────────────────────────────────────
+class ImportForm(forms.Form):
+    KIND_CHOICES = [
+        ('medicines', 'Medicines (name, category, price, expiry_date, supplier)'),
+        ('purchases', 'Purchases (medicine, supplier, quantity, total_price, purchase_date, notes)'),
+        ('customers', 'Customers (name, phone, email, address)'),
+    ]
+    kind = forms.ChoiceField(choices=KIND_CHOICES, widget=select())
+    file = forms.FileField(widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.xlsx'}))
+
+
+# ── Stocktake ─────────────────────────────────────────────────────────────────
+class StocktakeForm(forms.ModelForm):
+    class Meta:
+        model  = Stocktake
+        fields = ['name', 'category', 'notes']
+        widgets = {
+            'name':     ctrl('e.g. Year-end count'),
+            'category': select(),
+            'notes':    textarea(2, 'Optional notes…'),
+        }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['category'].choices = [('', 'Whole store')] + Medicine.CATEGORY_CHOICES
+
+
+class StocktakeCountForm(forms.Form):
+    counts = forms.CharField(required=False, widget=textarea(6, 'Medicine name or id, counted – one per line'))
+    file   = forms.FileField(
+        required=False,
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.xlsx'}),
+    )
+
+    def clean(self):
+        cleaned = super().clean()
+        if not cleaned.get('counts', '').strip() and not cleaned.get('file'):
+            raise forms.ValidationError('Enter counts or upload a file.')
+        return cleaned
+
+
 # ── Contact ───────────────────────────────────────────────────────────────────
 class ContactForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,63 @@
+"""
+PharmaFlow Template Fragments
+-----------------------------
+Version tokens for the ``{% cache %}`` fragments in the medicine list and
+on the dashboard. A fragment key ends with the token of the data it shows,
+so invalidating is a single ``cache.set`` of a new token – the old
+fragments are never read again and age out of the cache on their own.
+
+    rows    medicine list rows. A row is also keyed by the medicine's pk,
+            ``updated``, stock, reorder point and expired flag, so ordinary
+            edits, sales and purchases re-render it without a bump; the
+            token only moves for what a row shows from other tables
+            (supplier names).
+    alerts  the dashboard alert panels; bumped together with the cached
+            dashboard stats (see dashboard.invalidate_stats).
+
+Tokens are nanosecond timestamps rather than counters: a token evicted
+from the cache is replaced by a fresh one instead of restarting at a value
+old fragments may still be stored under. Only ``get_many`` / ``set`` are
+used, so any cache backend works – local-memory and file-based included.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+ROWS   = 'rows'
+ALERTS = 'alerts'
+
+KEY_PREFIX = 'pharmacy:fragments:'
+
+
+def timeout():
+    return getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 3600)
+
+
+def versions(*names):
+    """``{name: token}``, minting tokens for names the cache has lost."""
+    keys  = {f'{KEY_PREFIX}{name}': name for name in names}
+    found = cache.get_many(keys)
+    for key in keys.keys() - found.keys():
+        found[key] = bump(keys[key])
+    return {keys[key]: token for key, token in found.items()}
+
+
+def bump(name):
+    """Move ``name`` to a new token, orphaning every fragment cached under the old one."""
+    token = time.time_ns()
+    cache.set(f'{KEY_PREFIX}{name}', token, None)
+    return token
+
+
+def context(*names):
+    """Template context: ``{'timeout': …, name: token, …}`` for ``{% cache %}`` tags."""
+    return {'timeout': timeout(), **versions(*names)}
+
+
+def invalidate_rows():
+    bump(ROWS)
+
+
+def invalidate_alerts():
+    bump(ALERTS)
@@ -0,0 +1,273 @@
+"""
+PharmaFlow Bulk Import
+----------------------
+Streaming CSV / XLSX import for medicines, purchases and customers.
+
+Files are read row by row and handled in chunks. Per chunk:
+  * rows are validated with the model fields' own ``clean()`` (no queries),
+  * suppliers / medicines named in the chunk are resolved with one query each,
+  * valid rows are written with ``bulk_create`` (medicines are upserted on
+    their unique name), and purchase stock is added with one aggregated
+    ``stock.apply_movements`` UPDATE.
+Bad rows are reported with their line number and skipped; they never abort
+the rest of the file.
+"""
+import csv
+import io
+from collections import defaultdict
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from . import archive, batches, counters, dashboard, events, rollups, stock
+from .models import ArchivedPeriod, Medicine, Supplier, Customer, Purchase, StockMovement
+
+DEFAULT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 500
+
+
+class ImportResult:
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.skipped = 0
+        self.errors  = []    # (line number, message)
+
+    @property
+    def failed(self):
+        return len(self.errors)
+
+    def error(self, line, message):
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+        self.skipped += 1
+
+
+# ─── Readers ──────────────────────────────────────────────────────────────────
+def _normalise(header):
+    return [str(h or '').strip().lower().replace(' ', '_') for h in header]
+
+
+def read_csv(fileobj):
+    text = fileobj if isinstance(fileobj, io.TextIOBase) else io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    reader = csv.reader(text)
+    header = _normalise(next(reader, []))
+    for line, row in enumerate(reader, start=2):
+        if any(cell.strip() for cell in row):
+            yield line, dict(zip(header, (cell.strip() for cell in row)))
+
+
+def read_xlsx(fileobj):
+    try:
+        from openpyxl import load_workbook
+    except ImportError as exc:
+        raise ValueError('XLSX import needs the openpyxl package (pip install openpyxl).') from exc
+    sheet = load_workbook(fileobj, read_only=True, data_only=True).active
+    rows = sheet.iter_rows(values_only=True)
+    header = _normalise(next(rows, []))
+    for line, row in enumerate(rows, start=2):
+        if any(cell not in (None, '') for cell in row):
+            yield line, {k: ('' if v is None else v) for k, v in zip(header, row)}
+
+
+def read_rows(fileobj, filename):
+    """(line number, {column: value}) pairs from a .csv or .xlsx file."""
+    if filename.lower().endswith('.xlsx'):
+        return read_xlsx(fileobj)
+    if filename.lower().endswith('.csv'):
+        return read_csv(fileobj)
+    raise ValueError('Unsupported file type – upload a .csv or .xlsx file.')
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+# ─── Importers ────────────────────────────────────────────────────────────────
+class BaseImporter:
+    model    = None
+    required = ()
+    optional = ()
+
+    def __init__(self, chunk_size=DEFAULT_CHUNK_SIZE, reference='Import'):
+        self.chunk_size = chunk_size
+        self.reference  = reference
+        self.result     = ImportResult()
+
+    def clean_field(self, name, value):
+        field = self.model._meta.get_field(name)
+        if value in ('', None):
+            if field.has_default():
+                return field.to_python(field.get_default())
+            if field.blank:
+                return '' if field.empty_strings_allowed and not field.null else None
+        return field.clean(value, None)
+
+    def clean_row(self, row):
+        missing = [c for c in self.required if row.get(c) in ('', None)]
+        if missing:
+            raise ValidationError(f"Missing {', '.join(missing)}.")
+        cleaned = {}
+        for name in self.required + self.optional:
+            try:
+                cleaned[name] = self.clean_field(name, row.get(name, ''))
+            except ValidationError as exc:
+                raise ValidationError(f"{name}: {' '.join(exc.messages)}") from exc
+        return cleaned
+
+    def run(self, rows):
+        for chunk in chunked(rows, self.chunk_size):
+            valid = []
+            for line, row in chunk:
+                try:
+                    valid.append((line, self.clean_row(row)))
+                except ValidationError as exc:
+                    self.result.error(line, ' '.join(exc.messages))
+            if valid:
+                with transaction.atomic():
+                    self.import_chunk(valid)
+        self.result.errors.sort()
+        transaction.on_commit(dashboard.invalidate_stats)
+        events.stats_changed()
+        return self.result
+
+    def import_chunk(self, rows):
+        raise NotImplementedError
+
+    @staticmethod
+    def suppliers_by_name(names):
+        names = {n for n in names if n}
+        found = {}
+        for pk, name in Supplier.objects.filter(name__in=names).order_by('pk').values_list('pk', 'name'):
+            found.setdefault(name, pk)
+        return found
+
+
+class MedicineImporter(BaseImporter):
+    """
+    Upserts the catalogue by medicine name. Stock is loaded via purchases.
+    A blank (or missing) category or supplier leaves an existing medicine's
+    value alone; new medicines get the default / no supplier.
+    """
+    model    = Medicine
+    required = ('name', 'price', 'expiry_date')
+    optional = ('category',)
+    update_fields = ['category', 'price', 'expiry_date', 'supplier', 'updated']
+    # Columns an existing medicine keeps when the row leaves them blank
+    keep_if_blank = ('category', 'supplier')
+
+    def clean_row(self, row):
+        cleaned = super().clean_row(row)
+        cleaned['supplier_name'] = str(row.get('supplier', '')).strip()
+        cleaned['keep'] = frozenset(
+            name for name in self.keep_if_blank if str(row.get(name) or '').strip() == ''
+        )
+        return cleaned
+
+    def import_chunk(self, rows):
+        suppliers = self.suppliers_by_name(r['supplier_name'] for _, r in rows)
+        existing  = dict(Medicine.objects.filter(name__in=[r['name'] for _, r in rows]).values_list('name', 'supplier_id'))
+        objs, keep = {}, {}
+        for line, r in rows:
+            supplier_name = r.pop('supplier_name')
+            if supplier_name and supplier_name not in suppliers:
+                self.result.error(line, f"Unknown supplier '{supplier_name}'.")
+                continue
+            keep[r['name']] = r.pop('keep')
+            objs[r['name']] = Medicine(supplier_id=suppliers.get(supplier_name), **r)  # last row wins
+        # One upsert per set of blank columns, each leaving those columns out of the update
+        groups = defaultdict(list)
+        for name, obj in objs.items():
+            groups[keep[name]].append(obj)
+        for kept, group in groups.items():
+            Medicine.objects.bulk_create(
+                group, update_conflicts=True,
+                unique_fields=['name'], update_fields=[f for f in self.update_fields if f not in kept],
+            )
+        counters.refresh_suppliers({*existing.values(), *(m.supplier_id for m in objs.values())})
+        self.result.updated += len(existing.keys() & objs.keys())
+        self.result.created += len(objs.keys() - existing.keys())
+
+
+class PurchaseImporter(BaseImporter):
+    """Delivery-note lines; stock is added per medicine in one UPDATE per chunk."""
+    model    = Purchase
+    required = ('quantity', 'total_price')
+    optional = ('purchase_date', 'lot_number', 'expiry_date', 'notes')
+
+    def clean_row(self, row):
+        cleaned = super().clean_row(row)
+        if cleaned['quantity'] < 1:
+            raise ValidationError('quantity: must be at least 1.')
+        cleaned['medicine_name'] = str(row.get('medicine', '')).strip()
+        cleaned['supplier_name'] = str(row.get('supplier', '')).strip()
+        if not cleaned['medicine_name']:
+            raise ValidationError('Missing medicine.')
+        return cleaned
+
+    def import_chunk(self, rows):
+        suppliers = self.suppliers_by_name(r['supplier_name'] for _, r in rows)
+        medicines = dict(
+            Medicine.objects.filter(name__in={r['medicine_name'] for _, r in rows}).values_list('name', 'pk')
+        )
+        closed = archive.closed_until(ArchivedPeriod.PURCHASES)
+        purchases, deltas = [], defaultdict(int)
+        for line, r in rows:
+            medicine_name, supplier_name = r.pop('medicine_name'), r.pop('supplier_name')
+            if closed and r.get('purchase_date') and r['purchase_date'] < closed:
+                self.result.error(line, f"purchase_date is in an archived month (before {closed}).")
+                continue
+            if medicine_name not in medicines:
+                self.result.error(line, f"Unknown medicine '{medicine_name}'.")
+                continue
+            if supplier_name and supplier_name not in suppliers:
+                self.result.error(line, f"Unknown supplier '{supplier_name}'.")
+                continue
+            purchases.append(Purchase(
+                medicine_id=medicines[medicine_name], supplier_id=suppliers.get(supplier_name), **r
+            ))
+            deltas[medicines[medicine_name]] += r['quantity']
+        Purchase.objects.bulk_create(purchases)
+        stock.apply_movements(deltas, StockMovement.PURCHASE, self.reference)
+        batches.add_purchases(purchases)
+        rollups.add_purchases(purchases)
+        events.purchases_recorded(purchases)
+        self.result.created += len(purchases)
+
+
+class CustomerImporter(BaseImporter):
+    """New customers only; rows matching an existing name + phone are skipped."""
+    model    = Customer
+    required = ('name',)
+    optional = ('phone', 'email', 'address')
+
+    def import_chunk(self, rows):
+        existing = set(
+            Customer.objects.filter(name__in={r['name'] for _, r in rows}).values_list('name', 'phone')
+        )
+        new = []
+        for line, r in rows:
+            key = (r['name'], r['phone'])
+            if key in existing:
+                self.result.error(line, f"Customer '{r['name']}' already exists.")
+                continue
+            existing.add(key)
+            new.append(Customer(**r))
+        Customer.objects.bulk_create(new)
+        self.result.created += len(new)
+
+
+IMPORTERS = {
+    'medicines': MedicineImporter,
+    'purchases': PurchaseImporter,
+    'customers': CustomerImporter,
+}
+
+
+def import_file(kind, fileobj, filename, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Import ``fileobj`` as ``kind`` and return an ImportResult."""
+    importer = IMPORTERS[kind](chunk_size=chunk_size, reference=f'Import {filename}'[:100])
+    return importer.run(read_rows(fileobj, filename))
@@ -0,0 +1,267 @@
+"""
+PharmaFlow Instrumentation
+--------------------------
+Per-request cost accounting, cheap enough to leave on in production.
+
+``InstrumentationMiddleware`` installs a ``connection.execute_wrapper`` for
+the duration of each request and records, per view name: query count, DB
+time, repeated query signatures (the N+1 pattern), template render time,
+total time and response size (queries run while a streaming body is sent
+are not counted). Observations go into in-process histograms that
+``render_metrics()`` exposes in the Prometheus text format – each worker
+process keeps its own, so scrape every worker (or sum them).
+
+Views that go over ``QUERY_BUDGET`` (or their own ``@query_budget(n)``) are
+logged with their most repeated statement. With DEBUG on, staff users get a
+small panel with the same numbers at the bottom of every HTML page.
+"""
+import contextvars
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template import base as template_base
+from django.utils.html import escape
+
+logger = logging.getLogger(__name__)
+
+# Statements seen at least this often in one request are reported as N+1 suspects
+REPEAT_THRESHOLD = 3
+
+_current = contextvars.ContextVar('pharmacy_instrumentation', default=None)
+
+
+# ─── Metrics ──────────────────────────────────────────────────────────────────
+def _label(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by view name."""
+
+    def __init__(self, name, help_text, buckets):
+        self.name, self.help_text, self.buckets = name, help_text, tuple(buckets)
+        self.series = {}    # view → [bucket counts…, sum, count]
+        self.lock   = threading.Lock()
+
+    def observe(self, view, value):
+        with self.lock:
+            row = self.series.get(view)
+            if row is None:
+                row = self.series[view] = [0] * (len(self.buckets) + 2)
+            index = bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                row[index] += 1
+            row[-2] += value
+            row[-1] += 1
+
+    def render(self):
+        yield f'# HELP {self.name} {self.help_text}'
+        yield f'# TYPE {self.name} histogram'
+        with self.lock:
+            series = {view: list(row) for view, row in self.series.items()}
+        for view, row in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, row):
+                cumulative += count
+                yield f'{self.name}_bucket{{view="{_label(view)}",le="{bound:g}"}} {cumulative}'
+            yield f'{self.name}_bucket{{view="{_label(view)}",le="+Inf"}} {row[-1]}'
+            yield f'{self.name}_sum{{view="{_label(view)}"}} {row[-2]:.6g}'
+            yield f'{self.name}_count{{view="{_label(view)}"}} {row[-1]}'
+
+
+class CounterMetric:
+    """Monotonic counter keyed by a tuple of label values."""
+
+    def __init__(self, name, help_text, labels):
+        self.name, self.help_text, self.labels = name, help_text, labels
+        self.values = Counter()
+        self.lock   = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self.lock:
+            self.values[label_values] += amount
+
+    def render(self):
+        yield f'# HELP {self.name} {self.help_text}'
+        yield f'# TYPE {self.name} counter'
+        with self.lock:
+            values = dict(self.values)
+        for key, value in sorted(values.items()):
+            labels = ','.join(f'{n}="{_label(v)}"' for n, v in zip(self.labels, key))
+            yield f'{self.name}{{{labels}}} {value}'
+
+
+SECONDS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+REQUEST_SECONDS  = Histogram('pharmaflow_request_duration_seconds', 'Time spent in the view and middleware below.', SECONDS)
+DB_SECONDS       = Histogram('pharmaflow_db_duration_seconds', 'Time spent executing SQL per request.', SECONDS)
+TEMPLATE_SECONDS = Histogram('pharmaflow_template_duration_seconds', 'Time spent rendering templates per request.', SECONDS)
+QUERIES          = Histogram('pharmaflow_db_queries', 'SQL statements executed per request.', (1, 2, 5, 10, 20, 50, 100, 200, 500))
+RESPONSE_BYTES   = Histogram('pharmaflow_response_bytes', 'Response body size (non-streaming responses).',
+                             (1e3, 5e3, 1e4, 5e4, 1e5, 5e5, 1e6, 5e6))
+REQUESTS         = CounterMetric('pharmaflow_requests_total', 'Requests handled.', ('view', 'method', 'status'))
+REPEATED         = CounterMetric('pharmaflow_repeated_queries_total', 'Statements repeated within one request.', ('view',))
+OVER_BUDGET      = CounterMetric('pharmaflow_query_budget_exceeded_total', 'Requests over their query budget.', ('view',))
+
+METRICS = (REQUEST_SECONDS, DB_SECONDS, TEMPLATE_SECONDS, QUERIES, RESPONSE_BYTES, REQUESTS, REPEATED, OVER_BUDGET)
+
+
+def render_metrics():
+    """All metrics in the Prometheus text exposition format."""
+    return '\n'.join(line for metric in METRICS for line in metric.render()) + '\n'
+
+
+# ─── Per-request recording ────────────────────────────────────────────────────
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+
+
+def signature(sql):
+    """Statement with variable-length IN lists collapsed, so they group together."""
+    return _IN_LIST.sub('IN (…)', sql)
+
+
+class RequestStats:
+    __slots__ = ('queries', 'db_time', 'statements', 'template_time', 'template_depth')
+
+    def __init__(self):
+        self.queries        = 0
+        self.db_time        = 0.0
+        self.statements     = Counter()   # raw SQL (params are separate) → times run
+        self.template_time  = 0.0
+        self.template_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        """``connection.execute_wrapper`` hook."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+            self.statements[sql] += 1
+
+    def repeated(self):
+        """[(signature, count)] for statements run REPEAT_THRESHOLD+ times, worst first."""
+        grouped = Counter()
+        for sql, count in self.statements.items():
+            grouped[signature(sql)] += count
+        return [(sql, n) for sql, n in grouped.most_common() if n >= REPEAT_THRESHOLD]
+
+
+def _patch_template_render():
+    """Time top-level Template.render calls (includes nest inside their parent)."""
+    if getattr(template_base.Template.render, 'instrumented', False):
+        return
+    original = template_base.Template.render
+
+    def render(self, context):
+        stats = _current.get()
+        if stats is None:
+            return original(self, context)
+        stats.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return original(self, context)
+        finally:
+            stats.template_depth -= 1
+            if not stats.template_depth:
+                stats.template_time += time.perf_counter() - started
+
+    render.instrumented = True
+    template_base.Template.render = render
+
+
+def query_budget(limit):
+    """View decorator overriding settings.QUERY_BUDGET for one view."""
+    def decorator(view):
+        view.query_budget = limit
+        return view
+    return decorator
+
+
+# ─── Middleware ───────────────────────────────────────────────────────────────
+class InstrumentationMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, 'INSTRUMENTATION', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        _patch_template_render()
+
+    def __call__(self, request):
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for conn in connections.all():
+                    stack.enter_context(conn.execute_wrapper(stats))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        elapsed = time.perf_counter() - started
+
+        match = request.resolver_match
+        view  = match.view_name if match else 'unresolved'
+        self.record(view, request, response, stats, elapsed)
+
+        budget = getattr(settings, 'QUERY_BUDGET', 0)
+        if match:
+            budget = getattr(match.func, 'query_budget', budget)
+        if budget and stats.queries > budget:
+            OVER_BUDGET.inc(view)
+            worst = stats.repeated()[:1]
+            logger.warning(
+                '%s ran %d queries (budget %d)%s', view, stats.queries, budget,
+                f'; repeated {worst[0][1]}×: {worst[0][0][:200]}' if worst else '',
+            )
+
+        response['Server-Timing'] = (
+            f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries", '
+            f'tpl;dur={stats.template_time * 1000:.1f}, total;dur={elapsed * 1000:.1f}'
+        )
+        if settings.DEBUG and getattr(request, 'user', None) is not None and request.user.is_staff:
+            self.inject_panel(response, view, stats, elapsed, budget)
+        return response
+
+    @staticmethod
+    def record(view, request, response, stats, elapsed):
+        REQUEST_SECONDS.observe(view, elapsed)
+        DB_SECONDS.observe(view, stats.db_time)
+        TEMPLATE_SECONDS.observe(view, stats.template_time)
+        QUERIES.observe(view, stats.queries)
+        if not response.streaming:
+            RESPONSE_BYTES.observe(view, len(response.content))
+        REQUESTS.inc(view, request.method, response.status_code)
+        repeats = sum(n - 1 for n in stats.statements.values() if n > 1)
+        if repeats:
+            REPEATED.inc(view, amount=repeats)
+
+    @staticmethod
+    def inject_panel(response, view, stats, elapsed, budget):
+        if response.streaming or 'text/html' not in response.get('Content-Type', ''):
+            return
+        content = response.content.decode(response.charset)
+        if '</body>' not in content:
+            return
+        over = budget and stats.queries > budget
+        rows = ''.join(
+            f'<li><b>{n}×</b> <code>{escape(sql[:300])}</code></li>' for sql, n in stats.repeated()[:5]
+        )
+        panel = (
+            f'<div class="instrument-panel{" over-budget" if over else ""}">'
+            f'<strong>{escape(view)}</strong> · {elapsed * 1000:.1f} ms · '
+            f'{stats.queries} queries{f" / {budget}" if budget else ""} in {stats.db_time * 1000:.1f} ms · '
+            f'templates {stats.template_time * 1000:.1f} ms · {len(response.content):,} B'
+            f'{f"<ul>{rows}</ul>" if rows else ""}</div>'
+        )
+        response.content = content.replace('</body>', panel + '</body>', 1)
+        if response.has_header('Content-Length'):
+            response['Content-Length'] = len(response.content)
@@ -0,0 +1,57 @@
+"""
+Management command: python manage.py archive_history [--keep-months N] [--before YYYY-MM]
+                                                     [--kind sales|purchases] [--to-dir DIR] [--dry-run]
+Moves closed months of sales and purchases out of the hot tables into the
+archive tables (monthly partitions on PostgreSQL), or into gzip-compressed
+CSV files with --to-dir. Rollup totals and customer counters keep counting
+the archived rows. Run it monthly, e.g.
+    30 1 1 * *  cd /srv/pharmaflow && venv/bin/python manage.py archive_history
+"""
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from pharmacy import archive, dashboard
+from pharmacy.models import ArchivedPeriod
+
+
+class Command(BaseCommand):
+    help = 'Archives sales and purchases of closed months'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep-months', type=int, default=settings.ARCHIVE_KEEP_MONTHS,
+            help=f'Months before the current one kept hot (default {settings.ARCHIVE_KEEP_MONTHS})',
+        )
+        parser.add_argument('--before', help='Archive months before this one instead (YYYY-MM)')
+        parser.add_argument('--kind', choices=[k for k, _ in ArchivedPeriod.KIND_CHOICES], help='Only sales or purchases')
+        parser.add_argument('--to-dir', help='Write .csv.gz files here instead of the archive tables')
+        parser.add_argument('--dry-run', action='store_true', help='Only list the months that would be archived')
+
+    def handle(self, *args, **options):
+        before = self._month(options['before']) if options['before'] else archive.cutoff(options['keep_months'])
+        kinds  = [options['kind']] if options['kind'] else list(archive.SIDES)
+        moved  = 0
+        for kind in kinds:
+            for month in archive.pending_months(kind, before):
+                if options['dry_run']:
+                    rows = archive.SIDES[kind].month(month).count()
+                    if rows:
+                        self.stdout.write(f'  {kind} {month:%Y-%m}: {rows} row(s)')
+                    continue
+                period = archive.archive_month(kind, month, options['to_dir'])
+                if period:
+                    moved += period.rows
+                    self.stdout.write(f'  {period}: {period.total} → {period.location}')
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'Months before {before:%Y-%m} (dry run, nothing moved).'))
+            return
+        dashboard.invalidate_stats()
+        self.stdout.write(self.style.SUCCESS(f'✅ Archived {moved} row(s) from before {before:%Y-%m}.'))
+
+    def _month(self, value):
+        try:
+            return datetime.datetime.strptime(value, '%Y-%m').date()
+        except ValueError:
+            raise CommandError(f"Invalid month '{value}' – use YYYY-MM.")
@@ -0,0 +1,324 @@
+"""
+Management command: python manage.py benchmark [--scale N] [--iterations N]
+                                               [--writers N] [--writes N]
+                                               [-o FILE] [--compare FILE]
+Measures every URL in pharmacy/urls.py (latency percentiles, queries, bytes
+rendered) and the throughput of Sale.save / Purchase.save under concurrent
+writers, against whatever database the settings point at (use DATABASE_URL
+for SQLite or a local PostgreSQL). Results are written as a JSON baseline;
+--compare fails the run if a view got slower or issues more queries than
+the given baseline.
+"""
+import json
+import random
+import subprocess
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, reverse
+from django.utils import timezone
+
+from pharmacy import api, exports, stock, urls
+from pharmacy.models import Medicine, Supplier, Customer, Purchase, PurchaseOrder, Sale, Stocktake
+from pharmacy.pagination import KeysetPaginator
+
+BENCH_USER = 'benchmark'
+BENCH_NOTE = 'benchmark'
+
+# URL name → model whose first row fills <int:pk>
+PK_MODELS = {
+    'medicine': Medicine, 'supplier': Supplier, 'customer': Customer,
+    'purchase': Purchase, 'sale': Sale, 'order': PurchaseOrder, 'stocktake': Stocktake,
+}
+# Lists measured on a larger and a second page
+PAGED = {'sale_list': Sale, 'purchase_list': Purchase}
+# <slug:kind> values per view
+KINDS = {'data_export': exports.EXPORTS, 'api_list': api.RESOURCES, 'api_deleted': api.RESOURCES}
+# Views that are measured without a session (they redirect signed-in users)
+ANONYMOUS = {'login', 'register'}
+# Views that cannot be measured by repeated GETs
+SKIPPED   = {'logout': 'ends the session', 'pos_sync': 'POST only', 'dashboard_events': 'streams until closed'}
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarise(latencies):
+    return {
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p90_ms': round(percentile(latencies, 90), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'max_ms': round(max(latencies), 2),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# ─── Views ────────────────────────────────────────────────────────────────────
+def query_variants(name):
+    """Extra query strings worth measuring for a URL name (always includes none)."""
+    if name in PAGED:
+        # No filters there, only the pagination parameters
+        return [{}, {'per_page': '100'}, *second_page(PAGED[name])]
+    start = (timezone.now().date() - timedelta(days=30)).isoformat()
+    samples = {
+        kind: model.objects.order_by('pk').values_list('name', flat=True).first() or 'a'
+        for kind, model in (('medicine', Medicine), ('customer', Customer), ('supplier', Supplier))
+    }
+    sample = samples['medicine']
+    return {
+        'medicine_list': [{}, {'q': sample[:4]}, {'category': 'antibiotic'}, {'status': 'low'}, {'status': 'expired'}],
+        'autocomplete':  [{'type': kind, 'q': name[:3]} for kind, name in samples.items()],
+        'data_export':   [{'start': start}],
+    }.get(name, [{}])
+
+
+def second_page(model):
+    """``[{'cursor': …}]`` for the list's second page, or ``[]`` if it has one page."""
+    cursor = KeysetPaginator(model.objects.all()).page(None).next_cursor
+    return [{'cursor': cursor}] if cursor else []
+
+
+def view_cases():
+    """(label, url name, path, query, anonymous) for every pattern in pharmacy/urls.py."""
+    for pattern in urls.urlpatterns:
+        if not isinstance(pattern, URLPattern):
+            continue
+        name = pattern.name
+        if name in SKIPPED:
+            yield name, name, None, SKIPPED[name], False
+            continue
+        converters = pattern.pattern.converters
+        kwarg_sets = [{}]
+        if 'kind' in converters:
+            kwarg_sets = [{'kind': kind} for kind in KINDS[name]]
+        elif 'pk' in converters:
+            model = PK_MODELS[name.split('_')[0]]
+            pk = model.objects.order_by('pk').values_list('pk', flat=True).first()
+            if pk is None:
+                yield name, name, None, f'no {model._meta.verbose_name} rows', False
+                continue
+            kwarg_sets = [{'pk': pk}]
+        for kwargs in kwarg_sets:
+            path = reverse(name, kwargs=kwargs)
+            for query in query_variants(name):
+                label = path + ('?' + '&'.join(f'{k}={v}' for k, v in query.items()) if query else '')
+                yield label, name, path, query, name in ANONYMOUS
+
+
+@contextmanager
+def capture_queries():
+    """CaptureQueriesContext on every database alias, so reads routed to replicas count too."""
+    with ExitStack() as stack:
+        yield [stack.enter_context(CaptureQueriesContext(connections[alias])) for alias in connections]
+
+
+def measure_view(client, path, query, iterations):
+    latencies, queries, size, status = [], 0, 0, None
+    for i in range(iterations + 1):
+        with capture_queries() as captured:
+            started  = time.perf_counter()
+            response = client.get(path, query)
+            body     = b''.join(response.streaming_content) if response.streaming else response.content
+            elapsed  = (time.perf_counter() - started) * 1000
+        if i == 0:   # warm-up request primes caches and connections
+            continue
+        latencies.append(elapsed)
+        queries, size, status = sum(map(len, captured)), len(body), response.status_code
+    return {'status': status, 'queries': queries, 'bytes': size, **summarise(latencies)}
+
+
+# ─── Writes ───────────────────────────────────────────────────────────────────
+def concurrent_writes(writers, writes, seed=0):
+    """
+    ``writers`` threads each record ``writes`` purchases and as many matching
+    sales (so stock ends where it started), timing every save. The rows are
+    deleted again afterwards through the normal model paths.
+    """
+    medicine_ids = list(Medicine.objects.order_by('pk').values_list('pk', flat=True)[:200])
+    if not medicine_ids:
+        return None
+    timings = {'purchase_save': [], 'sale_save': []}
+    errors  = {'purchase_save': 0, 'sale_save': 0}
+    created = []
+    lock    = threading.Lock()
+    barrier = threading.Barrier(writers)
+
+    def writer(index):
+        rng = random.Random(seed + index)
+        mine, spent, failed = [], {'purchase_save': [], 'sale_save': []}, {'purchase_save': 0, 'sale_save': 0}
+        try:
+            barrier.wait()
+            for _ in range(writes):
+                medicine_id, qty = rng.choice(medicine_ids), rng.randint(1, 5)
+                for key, obj in (
+                    ('purchase_save', Purchase(medicine_id=medicine_id, quantity=qty, total_price=qty, notes=BENCH_NOTE)),
+                    ('sale_save',     Sale(medicine_id=medicine_id, quantity=qty, total_price=qty, notes=BENCH_NOTE)),
+                ):
+                    started = time.perf_counter()
+                    try:
+                        obj.save()
+                    except Exception:   # lock timeouts, InsufficientStock, …
+                        failed[key] += 1
+                        continue
+                    spent[key].append((time.perf_counter() - started) * 1000)
+                    mine.append(obj)
+        finally:
+            connections.close_all()
+            with lock:
+                created.extend(mine)
+                for key in timings:
+                    timings[key].extend(spent[key])
+                    errors[key] += failed[key]
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    # Sales first, so removing the purchases never drives stock negative
+    for obj in sorted(created, key=lambda o: isinstance(o, Purchase)):
+        try:
+            obj.delete()
+        except stock.InsufficientStock:
+            pass
+
+    results = {'writers': writers, 'elapsed_s': round(elapsed, 3)}
+    for key, latencies in timings.items():
+        results[key] = {
+            'ops': len(latencies), 'errors': errors[key],
+            'ops_per_s': round(len(latencies) / elapsed, 1) if elapsed else None,
+            **(summarise(latencies) if latencies else {}),
+        }
+    return results
+
+
+# ─── Comparison ───────────────────────────────────────────────────────────────
+def regressions(current, baseline, tolerance):
+    found = []
+    for label, now in current['views'].items():
+        before = baseline.get('views', {}).get(label)
+        if not before or 'p50_ms' not in before or 'p50_ms' not in now:
+            continue
+        if now['queries'] > before['queries']:
+            found.append(f"{label}: {before['queries']} → {now['queries']} queries")
+        if now['p50_ms'] > before['p50_ms'] * (1 + tolerance) and now['p50_ms'] - before['p50_ms'] > 1:
+            found.append(f"{label}: p50 {before['p50_ms']} → {now['p50_ms']} ms")
+    for key in ('purchase_save', 'sale_save'):
+        now, before = (current.get('writes') or {}).get(key), (baseline.get('writes') or {}).get(key)
+        if now and before and before.get('ops_per_s') and now['ops_per_s'] < before['ops_per_s'] * (1 - tolerance):
+            found.append(f"{key}: {before['ops_per_s']} → {now['ops_per_s']} ops/s")
+    return found
+
+
+def improvements(current, baseline):
+    """Views that now issue fewer queries than the baseline."""
+    found = []
+    for label, now in current['views'].items():
+        before = baseline.get('views', {}).get(label)
+        if before and 'queries' in before and 'queries' in now and now['queries'] < before['queries']:
+            found.append(f"{label}: {before['queries']} → {now['queries']} queries")
+    return found
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks every PharmaFlow view and the stock write path'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=int, help='Seed this many synthetic sales first (seed --scale)')
+        parser.add_argument('--iterations', type=int, default=20, help='Timed requests per URL (default 20)')
+        parser.add_argument('--writers', type=int, default=4, help='Concurrent writer threads (default 4, 0 to skip)')
+        parser.add_argument('--writes', type=int, default=50, help='Purchase + sale pairs per writer (default 50)')
+        parser.add_argument('-o', '--output', default='benchmarks/baseline.json', help='Where to write the JSON results')
+        parser.add_argument('--compare', help='Baseline JSON to compare against')
+        parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed slowdown for --compare (default 0.2)')
+
+    def handle(self, *args, **options):
+        if options['scale']:
+            call_command('seed', scale=options['scale'], stdout=self.stdout)
+
+        user, created = User.objects.get_or_create(username=BENCH_USER, defaults={'is_staff': True})
+        if created:
+            user.set_unusable_password()
+            user.save()
+        client, anonymous = Client(), Client()
+        client.force_login(user)
+
+        results = {
+            'meta': {
+                'commit':     git_commit(),
+                'created':    timezone.now().isoformat(timespec='seconds'),
+                'database':   connection.vendor,
+                'sessions':   settings.SESSION_ENGINE,
+                'iterations': options['iterations'],
+                'rows': {
+                    model._meta.model_name: model.objects.count()
+                    for model in (Medicine, Supplier, Customer, Purchase, Sale)
+                },
+            },
+            'views':  {},
+            'writes': None,
+        }
+
+        self.stdout.write(self.style.MIGRATE_HEADING('Views'))
+        for label, name, path, query, anon in view_cases():
+            if path is None:
+                results['views'][label] = {'skipped': query}
+                self.stdout.write(f'  {label:<48} skipped ({query})')
+                continue
+            row = measure_view(anonymous if anon else client, path, query, options['iterations'])
+            results['views'][label] = row
+            self.stdout.write(
+                f"  {label:<48} {row['status']}  p50 {row['p50_ms']:>8.1f} ms  p99 {row['p99_ms']:>8.1f} ms"
+                f"  {row['queries']:>3} queries  {row['bytes']:>9,} B"
+            )
+
+        if options['writers'] > 0:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"Writes ({options['writers']} writers)"))
+            results['writes'] = concurrent_writes(options['writers'], options['writes'])
+            for key in ('purchase_save', 'sale_save'):
+                row = (results['writes'] or {}).get(key)
+                if row:
+                    self.stdout.write(
+                        f"  {key:<16} {row['ops_per_s']:>8.1f} ops/s  p50 {row.get('p50_ms', 0):>7.1f} ms"
+                        f"  p99 {row.get('p99_ms', 0):>7.1f} ms  {row['errors']} errors"
+                    )
+
+        baseline = json.loads(Path(options['compare']).read_text()) if options['compare'] else None
+        output = Path(options['output'])
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(results, indent=2) + '\n')
+        self.stdout.write(self.style.SUCCESS(f'\nResults written to {output}'))
+
+        if baseline is not None:
+            for line in improvements(results, baseline):
+                self.stdout.write(f'  {line}')
+            found = regressions(results, baseline, options['tolerance'])
+            for line in found:
+                self.stdout.write(self.style.WARNING(f'  {line}'))
+            if found:
+                raise CommandError(f'{len(found)} regression(s) against {options["compare"]}')
+            self.stdout.write(self.style.SUCCESS('No regressions against the baseline'))
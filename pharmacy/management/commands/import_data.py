@@ -0,0 +1,37 @@
+"""
+Management command: python manage.py import_data <medicines|purchases|customers> <file.csv|file.xlsx>
+Streams a CSV or XLSX file into the database in chunks (see pharmacy/importers.py).
+"""
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from pharmacy import importers
+
+
+class Command(BaseCommand):
+    help = 'Bulk-imports medicines, purchases or customers from a CSV/XLSX file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(importers.IMPORTERS))
+        parser.add_argument('path')
+        parser.add_argument('--chunk-size', type=int, default=importers.DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.is_file():
+            raise CommandError(f'No such file: {path}')
+        self.stdout.write(self.style.MIGRATE_HEADING(f'📥 Importing {options["kind"]} from {path.name}…'))
+        try:
+            with path.open('rb') as fileobj:
+                result = importers.import_file(options['kind'], fileobj, path.name, options['chunk_size'])
+        except ValueError as exc:
+            raise CommandError(str(exc)) from exc
+
+        for line, message in result.errors:
+            self.stdout.write(self.style.WARNING(f'  line {line}: {message}'))
+        if result.skipped > len(result.errors):
+            self.stdout.write(self.style.WARNING(f'  … and {result.skipped - len(result.errors)} more'))
+        self.stdout.write(self.style.SUCCESS(
+            f'\n✅ {result.created} created, {result.updated} updated, {result.skipped} skipped.'
+        ))
@@ -0,0 +1,120 @@
+"""
+Management command: python manage.py index_report [--plan] [--analyze]
+Runs EXPLAIN on the queries each PharmaFlow view issues and reports which
+indexes the planner picked and where it fell back to a full table scan.
+"""
+import re
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import F
+from django.utils import timezone
+
+from pharmacy import batches, dashboard
+from pharmacy.models import Medicine, Supplier, Customer, Purchase, Batch, Sale, Tombstone
+from pharmacy.pagination import KeysetPaginator
+
+
+def _list_pages(label, queryset, ordering=None):
+    """First page and, if there is one, the second (seek) page of a list view."""
+    paginator = KeysetPaginator(queryset, ordering=ordering)
+    first = paginator.queryset[:paginator.per_page + 1]
+    yield f'{label} (page 1)', first
+    row = paginator.queryset.first()
+    if row is not None:
+        _, values = paginator.decode_cursor(paginator.encode_cursor(row, 'next'))
+        yield f'{label} (seek page)', paginator.queryset.filter(paginator._seek(values, False))[:paginator.per_page + 1]
+
+
+def view_queries():
+    today    = timezone.now().date()
+    alerts   = dashboard.alert_lists(today)
+    recent   = dashboard.recent_activity()
+    medicine = Medicine.objects.order_by('pk').first()
+
+    yield 'home: expired',          alerts['expired']
+    yield 'home: low stock',        alerts['low_stock']
+    yield 'home: out of stock',     alerts['out_of_stock']
+    horizons = dashboard.horizons()
+    if horizons:
+        yield 'home: expiry horizons', batches.expiring(horizons[-1], today)
+    yield 'home: recent sales',     recent['recent_sales']
+    yield 'home: recent purchases', recent['recent_purchases']
+
+    meds = Medicine.objects.select_related('supplier')
+    yield from _list_pages('medicine_list', meds)
+    yield from _list_pages('medicine_list ?category=', meds.filter(category='antibiotic'))
+    yield from _list_pages('medicine_list ?status=expired', meds.filter(batches.expired_stock(today)))
+    if horizons:
+        yield from _list_pages('medicine_list ?expiring=', meds.filter(batches.expiring_stock(horizons[0], today)))
+    yield from _list_pages('medicine_list ?status=low', meds.filter(stock__gte=1, stock__lte=F('reorder_point')))
+    yield from _list_pages('medicine_list ?status=out', meds.filter(stock=0))
+    yield from _list_pages('supplier_list', Supplier.objects.all())
+    yield from _list_pages('supplier_list by medicines', Supplier.objects.all(), ['-medicine_count'])
+    yield from _list_pages('customer_list', Customer.objects.all())
+    yield from _list_pages('customer_list by spend', Customer.objects.all(), ['-total_spent'])
+    yield from _list_pages('customer_list by recent', Customer.objects.filter(last_purchase__isnull=False), ['-last_purchase'])
+    yield 'customer_list: active 30 days', Customer.objects.filter(
+        last_purchase__gte=today - timedelta(days=30),
+    )[:50]
+    yield from _list_pages('purchase_list', Purchase.objects.select_related('medicine', 'supplier'))
+    yield from _list_pages('sale_list', Sale.objects.select_related('medicine', 'customer'))
+
+    since = timezone.now() - timedelta(days=1)
+    yield from _list_pages('api/medicines ?since=', Medicine.objects.filter(updated__gte=since), ['updated'])
+    yield from _list_pages('api/sales ?since=', Sale.objects.filter(updated__gte=since), ['updated'])
+    yield from _list_pages('api/sales/deleted ?since=', Tombstone.objects.filter(model_name='sale', deleted__gte=since), ['deleted'])
+
+    if medicine is not None:
+        yield 'medicine_detail: sales',     medicine.sales.order_by('-sale_date')[:10]
+        yield 'medicine_detail: purchases', medicine.purchases.order_by('-purchase_date')[:10]
+        yield 'medicine_detail: batches',   medicine.batches.filter(remaining__gt=0).order_by('expiry_date', 'id')
+        yield 'sale: FEFO candidates',      batches.Batch.objects.filter(
+            medicine=medicine, remaining__gt=0, expiry_date__gte=today,
+        ).order_by('medicine_id', 'expiry_date', 'id').values_list('id', 'medicine_id', 'remaining')
+
+
+class Command(BaseCommand):
+    help = "Reports which indexes each view's query plan uses"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--plan', action='store_true', help='Print the full query plan')
+        parser.add_argument('--analyze', action='store_true', help='EXPLAIN ANALYZE (PostgreSQL only)')
+
+    def handle(self, *args, **options):
+        tables  = [m._meta.db_table for m in (Medicine, Supplier, Customer, Purchase, Batch, Sale, Tombstone)]
+        indexes = self._index_names(tables)
+        scan_re = re.compile(
+            r'Seq Scan on (\w+)|^[\d\s|`-]*SCAN (\w+)\b(?! USING)', re.MULTILINE
+        )
+        analyze = options['analyze'] and connection.vendor == 'postgresql'
+
+        full_scans = 0
+        for label, qs in view_queries():
+            plan  = qs.explain(analyze=True) if analyze else qs.explain()
+            used  = sorted(name for name in indexes if re.search(rf'\b{re.escape(name)}\b', plan))
+            scans = sorted({t for m in scan_re.finditer(plan) for t in m.groups() if t in tables})
+
+            self.stdout.write(self.style.MIGRATE_LABEL(label))
+            self.stdout.write(f"  indexes: {', '.join(used) or '—'}")
+            if scans:
+                full_scans += 1
+                self.stdout.write(self.style.WARNING(f"  full scan: {', '.join(scans)}"))
+            if options['plan']:
+                for line in plan.splitlines():
+                    self.stdout.write(f'    {line}')
+
+        if full_scans:
+            self.stdout.write(self.style.WARNING(f'\n{full_scans} view quer{"y" if full_scans == 1 else "ies"} with full scans'))
+        else:
+            self.stdout.write(self.style.SUCCESS('\nNo full table scans'))
+
+    def _index_names(self, tables):
+        names = set()
+        with connection.cursor() as cursor:
+            for table in tables:
+                for name, info in connection.introspection.get_constraints(cursor, table).items():
+                    if info['index'] or info['primary_key']:
+                        names.add(name)
+        return names
@@ -0,0 +1,27 @@
+"""
+Management command: python manage.py purge_sessions [--batch-size N]
+Deletes expired sessions in batches of primary keys picked off the
+expire_date index, committing after each batch, so a large backlog never
+holds one long lock on django_session. Schedule it nightly, e.g.
+    15 0 * * *  cd /srv/pharmaflow && venv/bin/python manage.py purge_sessions
+"""
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = 'Deletes expired sessions in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Sessions deleted per statement (default 5000)')
+
+    def handle(self, *args, **options):
+        now, purged = timezone.now(), 0
+        expired = Session.objects.filter(expire_date__lt=now).order_by('expire_date')
+        while True:
+            keys = list(expired.values_list('session_key', flat=True)[:options['batch_size']])
+            if not keys:
+                break
+            purged += Session.objects.filter(session_key__in=keys).delete()[0]
+        self.stdout.write(self.style.SUCCESS(f'✅ Purged {purged} expired session(s).'))
@@ -0,0 +1,27 @@
+"""
+Management command: python manage.py rebuild_rollups [--start YYYY-MM-DD] [--end YYYY-MM-DD]
+Recomputes the DailyRollup summary rows from Sale and Purchase, month by month.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from pharmacy import dashboard, rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the daily sales / purchase rollups'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='First day to rebuild (default: earliest sale or purchase)')
+        parser.add_argument('--end', help='Last day to rebuild (default: today)')
+
+    def handle(self, *args, **options):
+        bounds = {}
+        for key in ('start', 'end'):
+            if options[key]:
+                bounds[key] = parse_date(options[key])
+                if bounds[key] is None:
+                    raise CommandError(f"--{key} must be a date (YYYY-MM-DD).")
+        written = rollups.rebuild(**bounds)
+        dashboard.invalidate_stats()
+        self.stdout.write(self.style.SUCCESS(f'✅ Wrote {written} rollup row(s).'))
@@ -0,0 +1,42 @@
+"""
+Management command: python manage.py rebuild_stock [--dry-run]
+Recomputes Medicine.stock from the StockMovement ledger in one bulk UPDATE,
+then brings each medicine's batches back in line with its stock.
+"""
+from django.core.management.base import BaseCommand
+
+from pharmacy import batches, stock
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds Medicine.stock from the stock movement ledger and reconciles batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report medicines that have drifted')
+
+    def handle(self, *args, **options):
+        drifted = stock.drift().only('id', 'name', 'stock')
+        shown = 0
+        for med in drifted[:50]:
+            self.stdout.write(f"  {med.name}: stock {med.stock}, ledger {med.ledger_stock}")
+            shown += 1
+        if not shown:
+            self.stdout.write(self.style.SUCCESS('✅ Stock matches the ledger.'))
+        elif options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'{drifted.count()} medicine(s) drifted (dry run, nothing changed).'))
+        else:
+            fixed = stock.rebuild_stock()
+            self.stdout.write(self.style.SUCCESS(f'✅ Rebuilt stock for {fixed} medicine(s).'))
+
+        unbatched = batches.drift().only('id', 'name', 'stock')
+        shown = 0
+        for med in unbatched[:50]:
+            self.stdout.write(f"  {med.name}: stock {med.stock}, batches {med.batch_stock}")
+            shown += 1
+        if not shown:
+            self.stdout.write(self.style.SUCCESS('✅ Batches match stock.'))
+        elif options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'{unbatched.count()} medicine(s) with batch drift (dry run, nothing changed).'))
+        else:
+            fixed = batches.rebuild_batches()
+            self.stdout.write(self.style.SUCCESS(f'✅ Reconciled batches for {fixed} medicine(s).'))
@@ -0,0 +1,43 @@
+"""
+Management command: python manage.py reconcile_counters [--dry-run]
+Recomputes the denormalised supplier / customer counters (medicine count,
+sale count, total spent, last purchase) from Medicine and Sale, one bulk
+UPDATE per model for the rows that have drifted.
+"""
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from pharmacy import counters
+
+
+class Command(BaseCommand):
+    help = 'Reconciles supplier and customer counters with the medicines and sales they count'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report rows that have drifted')
+
+    def handle(self, *args, **options):
+        suppliers, customers = counters.drift()
+        shown = 0
+        for s in suppliers.only('id', 'name', 'medicine_count')[:50]:
+            self.stdout.write(f"  {s.name}: {s.medicine_count} medicines, actually {s.actual_medicines}")
+            shown += 1
+        for c in customers.only('id', 'name', 'sale_count', 'total_spent', 'last_purchase')[:50]:
+            last = c.actual_last if c.actual_last != date.min else 'never'
+            self.stdout.write(
+                f"  {c.name}: {c.sale_count} sales / {c.total_spent} / {c.last_purchase or 'never'}, "
+                f"actually {c.actual_sales} / {c.actual_spent} / {last}"
+            )
+            shown += 1
+        if not shown:
+            self.stdout.write(self.style.SUCCESS('✅ Counters match medicines and sales.'))
+        elif options['dry_run']:
+            self.stdout.write(self.style.WARNING(
+                f'{suppliers.count()} supplier(s), {customers.count()} customer(s) drifted (dry run, nothing changed).'
+            ))
+        else:
+            fixed_suppliers, fixed_customers = counters.rebuild()
+            self.stdout.write(self.style.SUCCESS(
+                f'✅ Reconciled {fixed_suppliers} supplier(s), {fixed_customers} customer(s).'
+            ))
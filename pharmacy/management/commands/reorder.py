@@ -0,0 +1,32 @@
+"""
+Management command: python manage.py reorder [--draft-orders]
+Recomputes every medicine's demand forecast and reorder point (see
+pharmacy/reorder.py); with --draft-orders, also replaces the draft purchase
+orders. Run it nightly after snapshot_expiry.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.core.exceptions import ImproperlyConfigured
+
+from pharmacy import reorder
+
+
+class Command(BaseCommand):
+    help = 'Recomputes reorder points and optionally drafts purchase orders'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--draft-orders', action='store_true', help='Replace draft purchase orders afterwards')
+
+    def handle(self, *args, **options):
+        try:
+            summary = reorder.forecast()
+        except ImproperlyConfigured as exc:
+            raise CommandError(str(exc)) from exc
+        self.stdout.write(
+            f"  {summary['medicines']} medicine(s), {summary['with_history']} with sales history, "
+            f"{summary['changed']} reorder point(s) changed, {summary['low']} at or below their reorder point"
+        )
+        if options['draft_orders']:
+            orders = reorder.draft_orders()
+            lines  = sum(order.lines.count() for order in orders)
+            self.stdout.write(f'  {len(orders)} draft order(s) with {lines} line(s)')
+        self.stdout.write(self.style.SUCCESS('✅ Reorder points updated.'))
@@ -1,11 +1,31 @@
 """
-Management command: python manage.py seed
+Management command: python manage.py seed [--scale N] [--years Y] [--random-seed S]
 Seeds the database with example Suppliers, Medicines, and Customers.
+
+With --scale, generates a deterministic synthetic pharmacy instead: N sales
+spread over Y years of history with seasonality, plus the suppliers,
+medicines, customers and restocking purchases to go with them. Rows are
+formatted once and written in large batches (COPY on PostgreSQL, with the
+tables' secondary indexes and foreign keys rebuilt after the load;
+executemany elsewhere). Customer counters and daily rollups are totalled
+while generating, and Medicine.stock is rebuilt from the generated ledger,
+so it always matches; each medicine's stock on hand is seeded as one batch
+at its expiry date.
 """
+import io
+import math
+import random
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from decimal import Decimal
+
 from django.core.management.base import BaseCommand
+from django.db import connection, transaction
 from django.utils import timezone
-from datetime import date, timedelta
-from pharmacy.models import Supplier, Medicine, Customer
+from datetime import date, datetime, time as dt_time, timedelta, timezone as dt_timezone
+from pharmacy import archive, batches, counters, dashboard, rollups, stock
+from pharmacy.models import Supplier, Medicine, Customer, DailyRollup, Purchase, Sale, StockMovement
 
 
 SUPPLIERS = [
@@ -40,10 +60,356 @@ CUSTOMERS = [
 ]
 
 
+# ─── Synthetic data at scale ──────────────────────────────────────────────────
+STEMS    = ['Amoxi', 'Azithro', 'Cipro', 'Doxy', 'Metfor', 'Atorva', 'Rosuva', 'Losar', 'Amlo',
+            'Omepra', 'Panto', 'Esome', 'Cetiri', 'Lorata', 'Montelu', 'Salbu', 'Budeso', 'Fluco',
+            'Terbina', 'Acyclo', 'Valacy', 'Parace', 'Ibupro', 'Napro', 'Diclo', 'Predni', 'Hydrocor',
+            'Sertra', 'Escita', 'Glicla', 'Sitaglip', 'Lisino', 'Ramip', 'Clopido', 'Warfa', 'Levothy']
+SUFFIXES = ['cillin', 'mycin', 'floxacin', 'cycline', 'min', 'statin', 'tan', 'dipine', 'prazole',
+            'zine', 'dine', 'kast', 'mol', 'nide', 'zole', 'fine', 'vir', 'tamol', 'fen', 'xen', 'sone']
+FORMS    = ['Tablet', 'Capsule', 'Syrup', 'Cream', 'Inhaler', 'Drops', 'Injection', 'Sachet']
+STRENGTHS = [5, 10, 20, 25, 40, 50, 100, 200, 250, 400, 500, 1000]
+FIRST    = ['Aarav', 'Sita', 'Ram', 'Gita', 'Hari', 'Maya', 'Bibek', 'Anita', 'Suman', 'Priya',
+            'Rohan', 'Nisha', 'Kiran', 'Deepa', 'Arjun', 'Laxmi', 'Manish', 'Sunita', 'Rajesh', 'Asha']
+LAST     = ['Sharma', 'Thapa', 'Shrestha', 'Gurung', 'Karki', 'Adhikari', 'Rai', 'Tamang', 'Magar',
+            'Joshi', 'Pandey', 'Basnet', 'Khadka', 'Bhandari', 'Poudel', 'Lama', 'Koirala', 'Acharya']
+# Categories whose demand peaks in winter (northern hemisphere)
+WINTER_CATEGORIES = {'respiratory', 'antiviral', 'antibiotic', 'analgesic'}
+# Units per sale line, drawn uniformly
+QUANTITIES = (1, 1, 1, 2, 2, 3, 5)
+# 'HH:MM:SS' for every second of a day, for ScaleSeeder.timestamps
+CLOCK = [f'{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}' for s in range(86400)]
+
+
+class ScaleSeeder:
+    """Deterministic generator for ``seed --scale``; see the module docstring."""
+
+    def __init__(self, sales, years, rng_seed, batch_size, out):
+        self.target     = sales
+        self.years      = years
+        self.rng        = random.Random(rng_seed)
+        self.batch_size = batch_size
+        self.out        = out
+        self.use_copy   = connection.vendor == 'postgresql'
+        self.now        = timezone.now()
+        self.today      = timezone.localdate(self.now)
+        self.start      = self.today - timedelta(days=365 * years)
+
+    def log(self, msg):
+        self.out(f'  {msg}')
+
+    # ── Writers ──
+    def insert(self, model, columns, rows):
+        """
+        Insert plain tuples into ``model``'s table, bypassing model instances:
+        COPY on PostgreSQL (psycopg2 or psycopg 3), executemany elsewhere.
+        """
+        if not rows:
+            return
+        qn    = connection.ops.quote_name
+        table = qn(model._meta.db_table)
+        names = ', '.join(qn(c) for c in columns)
+        with connection.cursor() as cursor:
+            if not self.use_copy:
+                placeholders = ', '.join(['%s'] * len(columns))
+                cursor.executemany(f'INSERT INTO {table} ({names}) VALUES ({placeholders})', rows)
+                return
+            data = ''.join(['\t'.join([r'\N' if v is None else str(v) for v in row]) + '\n' for row in rows])
+            sql  = f'COPY {table} ({names}) FROM STDIN'
+            raw  = cursor.cursor
+            if hasattr(raw, 'copy_expert'):
+                raw.copy_expert(sql, io.StringIO(data))
+            else:
+                with raw.copy(sql) as copy:
+                    copy.write(data)
+
+    @contextmanager
+    def bulk_load(self, *models):
+        """
+        On PostgreSQL, drop the secondary indexes and foreign keys of
+        ``models``' tables while the block loads them and recreate them
+        afterwards: one index build and one validating join per table instead
+        of per-row index upkeep and a deferred foreign-key check per row.
+        Primary keys and unique constraints stay. Must run inside the seed's
+        transaction, which a failure rolls back whole.
+        """
+        if not self.use_copy:
+            yield
+            return
+        qn = connection.ops.quote_name
+        restore = []
+        # Run the deferred checks queued so far: PostgreSQL refuses to alter a
+        # (referenced) table that still has pending trigger events
+        connection.check_constraints()
+        with connection.cursor() as cursor:
+            for model in models:
+                table = model._meta.db_table
+                cursor.execute(
+                    'SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint '
+                    "WHERE conrelid = %s::regclass AND contype = 'f'", [table],
+                )
+                for name, definition in cursor.fetchall():
+                    cursor.execute(f'ALTER TABLE {qn(table)} DROP CONSTRAINT {qn(name)}')
+                    restore.append(f'ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(name)} {definition}')
+                cursor.execute(
+                    'SELECT indexrelid::regclass::text, pg_get_indexdef(indexrelid) FROM pg_index '
+                    'WHERE indrelid = %s::regclass AND NOT indisprimary AND NOT indisunique', [table],
+                )
+                for name, definition in cursor.fetchall():
+                    cursor.execute(f'DROP INDEX {name}')
+                    restore.insert(0, definition)    # indexes first: they speed up the FK checks
+        yield
+        started = time.monotonic()
+        connection.check_constraints()
+        with connection.cursor() as cursor:
+            for statement in restore:
+                cursor.execute(statement)
+            for model in models:
+                cursor.execute(f'ANALYZE {qn(model._meta.db_table)}')
+        self.log(f'indexes and foreign keys rebuilt in {time.monotonic() - started:.1f}s')
+
+    def timestamps(self, day, offsets):
+        """
+        ``created`` values ``offsets`` (ascending) seconds after ``day``'s
+        midnight, never in the future, as naive UTC text – the form every
+        backend's datetime adapter produces with USE_TZ. Only the day's start
+        goes through datetime; each row is two string lookups.
+        """
+        midnight = timezone.make_aware(datetime.combine(day, dt_time())).astimezone(dt_timezone.utc)
+        start    = midnight.hour * 3600 + midnight.minute * 60 + midnight.second
+        first, second = f'{midnight.date()} ', f'{midnight.date() + timedelta(days=1)} '
+        stamps = [first + CLOCK[t] if t < 86400 else second + CLOCK[t - 86400] for t in (start + s for s in offsets)]
+        if offsets and midnight + timedelta(seconds=offsets[-1]) > self.now:
+            cap = str(self.now.astimezone(dt_timezone.utc).replace(tzinfo=None, microsecond=0))
+            stamps = [min(stamp, cap) for stamp in stamps]
+        return stamps
+
+    # ── Catalogue ──
+    def medicine_names(self, count):
+        taken = set(Medicine.objects.values_list('name', flat=True))
+        names = []
+        while len(names) < count:
+            base = (f"{self.rng.choice(STEMS)}{self.rng.choice(SUFFIXES)} "
+                    f"{self.rng.choice(STRENGTHS)}mg {self.rng.choice(FORMS)}")
+            name = base if base not in taken else f'{base} #{len(names) + 1}'
+            if name not in taken:
+                taken.add(name)
+                names.append(name)
+        return names
+
+    def build_catalogue(self):
+        n_meds      = max(12, min(self.target // 40, 50_000))
+        n_suppliers = max(4, n_meds // 150)
+        n_customers = max(6, self.target // 60)
+
+        Supplier.objects.bulk_create([
+            Supplier(name=f'{self.rng.choice(LAST)} Pharma Distributors {i + 1}',
+                     phone=f'+977-1-{self.rng.randint(4000000, 5999999)}',
+                     email=f'orders{i + 1}@supplier.example')
+            for i in range(n_suppliers)
+        ], batch_size=self.batch_size)
+        self.suppliers = list(Supplier.objects.order_by('-pk').values_list('pk', flat=True)[:n_suppliers])
+
+        # Medicines and customers go in as plain rows (no model instances, no
+        # per-row opening movement), with the model defaults spelled out
+        now        = connection.ops.adapt_datetimefield_value(self.now)
+        reorder    = Medicine._meta.get_field('reorder_point').get_default()
+        categories = [c for c, _ in Medicine.CATEGORY_CHOICES]
+        self.insert(Medicine, ('name', 'category', 'stock', 'price', 'expiry_date', 'supplier_id', 'reorder_point', 'created', 'updated'), [
+            (name, self.rng.choice(categories), 0,
+             str(Decimal(self.rng.randint(150, 9000)) / 100),
+             str(self.today + timedelta(days=self.rng.randint(-60, 1100))),
+             self.rng.choice(self.suppliers), reorder, now, now)
+            for name in self.medicine_names(n_meds)
+        ])
+        rows = Medicine.objects.order_by('-pk').values_list('pk', 'price', 'category', 'supplier_id')[:n_meds]
+        self.medicines = list(reversed(rows))
+
+        self.insert(Customer, ('name', 'phone', 'email', 'address', 'sale_count', 'total_spent', 'created', 'updated'), [
+            (f'{self.rng.choice(FIRST)} {self.rng.choice(LAST)}',
+             f'+977-98{self.rng.randint(10000000, 99999999)}', '', '', 0, '0', now, now)
+            for _ in range(n_customers)
+        ])
+        self.customers = list(Customer.objects.order_by('-pk').values_list('pk', flat=True)[:n_customers])
+        self.log(f'{n_suppliers} suppliers, {n_meds} medicines, {n_customers} customers')
+
+    # ── History ──
+    def day_weights(self):
+        """Demand per day: yearly winter peak, busier weekdays, slow growth."""
+        days = (self.today - self.start).days + 1
+        weights = []
+        for d in range(days):
+            day = self.start + timedelta(days=d)
+            season  = 1 + 0.25 * math.cos(2 * math.pi * (day.timetuple().tm_yday - 15) / 365)
+            weekday = 0.7 if day.weekday() == 6 else 1.0
+            growth  = 0.8 + 0.4 * d / days
+            weights.append(season * weekday * growth)
+        return weights
+
+    def build_history(self):
+        meds       = self.medicines
+        popularity = [1 / (rank + 1) ** 0.8 for rank in range(len(meds))]   # Zipf-like
+        self.rng.shuffle(popularity)
+        cum_pop    = []
+        total = 0
+        for w in popularity:
+            total += w
+            cum_pop.append(total)
+        winter     = [cat in WINTER_CATEGORIES for _, _, cat, _ in meds]
+        expected   = [self.target * w / total for w in popularity]        # lifetime units-ish per medicine
+        days       = self.day_weights()
+        day_total  = sum(days)
+        reorder_at = [max(5, int(e / len(days) * 7)) for e in expected]   # ~1 week of demand
+        restock_to = [r * 5 for r in reorder_at]
+
+        on_hand    = [0] * len(meds)
+        low        = set(range(len(meds)))                              # everything starts empty
+        bought     = [0] * len(meds)
+        sold       = [0] * len(meds)
+        per_customer = defaultdict(lambda: [0, Decimal('0'), None])    # counters.add_totals
+        sales, purchases, rolled = [], [], []
+        n_sales = n_purchases = 0
+        carry = 0.0
+
+        # Per-row work hoisted out of the loop: line totals per medicine and
+        # quantity, and a 60 % chance of a known customer as one weighted draw
+        line_totals = [[price * q for q in range(max(QUANTITIES) + 1)] for _, price, _, _ in meds]
+        line_text   = [[str(total) for total in totals] for totals in line_totals]
+        shoppers    = self.customers + [None]
+        cum_shopper = [0.6 * (k + 1) / len(self.customers) for k in range(len(self.customers))] + [1.0]
+        picks_from  = range(len(meds))
+
+        sale_columns     = ('medicine_id', 'customer_id', 'quantity', 'total_price', 'sale_date', 'notes', 'created', 'updated')
+        purchase_columns = ('medicine_id', 'supplier_id', 'quantity', 'total_price', 'purchase_date', 'lot_number', 'notes', 'created', 'updated')
+        rollup_columns   = ('day', 'medicine_id', 'category') + rollups.FIELDS
+        for d, weight in enumerate(days):
+            day = self.start + timedelta(days=d)
+            iso = str(day)
+            # Restock whatever fell to its reorder point yesterday, at opening time
+            opening  = self.timestamps(day, [8 * 3600])[0]
+            restocks = {}
+            for i in sorted(low):
+                pk, price, _, supplier = meds[i]
+                qty = restock_to[i] - on_hand[i]
+                cost = (price * qty * Decimal('0.7')).quantize(Decimal('0.01'))
+                purchases.append((pk, supplier, qty, str(cost), iso, '', '', opening, opening))
+                on_hand[i] += qty
+                bought[i] += qty
+                restocks[i] = (qty, cost)
+            low = set()
+            # Sales for the day, spread evenly over opening hours; prices are
+            # fixed, so a medicine's revenue for the day is price × units
+            carry += self.target * weight / day_total
+            todays, carry = int(carry), carry - int(carry)
+            off_season = day.month not in (11, 12, 1, 2)
+            spacing    = 11 * 3600 / max(todays, 1)
+            picks  = self.rng.choices(picks_from, cum_weights=cum_pop, k=todays)
+            wanted = self.rng.choices(QUANTITIES, k=todays)
+            buyers = self.rng.choices(shoppers, cum_weights=cum_shopper, k=todays)
+            stamps = self.timestamps(day, [9 * 3600 + int(n * spacing) for n in range(todays)])
+            units, lines = defaultdict(int), defaultdict(int)
+            for i, qty, customer, created in zip(picks, wanted, buyers, stamps):
+                if off_season and winter[i] and self.rng.random() < 0.15:
+                    i = self.rng.choices(picks_from, cum_weights=cum_pop)[0]
+                if qty > on_hand[i]:
+                    qty = on_hand[i]
+                    if not qty:
+                        continue
+                on_hand[i] -= qty
+                if on_hand[i] <= reorder_at[i]:
+                    low.add(i)
+                sales.append((meds[i][0], customer, qty, line_text[i][qty], iso, '', created, created))
+                units[i] += qty
+                lines[i] += 1
+                if customer:
+                    totals = per_customer[customer]
+                    totals[0] += 1
+                    totals[1] += line_totals[i][qty]
+                    totals[2] = day
+            for i, qty in units.items():
+                sold[i] += qty
+            if self.fresh:
+                for i in units.keys() | restocks.keys():
+                    pk, price, category, _ = meds[i]
+                    bought_qty, cost = restocks.get(i, (0, 0))
+                    rolled.append((iso, pk, category, units[i], price * units[i], lines[i],
+                                   bought_qty, cost, int(i in restocks)))
+            if len(sales) >= self.batch_size * 4:
+                n_sales += len(sales)
+                self.insert(Sale, sale_columns, sales)
+                sales = []
+            if len(purchases) >= self.batch_size:
+                n_purchases += len(purchases)
+                self.insert(Purchase, purchase_columns, purchases)
+                purchases = []
+            if len(rolled) >= self.batch_size * 4:
+                self.insert(DailyRollup, rollup_columns, rolled)
+                rolled = []
+        n_sales += len(sales)
+        n_purchases += len(purchases)
+        self.insert(Sale, sale_columns, sales)
+        self.insert(Purchase, purchase_columns, purchases)
+        self.insert(DailyRollup, rollup_columns, rolled)
+
+        # Ledger: one aggregated purchase and sale movement per medicine
+        now = connection.ops.adapt_datetimefield_value(self.now)
+        movements = []
+        for (pk, _, _, _), in_qty, out_qty in zip(meds, bought, sold):
+            if in_qty:
+                movements.append((pk, in_qty, StockMovement.PURCHASE, 'Seeded history', now))
+            if out_qty:
+                movements.append((pk, -out_qty, StockMovement.SALE, 'Seeded history', now))
+        self.insert(StockMovement, ('medicine_id', 'quantity', 'reason', 'reference', 'created'), movements)
+        counters.add_totals(per_customer)
+        counters.refresh_suppliers(self.suppliers)
+        self.log(f'{n_sales} sales, {n_purchases} purchases over {len(days)} days')
+
+    def run(self):
+        started = time.monotonic()
+        with transaction.atomic():
+            # Rollups are written as they are generated unless the range
+            # already has history (or archived months) to fold in
+            self.fresh = not (
+                archive.closed_until()
+                or Sale.objects.filter(sale_date__gte=self.start).exists()
+                or Purchase.objects.filter(purchase_date__gte=self.start).exists()
+            )
+            if self.fresh:
+                DailyRollup.objects.filter(day__gte=self.start).delete()
+            self.build_catalogue()
+            with self.bulk_load(Sale, Purchase, DailyRollup):
+                self.build_history()
+            fixed = stock.rebuild_stock()
+            batched = batches.rebuild_batches()
+        transaction.on_commit(dashboard.invalidate_stats)
+        self.log(f'stock rebuilt from the ledger for {fixed} medicines, batches for {batched}')
+        if not self.fresh:
+            self.log(f'{rollups.rebuild(self.start)} daily rollup rows rebuilt')
+        return time.monotonic() - started
+
+
 class Command(BaseCommand):
     help = 'Seeds the database with example pharmacy data'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=int, help='Generate synthetic history with this many sales')
+        parser.add_argument('--years', type=int, default=3, help='Years of history for --scale (default 3)')
+        parser.add_argument('--random-seed', type=int, default=42, help='RNG seed for --scale (default 42)')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
     def handle(self, *args, **options):
+        if options['scale']:
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"🌱 Generating {options['scale']:,} sales over {options['years']} years…"
+            ))
+            seeder = ScaleSeeder(
+                options['scale'], options['years'], options['random_seed'],
+                options['batch_size'], self.stdout.write,
+            )
+            elapsed = seeder.run()
+            self.stdout.write(self.style.SUCCESS(f'\n✅ Seed complete in {elapsed:.1f}s'))
+            return
+
         self.stdout.write(self.style.MIGRATE_HEADING('🌱 Seeding PharmaFlow database…'))
 
         # Suppliers
@@ -0,0 +1,29 @@
+"""
+Management command: python manage.py snapshot_expiry [--keep DAYS]
+Counts unsold stock expiring within each EXPIRY_HORIZONS window and stores
+it as today's ExpirySnapshot rows for the dashboard. Run it nightly, e.g.
+    5 0 * * *  cd /srv/pharmaflow && venv/bin/python manage.py snapshot_expiry
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from pharmacy import dashboard
+from pharmacy.models import ExpirySnapshot
+
+
+class Command(BaseCommand):
+    help = "Stores today's expiry horizon counts for the dashboard"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep', type=int, default=400, help='Days of snapshots to keep (default 400)')
+
+    def handle(self, *args, **options):
+        today = timezone.now().date()
+        rows  = dashboard.snapshot_expiry(today, refresh=True)
+        pruned, _ = ExpirySnapshot.objects.filter(as_of__lt=today - timedelta(days=options['keep'])).delete()
+        dashboard.invalidate_stats()
+        for row in rows:
+            self.stdout.write(f'  within {row.days:>3} days: {row.medicines} medicine(s), {row.units} unit(s)')
+        self.stdout.write(self.style.SUCCESS(f'✅ Snapshot for {today} stored ({pruned} old row(s) pruned).'))
@@ -0,0 +1,65 @@
+# Generated by Django 5.1.15 on 2026-10-18 05:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pharmacy', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['name', 'id'], name='customer_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medicine',
+            index=models.Index(fields=['name', 'id'], name='medicine_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medicine',
+            index=models.Index(fields=['category', 'name', 'id'], name='medicine_category_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medicine',
+            index=models.Index(fields=['expiry_date'], name='medicine_expiry_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medicine',
+            index=models.Index(condition=models.Q(('stock', 0)), fields=['name', 'id'], name='medicine_out_of_stock_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medicine',
+            index=models.Index(condition=models.Q(('stock__gte', 1), ('stock__lte', 20)), fields=['stock', 'name'], name='medicine_low_stock_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchase',
+            index=models.Index(fields=['-purchase_date', '-created', '-id'], name='purchase_list_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchase',
+            index=models.Index(fields=['-created'], name='purchase_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchase',
+            index=models.Index(fields=['medicine', '-purchase_date'], name='purchase_medicine_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['-sale_date', '-created', '-id'], name='sale_list_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['-created'], name='sale_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['medicine', '-sale_date'], name='sale_medicine_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='supplier',
+            index=models.Index(fields=['name', 'id'], name='supplier_name_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+"""
+pg_trgm GIN indexes on UPPER(name) for medicine, customer and supplier
+search. PostgreSQL only; other backends skip this migration's SQL.
+"""
+from django.db import migrations
+
+TRIGRAM_INDEXES = [
+    ('medicine_name_trgm_idx', 'pharmacy_medicine'),
+    ('customer_name_trgm_idx', 'pharmacy_customer'),
+    ('supplier_name_trgm_idx', 'pharmacy_supplier'),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin (UPPER(name) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _ in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pharmacy', '0002_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.1.15 on 2026-10-18 05:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def open_ledger(apps, schema_editor):
+    """Seed one opening movement per medicine so the ledger matches current stock."""
+    Medicine      = apps.get_model('pharmacy', 'Medicine')
+    StockMovement = apps.get_model('pharmacy', 'StockMovement')
+    db = schema_editor.connection.alias
+    batch = []
+    for pk, stock in Medicine.objects.using(db).exclude(stock=0).values_list('pk', 'stock').iterator(chunk_size=2000):
+        batch.append(StockMovement(medicine_id=pk, quantity=stock, reason='opening', reference='Opening stock'))
+        if len(batch) >= 2000:
+            StockMovement.objects.using(db).bulk_create(batch)
+            batch = []
+    StockMovement.objects.using(db).bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pharmacy', '0003_trigram_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField(help_text='Signed: positive adds stock, negative removes it.')),
+                ('reason', models.CharField(choices=[('opening', 'Opening stock'), ('purchase', 'Purchase'), ('sale', 'Sale'), ('adjustment', 'Adjustment')], max_length=20)),
+                ('reference', models.CharField(blank=True, max_length=100)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('medicine', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movements', to='pharmacy.medicine')),
+            ],
+            options={
+                'ordering': ['-created', '-id'],
+                'indexes': [models.Index(fields=['medicine', 'created'], name='movement_medicine_idx')],
+            },
+        ),
+        migrations.RunPython(open_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.15 on 2026-10-18 05:33
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pharmacy', '0004_stock_movement'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Invoice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_price', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('invoice_date', models.DateField(default=django.utils.timezone.now)),
+                ('notes', models.TextField(blank=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('customer', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='pharmacy.customer')),
+            ],
+            options={
+                'ordering': ['-invoice_date', '-created'],
+            },
+        ),
+        migrations.AddField(
+            model_name='sale',
+            name='invoice',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='lines', to='pharmacy.invoice'),
+        ),
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['-invoice_date', '-created', '-id'], name='invoice_list_idx'),
+        ),
+    ]
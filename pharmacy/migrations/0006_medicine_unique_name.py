@@ -0,0 +1,33 @@
+# Generated by Django 5.1.15 on 2026-10-18 05:35
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def rename_duplicates(apps, schema_editor):
+    """Suffix repeated medicine names with their id so the constraint can be added."""
+    Medicine = apps.get_model('pharmacy', 'Medicine')
+    db = schema_editor.connection.alias
+    dupes = (
+        Medicine.objects.using(db).values('name')
+        .annotate(n=Count('id')).filter(n__gt=1).values_list('name', flat=True)
+    )
+    for name in list(dupes):
+        for med in Medicine.objects.using(db).filter(name=name).order_by('id')[1:]:
+            med.name = f'{name} (#{med.pk})'[:200]
+            med.save(update_fields=['name'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pharmacy', '0005_invoice'),
+    ]
+
+    operations = [
+        migrations.RunPython(rename_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='medicine',
+            constraint=models.UniqueConstraint(fields=('name',), name='medicine_unique_name'),
+        ),
+    ]
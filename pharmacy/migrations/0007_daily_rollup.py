@@ -0,0 +1,61 @@
+# Generated by Django 5.1.15 on 2026-10-18 05:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def fill_rollups(apps, schema_editor):
+    """Summarise existing sales and purchases into DailyRollup rows."""
+    Sale        = apps.get_model('pharmacy', 'Sale')
+    Purchase    = apps.get_model('pharmacy', 'Purchase')
+    DailyRollup = apps.get_model('pharmacy', 'DailyRollup')
+    db = schema_editor.connection.alias
+    rows = {}
+    for model, date_field, fields in (
+        (Sale,     'sale_date',     ('sold_qty', 'revenue', 'sales_count')),
+        (Purchase, 'purchase_date', ('purchased_qty', 'cost', 'purchases_count')),
+    ):
+        grouped = (
+            model.objects.using(db).order_by()
+            .values(date_field, 'medicine_id', 'medicine__category')
+            .annotate(qty=Sum('quantity'), total=Sum('total_price'), n=Count('pk'))
+        )
+        for r in grouped.iterator(chunk_size=2000):
+            key = (r[date_field], r['medicine_id'])
+            if key not in rows:
+                rows[key] = DailyRollup(day=key[0], medicine_id=key[1], category=r['medicine__category'])
+            for field, value in zip(fields, (r['qty'], r['total'], r['n'])):
+                setattr(rows[key], field, value)
+    DailyRollup.objects.using(db).bulk_create(rows.values(), batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pharmacy', '0006_medicine_unique_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('category', models.CharField(max_length=50)),
+                ('sold_qty', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('sales_count', models.IntegerField(default=0)),
+                ('purchased_qty', models.IntegerField(default=0)),
+                ('cost', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('purchases_count', models.IntegerField(default=0)),
+                ('medicine', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='pharmacy.medicine')),
+            ],
+            options={
+                'ordering': ['-day'],
+                'indexes': [models.Index(fields=['category', 'day'], name='rollup_category_day_idx'), models.Index(fields=['medicine', 'day'], name='rollup_medicine_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('day', 'medicine'), name='rollup_day_medicine')],
+            },
+        ),
+        migrations.RunPython(fill_rollups, migrations.RunPython.noop),
+    ]
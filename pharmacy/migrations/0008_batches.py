@@ -0,0 +1,76 @@
+# Generated by Django 5.1.15 on 2026-10-18 05:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def open_batches(apps, schema_editor):
+    """Put each medicine's current stock into one opening batch at its expiry date."""
+    Medicine = apps.get_model('pharmacy', 'Medicine')
+    Batch    = apps.get_model('pharmacy', 'Batch')
+    db = schema_editor.connection.alias
+    Batch.objects.using(db).bulk_create(
+        (
+            Batch(
+                medicine_id=pk, lot_number='Opening stock', expiry_date=expiry_date,
+                quantity=units, remaining=units,
+            )
+            for pk, units, expiry_date in Medicine.objects.using(db).filter(stock__gt=0)
+            .values_list('pk', 'stock', 'expiry_date').iterator(chunk_size=2000)
+        ),
+        batch_size=2000,
+    )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pharmacy', '0007_daily_rollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='purchase',
+            name='expiry_date',
+            field=models.DateField(blank=True, help_text="Lot expiry; defaults to the medicine's expiry date.", null=True),
+        ),
+        migrations.AddField(
+            model_name='purchase',
+            name='lot_number',
+            field=models.CharField(blank=True, max_length=50),
+        ),
+        migrations.CreateModel(
+            name='Batch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lot_number', models.CharField(blank=True, max_length=50)),
+                ('expiry_date', models.DateField()),
+                ('quantity', models.PositiveIntegerField(help_text='Units received.')),
+                ('remaining', models.PositiveIntegerField()),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('medicine', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='batches', to='pharmacy.medicine')),
+                ('purchase', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='batches', to='pharmacy.purchase')),
+            ],
+            options={
+                'verbose_name_plural': 'batches',
+                'ordering': ['expiry_date', 'id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SaleAllocation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField()),
+                ('batch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='allocations', to='pharmacy.batch')),
+                ('sale', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='allocations', to='pharmacy.sale')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='batch',
+            index=models.Index(condition=models.Q(('remaining__gt', 0)), fields=['medicine', 'expiry_date', 'id', 'remaining'], name='batch_fefo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='batch',
+            index=models.Index(condition=models.Q(('remaining__gt', 0)), fields=['expiry_date', 'medicine', 'remaining'], name='batch_expiry_idx'),
+        ),
+        migrations.RunPython(open_batches, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.15 on 2026-10-18 05:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pharmacy', '0008_batches'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExpirySnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('as_of', models.DateField()),
+                ('days', models.PositiveSmallIntegerField()),
+                ('medicines', models.PositiveIntegerField(default=0)),
+                ('units', models.PositiveIntegerField(default=0)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-as_of', 'days'],
+                'constraints': [models.UniqueConstraint(fields=('as_of', 'days'), name='expiry_snapshot_day_horizon')],
+            },
+        ),
+    ]
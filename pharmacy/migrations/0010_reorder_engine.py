@@ -0,0 +1,89 @@
+# Generated by Django 5.1.15 on 2026-10-18 05:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pharmacy', '0009_expiry_snapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PurchaseOrder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('draft', 'Draft'), ('ordered', 'Ordered'), ('received', 'Received'), ('cancelled', 'Cancelled')], default='draft', max_length=20)),
+                ('ordered_on', models.DateField(blank=True, null=True)),
+                ('received_on', models.DateField(blank=True, null=True)),
+                ('notes', models.TextField(blank=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-created'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PurchaseOrderLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField()),
+                ('unit_cost', models.DecimalField(blank=True, decimal_places=2, help_text='Estimated from the last purchase.', max_digits=12, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ReorderForecast',
+            fields=[
+                ('medicine', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='forecast', serialize=False, to='pharmacy.medicine')),
+                ('daily_demand', models.FloatField(help_text='Mean units sold per day over the history window.')),
+                ('demand_std', models.FloatField(help_text='Standard deviation of daily units sold.')),
+                ('lead_time_days', models.FloatField(help_text="Supplier's average order-to-delivery time.")),
+                ('safety_stock', models.PositiveIntegerField()),
+                ('order_up_to', models.PositiveIntegerField(help_text='Stock level a reorder should bring the medicine back to.')),
+                ('computed', models.DateTimeField()),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='medicine',
+            name='medicine_low_stock_idx',
+        ),
+        migrations.AddField(
+            model_name='medicine',
+            name='reorder_point',
+            field=models.PositiveIntegerField(default=20, help_text='Stock at or below which the medicine is low; set by the reorder engine (reorder.py).'),
+        ),
+        migrations.AddIndex(
+            model_name='medicine',
+            index=models.Index(condition=models.Q(('stock__gte', 1), ('stock__lte', models.F('reorder_point'))), fields=['stock', 'name'], name='medicine_low_stock_idx'),
+        ),
+        migrations.AddField(
+            model_name='purchaseorder',
+            name='supplier',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='orders', to='pharmacy.supplier'),
+        ),
+        migrations.AddField(
+            model_name='purchase',
+            name='order',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='purchases', to='pharmacy.purchaseorder'),
+        ),
+        migrations.AddField(
+            model_name='purchaseorderline',
+            name='medicine',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='order_lines', to='pharmacy.medicine'),
+        ),
+        migrations.AddField(
+            model_name='purchaseorderline',
+            name='order',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='pharmacy.purchaseorder'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(fields=['status', 'supplier'], name='order_status_supplier_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='purchaseorderline',
+            constraint=models.UniqueConstraint(fields=('order', 'medicine'), name='order_line_medicine'),
+        ),
+    ]
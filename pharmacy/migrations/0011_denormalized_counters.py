@@ -0,0 +1,83 @@
+# Generated by Django 5.1.15 on 2026-10-18 06:00
+
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, IntegerField, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    """Count each supplier's medicines and each customer's sales, spend and latest sale."""
+    Supplier = apps.get_model('pharmacy', 'Supplier')
+    Medicine = apps.get_model('pharmacy', 'Medicine')
+    Customer = apps.get_model('pharmacy', 'Customer')
+    Sale     = apps.get_model('pharmacy', 'Sale')
+    db = schema_editor.connection.alias
+
+    def per_parent(model, parent, aggregate):
+        return Subquery(
+            model.objects.using(db).filter(**{parent: OuterRef('pk')})
+            .order_by().values(parent).annotate(value=aggregate).values('value')
+        )
+
+    Supplier.objects.using(db).update(
+        medicine_count=Coalesce(per_parent(Medicine, 'supplier', Count('pk')), 0, output_field=IntegerField()),
+    )
+    Customer.objects.using(db).update(
+        sale_count=Coalesce(per_parent(Sale, 'customer', Count('pk')), 0, output_field=IntegerField()),
+        total_spent=Coalesce(
+            per_parent(Sale, 'customer', Sum('total_price')), Value(0),
+            output_field=DecimalField(max_digits=14, decimal_places=2),
+        ),
+        last_purchase=per_parent(Sale, 'customer', Max('sale_date')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pharmacy', '0010_reorder_engine'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='last_purchase',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='sale_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='total_spent',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='supplier',
+            name='medicine_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['-sale_count', '-id'], name='customer_sales_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['-total_spent', '-id'], name='customer_spent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['-last_purchase', '-id'], name='customer_last_purchase_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['customer', '-sale_date'], name='sale_customer_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='supplier',
+            index=models.Index(fields=['-medicine_count', '-id'], name='supplier_medicines_idx'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.15 on 2026-10-18 06:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pharmacy', '0011_denormalized_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='medicine',
+            index=models.Index(fields=['updated', 'id'], name='medicine_updated_idx'),
+        ),
+    ]
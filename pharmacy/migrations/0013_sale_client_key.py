@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-18 06:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pharmacy', '0012_medicine_updated_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sale',
+            name='client_key',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,106 @@
+"""
+Archive tables for closed months of sales and purchases (see archive.py).
+On PostgreSQL both are recreated as declarative partitioned tables,
+partitioned by month on their date; archive.py adds a partition per month
+as it fills them. Other backends keep plain tables.
+"""
+import django.db.models.deletion
+from django.db import migrations, models
+
+PARTITIONED = [('SaleArchive', 'sale_date'), ('PurchaseArchive', 'purchase_date')]
+
+
+def partition_archive_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for model_name, date_field in PARTITIONED:
+        model = apps.get_model('pharmacy', model_name)
+        table = model._meta.db_table
+        schema_editor.execute(f'ALTER TABLE {table} RENAME TO {table}_plain')
+        schema_editor.execute(
+            f'CREATE TABLE {table} (LIKE {table}_plain INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+            f'PARTITION BY RANGE ({date_field})'
+        )
+        schema_editor.execute(f'DROP TABLE {table}_plain')
+        # A partitioned table's primary key must include the partition key
+        schema_editor.execute(f'ALTER TABLE {table} ADD PRIMARY KEY (id, {date_field})')
+        # Meta.indexes need no re-adding: CreateModel defers their SQL to the
+        # end of the migration, where it runs against the partitioned table.
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pharmacy', '0013_sale_client_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedCustomerTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('sale_count', models.PositiveIntegerField()),
+                ('total_spent', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('last_purchase', models.DateField()),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_totals', to='pharmacy.customer')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedPeriod',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('sales', 'Sales'), ('purchases', 'Purchases')], max_length=20)),
+                ('month', models.DateField(help_text='First day of the month.')),
+                ('rows', models.PositiveIntegerField()),
+                ('quantity', models.PositiveIntegerField()),
+                ('total', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('location', models.CharField(help_text='Archive table or file the rows were moved to.', max_length=255)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-month', 'kind'],
+                'indexes': [models.Index(fields=['kind', '-month'], name='archived_period_kind_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PurchaseArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('purchase_date', models.DateField()),
+                ('medicine_id', models.BigIntegerField()),
+                ('supplier_id', models.BigIntegerField(null=True)),
+                ('order_id', models.BigIntegerField(null=True)),
+                ('quantity', models.PositiveIntegerField()),
+                ('total_price', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('lot_number', models.CharField(blank=True, max_length=50)),
+                ('expiry_date', models.DateField(null=True)),
+                ('notes', models.TextField(blank=True)),
+                ('created', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['-purchase_date', '-id'],
+                'indexes': [models.Index(fields=['medicine_id', 'purchase_date'], name='purchase_archive_medicine_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SaleArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('sale_date', models.DateField()),
+                ('medicine_id', models.BigIntegerField()),
+                ('customer_id', models.BigIntegerField(null=True)),
+                ('invoice_id', models.BigIntegerField(null=True)),
+                ('quantity', models.PositiveIntegerField()),
+                ('total_price', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('notes', models.TextField(blank=True)),
+                ('client_key', models.CharField(max_length=64, null=True)),
+                ('created', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['-sale_date', '-id'],
+                'indexes': [models.Index(fields=['medicine_id', 'sale_date'], name='sale_archive_medicine_idx'), models.Index(fields=['customer_id', 'sale_date'], name='sale_archive_customer_idx')],
+            },
+        ),
+        migrations.RunPython(partition_archive_tables, migrations.RunPython.noop),
+    ]
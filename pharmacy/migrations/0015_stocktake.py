@@ -0,0 +1,46 @@
+# Generated by Django 5.1.15 on 2026-10-18 06:29
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pharmacy', '0014_history_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Stocktake',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('category', models.CharField(blank=True, choices=[('antibiotic', 'Antibiotic'), ('analgesic', 'Analgesic / Pain Relief'), ('antiviral', 'Antiviral'), ('antifungal', 'Antifungal'), ('antiseptic', 'Antiseptic'), ('vitamin', 'Vitamin / Supplement'), ('cardiovascular', 'Cardiovascular'), ('dermatology', 'Dermatology'), ('gastro', 'Gastrointestinal'), ('respiratory', 'Respiratory'), ('diabetes', 'Diabetes / Endocrine'), ('other', 'Other')], help_text='Leave blank to count the whole store.', max_length=50)),
+                ('status', models.CharField(choices=[('open', 'Open'), ('applied', 'Applied'), ('cancelled', 'Cancelled')], default='open', max_length=20)),
+                ('notes', models.TextField(blank=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('applied', models.DateTimeField(blank=True, null=True)),
+                ('adjusted', models.PositiveIntegerField(default=0, help_text='Medicines whose stock the stocktake changed.')),
+            ],
+            options={
+                'ordering': ['-created'],
+            },
+        ),
+        migrations.CreateModel(
+            name='StocktakeCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('counted', models.PositiveIntegerField()),
+                ('expected', models.PositiveIntegerField(help_text='System stock when the count was recorded.')),
+                ('counted_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('medicine', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stocktake_counts', to='pharmacy.medicine')),
+                ('stocktake', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='counts', to='pharmacy.stocktake')),
+            ],
+            options={
+                'ordering': ['medicine'],
+                'constraints': [models.UniqueConstraint(fields=('stocktake', 'medicine'), name='stocktake_count_medicine')],
+            },
+        ),
+    ]
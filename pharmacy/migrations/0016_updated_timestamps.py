@@ -0,0 +1,58 @@
+# Generated by Django 5.1.15 on 2026-10-18 06:42
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_updated(apps, schema_editor):
+    """Existing rows were last changed no earlier than they were created."""
+    db = schema_editor.connection.alias
+    for name in ('Supplier', 'Customer', 'Purchase', 'Sale'):
+        apps.get_model('pharmacy', name).objects.using(db).update(updated=F('created'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pharmacy', '0015_stocktake'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='updated',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='purchase',
+            name='updated',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='sale',
+            name='updated',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='supplier',
+            name='updated',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(fill_updated, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['updated', 'id'], name='customer_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchase',
+            index=models.Index(fields=['updated', 'id'], name='purchase_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['updated', 'id'], name='sale_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='supplier',
+            index=models.Index(fields=['updated', 'id'], name='supplier_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.15 on 2026-10-18 07:43
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pharmacy', '0016_updated_timestamps'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_name', models.CharField(help_text='Model of the removed row, e.g. sale.', max_length=50)),
+                ('object_id', models.BigIntegerField()),
+                ('archived', models.BooleanField(default=False, help_text='Moved to the archive rather than deleted.')),
+                ('deleted', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['model_name', 'deleted', 'id'], name='tombstone_model_idx')],
+            },
+        ),
+    ]
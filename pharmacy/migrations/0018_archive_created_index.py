@@ -0,0 +1,21 @@
+# Generated by Django 5.1.15 on 2026-10-18 07:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pharmacy', '0017_tombstone'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='purchasearchive',
+            index=models.Index(fields=['created', 'id'], name='purchase_archive_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salearchive',
+            index=models.Index(fields=['created', 'id'], name='sale_archive_created_idx'),
+        ),
+    ]
@@ -1,9 +1,13 @@
 """
 PharmaFlow Models
 -----------------
-Medicine · Supplier · Customer · Purchase · Sale · ContactSubmission
+Medicine · Supplier · Customer · Purchase · Batch · Invoice · Sale · SaleAllocation · StockMovement ·
+DailyRollup · ExpirySnapshot · ReorderForecast · PurchaseOrder · PurchaseOrderLine · Stocktake ·
+StocktakeCount · ArchivedPeriod · SaleArchive · PurchaseArchive · ArchivedCustomerTotal · Tombstone ·
+ContactSubmission
 """
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
 from django.utils import timezone
 
 
@@ -14,15 +18,27 @@ class Supplier(models.Model):
     email   = models.EmailField(blank=True)
     address = models.TextField(blank=True)
     created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+    # Maintained by Medicine writes (see counters.py)
+    medicine_count = models.PositiveIntegerField(default=0, editable=False)
 
     class Meta:
         ordering = ['name']
+        indexes  = [
+            models.Index(fields=['name', 'id'], name='supplier_name_idx'),
+            models.Index(fields=['-medicine_count', '-id'], name='supplier_medicines_idx'),
+            models.Index(fields=['updated', 'id'], name='supplier_updated_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
 
 # ─── Medicine ─────────────────────────────────────────────────────────────────
+# Low-stock threshold until the reorder engine has sales history to go on
+DEFAULT_REORDER_POINT = 20
+
+
 class Medicine(models.Model):
     CATEGORY_CHOICES = [
         ('antibiotic',    'Antibiotic'),
@@ -48,23 +64,83 @@ class Medicine(models.Model):
         Supplier, on_delete=models.SET_NULL,
         null=True, blank=True, related_name='medicines'
     )
+    reorder_point = models.PositiveIntegerField(
+        default=DEFAULT_REORDER_POINT,
+        help_text='Stock at or below which the medicine is low; set by the reorder engine (reorder.py).',
+    )
     created     = models.DateTimeField(auto_now_add=True)
     updated     = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['name']
+        indexes  = [
+            models.Index(fields=['name', 'id'], name='medicine_name_idx'),
+            models.Index(fields=['category', 'name', 'id'], name='medicine_category_name_idx'),
+            models.Index(fields=['expiry_date'], name='medicine_expiry_idx'),
+            # API deltas (?since=) and Last-Modified
+            models.Index(fields=['updated', 'id'], name='medicine_updated_idx'),
+            # Partial indexes for the dashboard / status-filter predicates
+            models.Index(
+                fields=['name', 'id'], name='medicine_out_of_stock_idx',
+                condition=models.Q(stock=0),
+            ),
+            models.Index(
+                fields=['stock', 'name'], name='medicine_low_stock_idx',
+                condition=models.Q(stock__gte=1, stock__lte=models.F('reorder_point')),
+            ),
+        ]
+        constraints = [
+            # Import upserts match on name (bulk_create(update_conflicts=True))
+            models.UniqueConstraint(fields=['name'], name='medicine_unique_name'),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        """
+        A new medicine opens its ledger – and a first batch – with the initial
+        stock; supplier medicine counts follow the supplier field.
+        """
+        from . import batches, counters
+        is_new = self.pk is None
+        update_fields = kwargs.get('update_fields')
+        with transaction.atomic():
+            before = None
+            if not is_new and (update_fields is None or 'supplier' in update_fields):
+                before = Medicine.objects.filter(pk=self.pk).values_list('supplier_id', flat=True).first()
+            super().save(*args, **kwargs)
+            if is_new or update_fields is None or 'supplier' in update_fields:
+                counters.move_medicine(before, self.supplier_id)
+            if is_new and self.stock:
+                StockMovement.objects.create(
+                    medicine=self, quantity=self.stock,
+                    reason=StockMovement.OPENING, reference='Opening stock',
+                )
+                batches.receive(self.pk, self.stock, self.expiry_date, lot_number='Opening stock')
+
+    def delete(self, *args, **kwargs):
+        """Delete (cascading to its sales) and update supplier / customer counters."""
+        from . import counters
+        with transaction.atomic():
+            customer_ids = set(self.sales.exclude(customer=None).values_list('customer_id', flat=True).distinct())
+            supplier_id  = Medicine.objects.filter(pk=self.pk).values_list('supplier_id', flat=True).first()
+            result = super().delete(*args, **kwargs)
+            counters.move_medicine(supplier_id, None)
+            counters.refresh_customers(customer_ids)
+            return result
+
     # ── Computed helpers ──
     @property
     def is_expired(self):
-        return self.expiry_date < timezone.now().date()
+        """True while any unsold batch is past its expiry (list views annotate ``expired_stock``)."""
+        if hasattr(self, 'expired_stock'):
+            return self.expired_stock
+        return self.batches.filter(remaining__gt=0, expiry_date__lt=timezone.now().date()).exists()
 
     @property
     def is_low_stock(self):
-        return 0 < self.stock <= 20
+        return 0 < self.stock <= self.reorder_point
 
     @property
     def is_out_of_stock(self):
@@ -86,9 +162,21 @@ class Customer(models.Model):
     email   = models.EmailField(blank=True)
     address = models.TextField(blank=True)
     created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+    # Maintained by Sale writes (see counters.py)
+    sale_count    = models.PositiveIntegerField(default=0, editable=False)
+    total_spent   = models.DecimalField(max_digits=14, decimal_places=2, default=0, editable=False)
+    last_purchase = models.DateField(null=True, blank=True, editable=False)
 
     class Meta:
         ordering = ['name']
+        indexes  = [
+            models.Index(fields=['name', 'id'], name='customer_name_idx'),
+            models.Index(fields=['-sale_count', '-id'], name='customer_sales_idx'),
+            models.Index(fields=['-total_spent', '-id'], name='customer_spent_idx'),
+            models.Index(fields=['-last_purchase', '-id'], name='customer_last_purchase_idx'),
+            models.Index(fields=['updated', 'id'], name='customer_updated_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -101,32 +189,131 @@ class Purchase(models.Model):
     quantity      = models.PositiveIntegerField()
     total_price   = models.DecimalField(max_digits=12, decimal_places=2)
     purchase_date = models.DateField(default=timezone.now)
+    lot_number    = models.CharField(max_length=50, blank=True)
+    expiry_date   = models.DateField(null=True, blank=True, help_text="Lot expiry; defaults to the medicine's expiry date.")
+    order         = models.ForeignKey(
+        'PurchaseOrder', on_delete=models.SET_NULL,
+        null=True, blank=True, related_name='purchases'
+    )
     notes         = models.TextField(blank=True)
     created       = models.DateTimeField(auto_now_add=True)
+    updated       = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-purchase_date', '-created']
+        indexes  = [
+            models.Index(fields=['-purchase_date', '-created', '-id'], name='purchase_list_idx'),
+            models.Index(fields=['-created'], name='purchase_created_idx'),
+            models.Index(fields=['updated', 'id'], name='purchase_updated_idx'),
+            models.Index(fields=['medicine', '-purchase_date'], name='purchase_medicine_date_idx'),
+        ]
 
     def __str__(self):
         return f"Purchase #{self.pk} – {self.medicine} ({self.quantity} units)"
 
+    def clean(self):
+        from . import archive
+        try:
+            archive.check_open(ArchivedPeriod.PURCHASES, self.purchase_date)
+        except archive.ClosedMonth as exc:
+            raise ValidationError({'purchase_date': exc})
+
     def save(self, *args, **kwargs):
-        """Auto-increase medicine stock on new purchase."""
-        is_new = self.pk is None
-        if is_new:
-            old_qty = 0
-        else:
-            old_qty = Purchase.objects.get(pk=self.pk).quantity
-        super().save(*args, **kwargs)
-        if is_new:
-            Medicine.objects.filter(pk=self.medicine_id).update(
-                stock=models.F('stock') + self.quantity
+        """
+        Save, move the purchased quantity into stock as a batch and update the
+        rollups; raises archive.ClosedMonth for a date in an archived month.
+        """
+        from . import archive, batches, rollups, stock
+        archive.check_open(ArchivedPeriod.PURCHASES, self.purchase_date)
+        with transaction.atomic():
+            before = None
+            if self.pk is not None:
+                before = Purchase.objects.select_for_update().filter(pk=self.pk).values_list(
+                    'medicine_id', 'quantity', 'purchase_date', 'total_price'
+                ).first()
+            super().save(*args, **kwargs)
+            stock.sync(
+                StockMovement.PURCHASE, f'Purchase #{self.pk}',
+                before and before[:2], (self.medicine_id, self.quantity), sign=+1,
             )
-        else:
-            diff = self.quantity - old_qty
-            Medicine.objects.filter(pk=self.medicine_id).update(
-                stock=models.F('stock') + diff
+            batches.sync_purchase(self, before and before[:2])
+            rollups.sync_purchase(before, self.rollup_row())
+
+    def delete(self, *args, **kwargs):
+        """Delete, take the purchased quantity back out of stock and update the rollups."""
+        from . import batches, rollups, stock
+        with transaction.atomic():
+            stock.sync(
+                StockMovement.PURCHASE, f'Purchase #{self.pk} deleted',
+                (self.medicine_id, self.quantity), None, sign=+1,
             )
+            batches.withdraw_purchase(self.pk, self.medicine_id, self.quantity)
+            rollups.sync_purchase(self.rollup_row(), None)
+            return super().delete(*args, **kwargs)
+
+    def rollup_row(self):
+        return (self.medicine_id, self.quantity, self.purchase_date, self.total_price)
+
+
+# ─── Batch (lot) ──────────────────────────────────────────────────────────────
+class Batch(models.Model):
+    """
+    A lot of one medicine with its own expiry. Purchases create one; sales
+    consume them first-expiry-first-out (see batches.py). The ``remaining``
+    of a medicine's batches always adds up to ``Medicine.stock``.
+    """
+    medicine    = models.ForeignKey(Medicine, on_delete=models.CASCADE, related_name='batches')
+    purchase    = models.ForeignKey(
+        Purchase, on_delete=models.SET_NULL,
+        null=True, blank=True, related_name='batches'
+    )
+    lot_number  = models.CharField(max_length=50, blank=True)
+    expiry_date = models.DateField()
+    quantity    = models.PositiveIntegerField(help_text='Units received.')
+    remaining   = models.PositiveIntegerField()
+    created     = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['expiry_date', 'id']
+        verbose_name_plural = 'batches'
+        indexes  = [
+            # FEFO allocation: a medicine's unsold lots in expiry order
+            models.Index(
+                fields=['medicine', 'expiry_date', 'id', 'remaining'], name='batch_fefo_idx',
+                condition=models.Q(remaining__gt=0),
+            ),
+            # Expired / expiring stock across all medicines
+            models.Index(
+                fields=['expiry_date', 'medicine', 'remaining'], name='batch_expiry_idx',
+                condition=models.Q(remaining__gt=0),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.medicine} – lot {self.lot_number or self.pk} (exp. {self.expiry_date})"
+
+    @property
+    def is_expired(self):
+        return self.expiry_date < timezone.now().date()
+
+
+# ─── Invoice (multi-line sale) ────────────────────────────────────────────────
+class Invoice(models.Model):
+    """A checkout basket; each line is a Sale row (see checkout.py)."""
+    customer     = models.ForeignKey(Customer, on_delete=models.SET_NULL, null=True, blank=True)
+    total_price  = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    invoice_date = models.DateField(default=timezone.now)
+    notes        = models.TextField(blank=True)
+    created      = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-invoice_date', '-created']
+        indexes  = [
+            models.Index(fields=['-invoice_date', '-created', '-id'], name='invoice_list_idx'),
+        ]
+
+    def __str__(self):
+        return f"Invoice #{self.pk}"
 
 
 # ─── Sale (stock OUT) ─────────────────────────────────────────────────────────
@@ -136,31 +323,438 @@ class Sale(models.Model):
     quantity    = models.PositiveIntegerField()
     total_price = models.DecimalField(max_digits=12, decimal_places=2)
     sale_date   = models.DateField(default=timezone.now)
+    invoice     = models.ForeignKey(
+        Invoice, on_delete=models.PROTECT,
+        null=True, blank=True, related_name='lines'
+    )
     notes       = models.TextField(blank=True)
+    # Idempotency key of a sale replayed by a POS terminal (see pos.py)
+    client_key  = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False)
     created     = models.DateTimeField(auto_now_add=True)
+    updated     = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-sale_date', '-created']
+        indexes  = [
+            models.Index(fields=['-sale_date', '-created', '-id'], name='sale_list_idx'),
+            models.Index(fields=['-created'], name='sale_created_idx'),
+            models.Index(fields=['updated', 'id'], name='sale_updated_idx'),
+            models.Index(fields=['medicine', '-sale_date'], name='sale_medicine_date_idx'),
+            models.Index(fields=['customer', '-sale_date'], name='sale_customer_date_idx'),
+        ]
 
     def __str__(self):
         return f"Sale #{self.pk} – {self.medicine} ({self.quantity} units)"
 
+    def clean(self):
+        from . import archive
+        try:
+            archive.check_open(ArchivedPeriod.SALES, self.sale_date)
+        except archive.ClosedMonth as exc:
+            raise ValidationError({'sale_date': exc})
+
     def save(self, *args, **kwargs):
-        """Auto-decrease medicine stock on new sale."""
-        is_new = self.pk is None
-        old_qty = 0
-        if not is_new:
-            old_qty = Sale.objects.get(pk=self.pk).quantity
-        super().save(*args, **kwargs)
-        if is_new:
-            Medicine.objects.filter(pk=self.medicine_id).update(
-                stock=models.F('stock') - self.quantity
+        """
+        Save, take the sold quantity out of stock – first-expiry-first-out
+        across unexpired batches – and update the rollups and customer
+        counters; raises InsufficientStock, or archive.ClosedMonth for a
+        date in an archived month.
+        """
+        from . import archive, batches, counters, rollups, stock
+        archive.check_open(ArchivedPeriod.SALES, self.sale_date)
+        with transaction.atomic():
+            before = None
+            if self.pk is not None:
+                before = Sale.objects.select_for_update().filter(pk=self.pk).values_list(
+                    'medicine_id', 'quantity', 'sale_date', 'total_price', 'customer_id'
+                ).first()
+            super().save(*args, **kwargs)
+            stock.sync(
+                StockMovement.SALE, f'Sale #{self.pk}',
+                before and before[:2], (self.medicine_id, self.quantity), sign=-1,
             )
-        else:
-            diff = self.quantity - old_qty
-            Medicine.objects.filter(pk=self.medicine_id).update(
-                stock=models.F('stock') - diff
+            if before is None or before[:2] != (self.medicine_id, self.quantity):
+                if before:
+                    batches.release_sale(self.pk, before[:2])
+                batches.allocate_sales([self])
+            rollups.sync_sale(before and before[:4], self.rollup_row())
+            counters.sync_sale(before and (before[4], before[3], before[2]), self.counter_row())
+
+    def delete(self, *args, **kwargs):
+        """
+        Delete, put the sold quantity back into stock (and its batches) and
+        update the rollups and customer counters.
+        """
+        from . import batches, counters, rollups, stock
+        with transaction.atomic():
+            stock.sync(
+                StockMovement.SALE, f'Sale #{self.pk} deleted',
+                (self.medicine_id, self.quantity), None, sign=-1,
             )
+            batches.release_sale(self.pk, (self.medicine_id, self.quantity))
+            rollups.sync_sale(self.rollup_row(), None)
+            if self.invoice_id:
+                Invoice.objects.filter(pk=self.invoice_id).update(
+                    total_price=models.F('total_price') - self.total_price
+                )
+            result = super().delete(*args, **kwargs)
+            counters.sync_sale(self.counter_row(), None)
+            return result
+
+    def rollup_row(self):
+        return (self.medicine_id, self.quantity, self.sale_date, self.total_price)
+
+    def counter_row(self):
+        return (self.customer_id, self.total_price, self.sale_date)
+
+
+class SaleAllocation(models.Model):
+    """Units of a Sale taken from one Batch."""
+    sale     = models.ForeignKey(Sale, on_delete=models.CASCADE, related_name='allocations')
+    batch    = models.ForeignKey(Batch, on_delete=models.CASCADE, related_name='allocations')
+    quantity = models.PositiveIntegerField()
+
+    def __str__(self):
+        return f"{self.quantity} × {self.batch} for sale #{self.sale_id}"
+
+
+# ─── Stock Movement (ledger) ──────────────────────────────────────────────────
+class StockMovement(models.Model):
+    """Append-only record of every change to Medicine.stock (see stock.py)."""
+    OPENING    = 'opening'
+    PURCHASE   = 'purchase'
+    SALE       = 'sale'
+    ADJUSTMENT = 'adjustment'
+    REASON_CHOICES = [
+        (OPENING,    'Opening stock'),
+        (PURCHASE,   'Purchase'),
+        (SALE,       'Sale'),
+        (ADJUSTMENT, 'Adjustment'),
+    ]
+
+    medicine  = models.ForeignKey(Medicine, on_delete=models.CASCADE, related_name='movements')
+    quantity  = models.IntegerField(help_text='Signed: positive adds stock, negative removes it.')
+    reason    = models.CharField(max_length=20, choices=REASON_CHOICES)
+    reference = models.CharField(max_length=100, blank=True)
+    created   = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created', '-id']
+        indexes  = [
+            models.Index(fields=['medicine', 'created'], name='movement_medicine_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_reason_display()} {self.quantity:+d} × {self.medicine}"
+
+
+# ─── Daily Rollup ─────────────────────────────────────────────────────────────
+class DailyRollup(models.Model):
+    """
+    Per day × medicine totals of sales and purchases, kept up to date by
+    Sale / Purchase writes (see rollups.py). ``category`` is copied from the
+    medicine so reports can group by it without a join.
+    """
+    day             = models.DateField()
+    medicine        = models.ForeignKey(Medicine, on_delete=models.CASCADE, related_name='rollups')
+    category        = models.CharField(max_length=50)
+    sold_qty        = models.IntegerField(default=0)
+    revenue         = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    sales_count     = models.IntegerField(default=0)
+    purchased_qty   = models.IntegerField(default=0)
+    cost            = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    purchases_count = models.IntegerField(default=0)
+
+    class Meta:
+        ordering    = ['-day']
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'medicine'], name='rollup_day_medicine'),
+        ]
+        indexes     = [
+            models.Index(fields=['category', 'day'], name='rollup_category_day_idx'),
+            models.Index(fields=['medicine', 'day'], name='rollup_medicine_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} – {self.medicine_id}"
+
+
+# ─── Expiry Snapshot ──────────────────────────────────────────────────────────
+class ExpirySnapshot(models.Model):
+    """
+    Unsold stock expiring within ``days`` of ``as_of``, taken nightly by
+    ``snapshot_expiry`` so the dashboard does not rescan the batches on
+    every load (see dashboard.expiry_horizons).
+    """
+    as_of     = models.DateField()
+    days      = models.PositiveSmallIntegerField()
+    medicines = models.PositiveIntegerField(default=0)
+    units     = models.PositiveIntegerField(default=0)
+    created   = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering    = ['-as_of', 'days']
+        constraints = [
+            models.UniqueConstraint(fields=['as_of', 'days'], name='expiry_snapshot_day_horizon'),
+        ]
+
+    def __str__(self):
+        return f"{self.as_of}: {self.medicines} medicines within {self.days} days"
+
+
+# ─── Reordering ───────────────────────────────────────────────────────────────
+class ReorderForecast(models.Model):
+    """Demand statistics behind a medicine's reorder point (see reorder.py)."""
+    medicine       = models.OneToOneField(Medicine, on_delete=models.CASCADE, primary_key=True, related_name='forecast')
+    daily_demand   = models.FloatField(help_text='Mean units sold per day over the history window.')
+    demand_std     = models.FloatField(help_text='Standard deviation of daily units sold.')
+    lead_time_days = models.FloatField(help_text="Supplier's average order-to-delivery time.")
+    safety_stock   = models.PositiveIntegerField()
+    order_up_to    = models.PositiveIntegerField(help_text='Stock level a reorder should bring the medicine back to.')
+    computed       = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.medicine_id}: {self.daily_demand:.1f}/day"
+
+
+class PurchaseOrder(models.Model):
+    """A restocking order to one supplier; drafts are generated by reorder.draft_orders()."""
+    DRAFT     = 'draft'
+    ORDERED   = 'ordered'
+    RECEIVED  = 'received'
+    CANCELLED = 'cancelled'
+    STATUS_CHOICES = [
+        (DRAFT,     'Draft'),
+        (ORDERED,   'Ordered'),
+        (RECEIVED,  'Received'),
+        (CANCELLED, 'Cancelled'),
+    ]
+
+    supplier    = models.ForeignKey(
+        Supplier, on_delete=models.SET_NULL,
+        null=True, blank=True, related_name='orders'
+    )
+    status      = models.CharField(max_length=20, choices=STATUS_CHOICES, default=DRAFT)
+    ordered_on  = models.DateField(null=True, blank=True)
+    received_on = models.DateField(null=True, blank=True)
+    notes       = models.TextField(blank=True)
+    created     = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created']
+        indexes  = [
+            models.Index(fields=['status', 'supplier'], name='order_status_supplier_idx'),
+        ]
+
+    def __str__(self):
+        return f"PO #{self.pk} – {self.supplier or 'No supplier'} ({self.get_status_display()})"
+
+    @property
+    def estimated_total(self):
+        return sum((line.estimated_total or 0 for line in self.lines.all()), 0)
+
+
+class PurchaseOrderLine(models.Model):
+    order     = models.ForeignKey(PurchaseOrder, on_delete=models.CASCADE, related_name='lines')
+    medicine  = models.ForeignKey(Medicine, on_delete=models.CASCADE, related_name='order_lines')
+    quantity  = models.PositiveIntegerField()
+    unit_cost = models.DecimalField(
+        max_digits=12, decimal_places=2, null=True, blank=True,
+        help_text='Estimated from the last purchase.'
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['order', 'medicine'], name='order_line_medicine'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} × {self.medicine} on PO #{self.order_id}"
+
+    @property
+    def estimated_total(self):
+        return self.unit_cost * self.quantity if self.unit_cost is not None else None
+
+
+# ─── Stocktake ────────────────────────────────────────────────────────────────
+class Stocktake(models.Model):
+    """
+    A physical count of the whole store or of one category. Counts are
+    recorded against the system stock at the time they are entered and
+    applied together as adjustment movements (see stocktake.py).
+    """
+    OPEN      = 'open'
+    APPLIED   = 'applied'
+    CANCELLED = 'cancelled'
+    STATUS_CHOICES = [
+        (OPEN,      'Open'),
+        (APPLIED,   'Applied'),
+        (CANCELLED, 'Cancelled'),
+    ]
+
+    name     = models.CharField(max_length=100)
+    category = models.CharField(
+        max_length=50, choices=Medicine.CATEGORY_CHOICES, blank=True,
+        help_text='Leave blank to count the whole store.'
+    )
+    status   = models.CharField(max_length=20, choices=STATUS_CHOICES, default=OPEN)
+    notes    = models.TextField(blank=True)
+    created  = models.DateTimeField(auto_now_add=True)
+    applied  = models.DateTimeField(null=True, blank=True)
+    adjusted = models.PositiveIntegerField(default=0, help_text='Medicines whose stock the stocktake changed.')
+
+    class Meta:
+        ordering = ['-created']
+
+    def __str__(self):
+        return f"Stocktake #{self.pk} – {self.name}"
+
+    def medicines(self):
+        """The medicines this stocktake counts."""
+        return Medicine.objects.filter(category=self.category) if self.category else Medicine.objects.all()
+
+
+class StocktakeCount(models.Model):
+    stocktake = models.ForeignKey(Stocktake, on_delete=models.CASCADE, related_name='counts')
+    medicine  = models.ForeignKey(Medicine, on_delete=models.CASCADE, related_name='stocktake_counts')
+    counted   = models.PositiveIntegerField()
+    expected  = models.PositiveIntegerField(help_text='System stock when the count was recorded.')
+    counted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering    = ['medicine']
+        constraints = [
+            # Recounts upsert on it (bulk_create(update_conflicts=True))
+            models.UniqueConstraint(fields=['stocktake', 'medicine'], name='stocktake_count_medicine'),
+        ]
+
+    def __str__(self):
+        return f"{self.counted} × {self.medicine} on stocktake #{self.stocktake_id}"
+
+    @property
+    def variance(self):
+        return self.counted - self.expected
+
+
+# ─── Archive ──────────────────────────────────────────────────────────────────
+class ArchivedPeriod(models.Model):
+    """
+    One month of sales or purchases moved out of the hot tables by
+    ``archive_history``, with its totals and where the rows went (an archive
+    table or a compressed file). Months up to the latest one archived are
+    closed (see archive.py).
+    """
+    SALES     = 'sales'
+    PURCHASES = 'purchases'
+    KIND_CHOICES = [(SALES, 'Sales'), (PURCHASES, 'Purchases')]
+
+    kind     = models.CharField(max_length=20, choices=KIND_CHOICES)
+    month    = models.DateField(help_text='First day of the month.')
+    rows     = models.PositiveIntegerField()
+    quantity = models.PositiveIntegerField()
+    total    = models.DecimalField(max_digits=14, decimal_places=2)
+    location = models.CharField(max_length=255, help_text='Archive table or file the rows were moved to.')
+    created  = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-month', 'kind']
+        indexes  = [
+            models.Index(fields=['kind', '-month'], name='archived_period_kind_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.month:%Y-%m} ({self.rows} rows)"
+
+
+class SaleArchive(models.Model):
+    """
+    A Sale from a closed month. Ids are the original ones and related rows
+    are kept as plain ids, so deleting a medicine or customer leaves its
+    history alone. On PostgreSQL the table is partitioned by month.
+    """
+    id          = models.BigIntegerField(primary_key=True)
+    sale_date   = models.DateField()
+    medicine_id = models.BigIntegerField()
+    customer_id = models.BigIntegerField(null=True)
+    invoice_id  = models.BigIntegerField(null=True)
+    quantity    = models.PositiveIntegerField()
+    total_price = models.DecimalField(max_digits=12, decimal_places=2)
+    notes       = models.TextField(blank=True)
+    client_key  = models.CharField(max_length=64, null=True)
+    created     = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-sale_date', '-id']
+        indexes  = [
+            models.Index(fields=['medicine_id', 'sale_date'], name='sale_archive_medicine_idx'),
+            models.Index(fields=['customer_id', 'sale_date'], name='sale_archive_customer_idx'),
+            models.Index(fields=['created', 'id'], name='sale_archive_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived sale #{self.pk}"
+
+
+class PurchaseArchive(models.Model):
+    """A Purchase from a closed month; see SaleArchive."""
+    id            = models.BigIntegerField(primary_key=True)
+    purchase_date = models.DateField()
+    medicine_id   = models.BigIntegerField()
+    supplier_id   = models.BigIntegerField(null=True)
+    order_id      = models.BigIntegerField(null=True)
+    quantity      = models.PositiveIntegerField()
+    total_price   = models.DecimalField(max_digits=12, decimal_places=2)
+    lot_number    = models.CharField(max_length=50, blank=True)
+    expiry_date   = models.DateField(null=True)
+    notes         = models.TextField(blank=True)
+    created       = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-purchase_date', '-id']
+        indexes  = [
+            models.Index(fields=['medicine_id', 'purchase_date'], name='purchase_archive_medicine_idx'),
+            models.Index(fields=['created', 'id'], name='purchase_archive_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived purchase #{self.pk}"
+
+
+class ArchivedCustomerTotal(models.Model):
+    """
+    A customer's sales in one archived month, so the customer counters
+    still count them after the rows have left the Sale table – whichever
+    way they were archived.
+    """
+    customer      = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='archived_totals')
+    month         = models.DateField()
+    sale_count    = models.PositiveIntegerField()
+    total_spent   = models.DecimalField(max_digits=14, decimal_places=2)
+    last_purchase = models.DateField()
+
+    def __str__(self):
+        return f"{self.customer_id} {self.month:%Y-%m}: {self.sale_count} sales"
+
+
+# ─── Tombstone ────────────────────────────────────────────────────────────────
+class Tombstone(models.Model):
+    """
+    A medicine, supplier, customer, purchase or sale that has left its table
+    – deleted, or moved out by ``archive_history`` – kept so API clients
+    syncing with ``?since=`` can drop it too (see api.py).
+    """
+    model_name = models.CharField(max_length=50, help_text='Model of the removed row, e.g. sale.')
+    object_id  = models.BigIntegerField()
+    archived   = models.BooleanField(default=False, help_text='Moved to the archive rather than deleted.')
+    deleted    = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['model_name', 'deleted', 'id'], name='tombstone_model_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.model_name} #{self.object_id} removed {self.deleted:%Y-%m-%d %H:%M}"
 
 
 # ─── Contact Submission ───────────────────────────────────────────────────────
@@ -0,0 +1,204 @@
+"""
+PharmaFlow Keyset Pagination
+----------------------------
+Cursor-based paging over a queryset ordered by the model's Meta.ordering
+(plus the primary key as a tie-breaker). Each page is a single
+``WHERE (ordering columns) past the cursor ... LIMIT n`` query, so page 500
+costs the same as page 1. Cursors are opaque, URL-safe tokens.
+"""
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+def _page_size_limits():
+    return (
+        getattr(settings, 'PAGE_SIZE', 50),
+        getattr(settings, 'MAX_PAGE_SIZE', 200),
+    )
+
+
+def _encode_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def approximate_count(queryset, exact=True):
+    """
+    Row estimate for ``queryset``. On PostgreSQL an unfiltered queryset is
+    answered from the planner statistics in ``pg_class``; anything else
+    falls back to an exact ``COUNT(*)`` – or, with ``exact=False``, returns
+    None rather than scan.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql' and not queryset.query.where:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        if row and row[0] >= 0:
+            return row[0]
+    return queryset.count() if exact else None
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+# ─── Page ─────────────────────────────────────────────────────────────────────
+class KeysetPage:
+    def __init__(self, paginator, object_list, has_next, has_previous):
+        self.paginator    = paginator
+        self.object_list  = object_list
+        self.has_next     = has_next
+        self.has_previous = has_previous
+        self.exact_count  = False
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    @property
+    def next_cursor(self):
+        if self.has_next and self.object_list:
+            return self.paginator.encode_cursor(self.object_list[-1], 'next')
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self.has_previous and self.object_list:
+            return self.paginator.encode_cursor(self.object_list[0], 'prev')
+        return None
+
+    @cached_property
+    def approximate_count(self):
+        """
+        Total rows across all pages; only queried if a template asks. None
+        when only a ``COUNT(*)`` could tell and ``exact_count`` is not set.
+        """
+        return approximate_count(self.paginator.queryset, exact=self.exact_count)
+
+
+# ─── Paginator ────────────────────────────────────────────────────────────────
+class KeysetPaginator:
+    """
+    Page through ``queryset`` by keyset.
+
+    ``ordering`` defaults to the model's ``Meta.ordering``; the primary key
+    is appended (in the direction of the last column) so every row has a
+    unique position. Only concrete, non-null model fields may be used.
+    """
+
+    def __init__(self, queryset, per_page=None, ordering=None):
+        model = queryset.model
+        default_size, max_size = _page_size_limits()
+        self.per_page = max(1, min(int(per_page or default_size), max_size))
+        ordering = list(ordering or model._meta.ordering)
+        if not any(f.lstrip('-') in ('pk', model._meta.pk.name) for f in ordering):
+            last_desc = bool(ordering) and ordering[-1].startswith('-')
+            ordering.append('-pk' if last_desc else 'pk')
+        self.ordering = [
+            ('-' if f.startswith('-') else '') + (model._meta.pk.name if f.lstrip('-') == 'pk' else f.lstrip('-'))
+            for f in ordering
+        ]
+        self.fields   = [model._meta.get_field(f.lstrip('-')) for f in self.ordering]
+        self.queryset = queryset.order_by(*self.ordering)
+
+    # ── Cursors ──
+    def encode_cursor(self, obj, direction):
+        values = [_encode_value(getattr(obj, f.attname)) for f in self.fields]
+        raw = json.dumps({'d': direction, 'v': values}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            data = json.loads(raw)
+            direction, values = data['d'], data['v']
+            if direction not in ('next', 'prev') or len(values) != len(self.fields):
+                raise InvalidCursor(cursor)
+            return direction, [f.to_python(v) for f, v in zip(self.fields, values)]
+        except (binascii.Error, ValueError, TypeError, KeyError, ValidationError) as exc:
+            raise InvalidCursor(cursor) from exc
+
+    def _seek(self, values, reverse):
+        """Q() matching rows strictly after ``values`` in (optionally reversed) order."""
+        condition = Q()
+        for i, (ordering, value) in enumerate(zip(self.ordering, values)):
+            name = ordering.lstrip('-')
+            descending = ordering.startswith('-') != reverse
+            term = Q(**{f'{name}__lt' if descending else f'{name}__gt': value})
+            for prev, prev_value in zip(self.ordering[:i], values[:i]):
+                term &= Q(**{prev.lstrip('-'): prev_value})
+            condition |= term
+        return condition
+
+    # ── Paging ──
+    def page(self, cursor=None):
+        direction, values = 'next', None
+        if cursor:
+            try:
+                direction, values = self.decode_cursor(cursor)
+            except InvalidCursor:
+                direction, values = 'next', None
+
+        backwards = direction == 'prev'
+        qs = self.queryset
+        if backwards:
+            qs = qs.reverse()
+        if values is not None:
+            qs = qs.filter(self._seek(values, backwards))
+
+        rows = list(qs[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+            return KeysetPage(self, rows, has_next=True, has_previous=has_more)
+        return KeysetPage(self, rows, has_next=has_more, has_previous=values is not None)
+
+
+def paginate(request, queryset, ordering=None):
+    """
+    Build a KeysetPage from ``?cursor=`` / ``?per_page=`` and attach
+    ``next_url`` / ``previous_url`` that keep the other query parameters.
+    Exact totals of filtered lists are opt-in: ``?count=1`` (``count_url``).
+    """
+    per_page = request.GET.get('per_page')
+    paginator = KeysetPaginator(
+        queryset,
+        per_page=per_page if per_page and per_page.isdigit() else None,
+        ordering=ordering,
+    )
+    page = paginator.page(request.GET.get('cursor'))
+    page.exact_count = request.GET.get('count') == '1'
+
+    def url_for(cursor=None, **extra):
+        params = request.GET.copy()
+        if cursor is not None:
+            params['cursor'] = cursor
+        params.update(extra)
+        return f'?{params.urlencode()}'
+
+    page.next_url     = page.next_cursor and url_for(page.next_cursor)
+    page.previous_url = page.previous_cursor and url_for(page.previous_cursor)
+    page.count_url    = url_for(count='1')
+    return page
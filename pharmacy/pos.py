@@ -0,0 +1,199 @@
+"""
+PharmaFlow POS Sync
+-------------------
+Batch ingestion of sales queued by POS terminals while offline. Each sale
+carries a client-generated idempotency key (``Sale.client_key``), so a
+batch can be replayed any number of times and every sale is recorded once.
+
+Per batch, independent of its size:
+  * one ``client_key IN (...)`` lookup on the unique index finds the sales
+    already recorded (by an earlier replay, or another request racing this
+    one),
+  * medicines and customers are resolved with one query each,
+  * the new sales are written with one ``bulk_create`` and their stock with
+    one ``stock.apply_movements`` UPDATE, FEFO batch allocation, rollups
+    and customer counters – all in a single transaction.
+
+Sales dated in an archived (closed) month are rejected: their keys have
+left the Sale table, so a replay could not be recognised.
+
+Sales are accepted in the order sent. If a medicine runs out part way, the
+sales that still fit are kept and the rest of that medicine's sales are
+rejected; the other medicines are unaffected. What each medicine can sell
+is read in one query before writing, so short medicines do not each cost a
+rolled-back attempt; only stock sold concurrently in between does. Every item gets a result:
+``created``, ``duplicate`` (with the existing sale id) or ``rejected``
+(with errors).
+"""
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from . import archive, batches, counters, dashboard, events, rollups, stock
+from .models import ArchivedPeriod, Customer, Medicine, Sale, StockMovement
+
+MAX_BATCH    = 1000
+KEY_LENGTH   = Sale._meta.get_field('client_key').max_length
+# Attempts when a concurrent replay of the same keys wins the insert
+SYNC_RETRIES = 3
+
+
+class InvalidItem(ValueError):
+    pass
+
+
+def clean_item(item):
+    """``{'key', 'medicine_id', 'quantity', 'total_price', 'sale_date', 'customer_id', 'notes'}``."""
+    if not isinstance(item, dict):
+        raise InvalidItem('Each sale must be an object.')
+    key = item.get('key')
+    if not isinstance(key, str) or not key.strip() or len(key) > KEY_LENGTH:
+        raise InvalidItem(f'key must be a non-empty string of at most {KEY_LENGTH} characters.')
+    try:
+        medicine_id = int(item['medicine'])
+        quantity    = int(item['quantity'])
+        total_price = Decimal(str(item['total_price'])) if item.get('total_price') is not None else None
+        customer_id = int(item['customer']) if item.get('customer') else None
+    except (KeyError, TypeError, ValueError, InvalidOperation):
+        raise InvalidItem('medicine and quantity are required; medicine, quantity and customer must be integers.')
+    if quantity < 1:
+        raise InvalidItem('quantity must be at least 1.')
+    if total_price is not None and (total_price < 0 or -total_price.as_tuple().exponent > 2):
+        raise InvalidItem('total_price must be a non-negative amount with at most 2 decimal places.')
+    sale_date = None
+    if item.get('sale_date'):
+        try:
+            sale_date = parse_date(str(item['sale_date']))
+        except ValueError:
+            pass
+        if sale_date is None:
+            raise InvalidItem('sale_date must be an ISO 8601 date.')
+    return {
+        'key': key.strip(), 'medicine_id': medicine_id, 'quantity': quantity, 'total_price': total_price,
+        'sale_date': sale_date, 'customer_id': customer_id, 'notes': str(item.get('notes') or ''),
+    }
+
+
+def _rejected(key, *errors):
+    return {'key': key, 'status': 'rejected', 'errors': list(errors)}
+
+
+def ingest(items, reference='POS sync'):
+    """Record a batch of offline sales; returns one result dict per item, in order."""
+    results, pending, repeats = [None] * len(items), {}, []
+    for i, item in enumerate(items):
+        try:
+            cleaned = clean_item(item)
+        except InvalidItem as exc:
+            results[i] = _rejected(item.get('key') if isinstance(item, dict) else None, str(exc))
+            continue
+        if cleaned['key'] in pending:
+            repeats.append((i, pending[cleaned['key']][0]))
+        else:
+            pending[cleaned['key']] = (i, cleaned)
+
+    for attempt in range(SYNC_RETRIES):
+        try:
+            with transaction.atomic():
+                _record(pending, results, reference)
+            break
+        except IntegrityError:
+            # A concurrent replay inserted some of these keys first: look them up again
+            if attempt == SYNC_RETRIES - 1:
+                raise
+    # A key repeated within the batch gets its first copy's outcome
+    for i, first in repeats:
+        results[i] = dict(results[first], status='duplicate') if 'sale' in results[first] else results[first]
+    transaction.on_commit(dashboard.invalidate_stats)
+    return results
+
+
+def _record(pending, results, reference):
+    existing = dict(Sale.objects.filter(client_key__in=list(pending)).values_list('client_key', 'pk'))
+    for key, pk in existing.items():
+        results[pending[key][0]] = {'key': key, 'status': 'duplicate', 'sale': pk}
+
+    new = [(i, item) for key, (i, item) in pending.items() if key not in existing]
+    medicines = Medicine.objects.only('id', 'price').in_bulk({item['medicine_id'] for _, item in new})
+    customers = set(Customer.objects.filter(
+        pk__in={item['customer_id'] for _, item in new if item['customer_id']},
+    ).values_list('pk', flat=True))
+    closed   = archive.closed_until(ArchivedPeriod.SALES)
+    accepted = []
+    for i, item in new:
+        if closed and item['sale_date'] and item['sale_date'] < closed:
+            # Archived months are closed, and their keys are no longer looked up
+            results[i] = _rejected(item['key'], f"sale_date is in an archived month (before {closed}).")
+        elif item['medicine_id'] not in medicines:
+            results[i] = _rejected(item['key'], f"Medicine #{item['medicine_id']} does not exist.")
+        elif item['customer_id'] and item['customer_id'] not in customers:
+            results[i] = _rejected(item['key'], f"Customer #{item['customer_id']} does not exist.")
+        else:
+            accepted.append((i, item))
+    accepted, _ = _fit(accepted, _available(accepted), results)
+
+    today = timezone.now().date()
+    while accepted:
+        demand = defaultdict(int)
+        for _, item in accepted:
+            demand[item['medicine_id']] += item['quantity']
+        try:
+            with transaction.atomic():
+                sales = Sale.objects.bulk_create([
+                    Sale(
+                        client_key=item['key'], medicine_id=item['medicine_id'], customer_id=item['customer_id'],
+                        quantity=item['quantity'], sale_date=item['sale_date'] or today, notes=item['notes'],
+                        total_price=item['total_price'] if item['total_price'] is not None
+                        else medicines[item['medicine_id']].price * item['quantity'],
+                    )
+                    for _, item in accepted
+                ])
+                stock.apply_movements({pk: -qty for pk, qty in demand.items()}, StockMovement.SALE, reference)
+                batches.allocate_sales(sales)
+        except stock.InsufficientStock as exc:
+            accepted, short = _fit(accepted, {exc.medicine_id: exc.available}, results)
+            if not short:
+                # Stock moved since the error was raised: give up the medicine's last sale
+                last = max(n for n, (_, item) in enumerate(accepted) if item['medicine_id'] == exc.medicine_id)
+                i, item = accepted.pop(last)
+                results[i] = _rejected(item['key'], 'Insufficient stock.')
+            continue
+        rollups.add_sales(sales)
+        counters.add_sales(sales)
+        events.sales_recorded(sales)
+        for (i, item), sale in zip(accepted, sales):
+            results[i] = {'key': item['key'], 'status': 'created', 'sale': sale.pk}
+        return
+
+
+def _available(accepted):
+    """``{medicine_id: units}`` each medicine can sell now: its stock, as far as unexpired batches hold it."""
+    return {
+        pk: min(units, sellable)
+        for pk, units, sellable in Medicine.objects.filter(
+            pk__in={item['medicine_id'] for _, item in accepted},
+        ).annotate(sellable=batches.sellable_stock()).values_list('pk', 'stock', 'sellable')
+    }
+
+
+def _fit(accepted, available, results):
+    """
+    Keep each medicine's sales, in order, while they fit in its ``available``
+    units (medicines not in it are unlimited); reject the rest. Returns the
+    kept sales and the medicines that lost any.
+    """
+    kept, used, short = [], defaultdict(int), set()
+    for i, item in accepted:
+        pk = item['medicine_id']
+        if pk in available and (pk in short or used[pk] + item['quantity'] > available[pk]):
+            short.add(pk)
+            results[i] = _rejected(
+                item['key'], f"Insufficient stock. Only {max(available[pk] - used[pk], 0)} units available.",
+            )
+            continue
+        used[pk] += item['quantity']
+        kept.append((i, item))
+    return kept, short
@@ -0,0 +1,248 @@
+"""
+PharmaFlow Reorder Engine
+-------------------------
+Per-medicine reorder points from sales history, computed for the whole
+catalogue at once with NumPy:
+
+    demand        mean / standard deviation of daily units sold over the last
+                  REORDER_HISTORY_DAYS (from DailyRollup, counted from the
+                  day the medicine was added or first sold if that is later)
+    lead time     supplier's mean days from PurchaseOrder.ordered_on to the
+                  purchase that received it (REORDER_DEFAULT_LEAD_DAYS until
+                  it has received orders)
+    safety stock  z(REORDER_SERVICE_LEVEL) × σ × √lead
+    reorder point mean × lead + safety stock
+    order-up-to   reorder point + mean × REORDER_REVIEW_DAYS
+
+``forecast()`` stores the statistics in ReorderForecast and the reorder
+point on Medicine, where the low-stock filters read it.
+``draft_orders()`` turns everything at or below its reorder point into
+draft PurchaseOrders, one per supplier, net of what is already on order.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from statistics import NormalDist
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from . import dashboard, events
+from .models import (
+    DEFAULT_REORDER_POINT, DailyRollup, Medicine, Purchase, PurchaseOrder, PurchaseOrderLine, ReorderForecast,
+)
+
+CENT = Decimal('0.01')
+
+
+class OrderStateError(Exception):
+    """A purchase order cannot make the requested status change."""
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError as exc:
+        raise ImproperlyConfigured('The reorder engine needs the numpy package (pip install numpy).') from exc
+    return numpy
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+# ─── Forecast ─────────────────────────────────────────────────────────────────
+def lead_times(np, today):
+    """``(supplier_ids, mean_days)`` arrays from orders received in the last year."""
+    rows = list(
+        Purchase.objects.filter(
+            order__ordered_on__isnull=False, order__supplier__isnull=False,
+            purchase_date__gte=today - timedelta(days=365),
+        ).values_list('order_id', 'order__supplier_id', 'order__ordered_on', 'purchase_date').distinct()
+    )
+    if not rows:
+        return np.array([], dtype=np.int64), np.array([])
+    _, suppliers, ordered, received = zip(*rows)
+    days = (np.array(received, dtype='datetime64[D]') - np.array(ordered, dtype='datetime64[D]')).astype(np.int64)
+    keys, inverse = np.unique(np.array(suppliers, dtype=np.int64), return_inverse=True)
+    return keys, np.bincount(inverse, weights=np.maximum(days, 0)) / np.bincount(inverse)
+
+
+def forecast(today=None):
+    """
+    Recompute every medicine's demand statistics and reorder point. Returns
+    ``{'medicines', 'with_history', 'changed', 'low'}``.
+    """
+    np = _numpy()
+    today   = today or timezone.now().date()
+    window  = max(_setting('REORDER_HISTORY_DAYS', 90), 2)
+    review  = _setting('REORDER_REVIEW_DAYS', 14)
+    z       = NormalDist().inv_cdf(_setting('REORDER_SERVICE_LEVEL', 0.95))
+    start   = today - timedelta(days=window - 1)
+
+    meds = list(
+        Medicine.objects.order_by('pk')
+        .values_list('pk', Coalesce('supplier_id', Value(0)), 'stock', 'reorder_point', TruncDate('created'))
+    )
+    if not meds:
+        return {'medicines': 0, 'with_history': 0, 'changed': 0, 'low': 0}
+    ids, suppliers, stock, current, created = (np.array(column) for column in zip(*meds))
+    ids, n = ids.astype(np.int64), len(meds)
+
+    # Daily demand matrix: one row per medicine, one column per day
+    demand = np.zeros((n, window))
+    first  = np.clip((created.astype('datetime64[D]') - np.datetime64(start)).astype(np.int64), 0, window - 1)
+    sold = list(
+        DailyRollup.objects.filter(day__range=(start, today), sold_qty__gt=0)
+        .values_list('medicine_id', 'day', 'sold_qty')
+    )
+    if sold:
+        medicine_ids, days, quantities = zip(*sold)
+        rows = np.searchsorted(ids, np.array(medicine_ids, dtype=np.int64))
+        cols = (np.array(days, dtype='datetime64[D]') - np.datetime64(start)).astype(np.int64)
+        np.add.at(demand, (rows, cols), np.array(quantities, dtype=float))
+        # History loaded with an earlier date than the medicine row itself
+        np.minimum.at(first, rows, cols)
+
+    # Only count days since the medicine was added
+    active = window - first
+    mask   = np.arange(window)[None, :] >= first[:, None]
+    mean   = demand.sum(axis=1) / active
+    std    = np.sqrt((((demand - mean[:, None]) ** 2) * mask).sum(axis=1) / np.maximum(active - 1, 1))
+
+    lead = np.full(n, float(_setting('REORDER_DEFAULT_LEAD_DAYS', 7)))
+    keys, means = lead_times(np, today)
+    if len(keys):
+        index = np.clip(np.searchsorted(keys, suppliers), 0, len(keys) - 1)
+        known = keys[index] == suppliers
+        lead[known] = means[index[known]]
+
+    history = demand.any(axis=1)
+    safety  = np.ceil(z * std * np.sqrt(lead))
+    point   = np.where(history, np.ceil(mean * lead + safety), DEFAULT_REORDER_POINT).astype(np.int64)
+    up_to   = np.where(history, np.ceil(point + mean * review), 0).astype(np.int64)
+
+    changed = np.flatnonzero(point != current)
+    now = timezone.now()
+    with transaction.atomic():
+        Medicine.objects.bulk_update(
+            [Medicine(pk=int(ids[i]), reorder_point=int(point[i]), updated=now) for i in changed],
+            ['reorder_point', 'updated'], batch_size=1000,
+        )
+        ReorderForecast.objects.all().delete()
+        ReorderForecast.objects.bulk_create([
+            ReorderForecast(
+                medicine_id=int(ids[i]), daily_demand=float(mean[i]), demand_std=float(std[i]),
+                lead_time_days=float(lead[i]), safety_stock=int(safety[i]), order_up_to=int(up_to[i]),
+                computed=now,
+            )
+            for i in np.flatnonzero(history)
+        ], batch_size=2000)
+    transaction.on_commit(dashboard.invalidate_stats)
+    events.stats_changed()
+    return {
+        'medicines':    n,
+        'with_history': int(history.sum()),
+        'changed':      len(changed),
+        'low':          int(((stock >= 1) & (stock <= point)).sum()),
+    }
+
+
+# ─── Draft orders ─────────────────────────────────────────────────────────────
+def on_order():
+    """Correlated subquery: units of the outer medicine on placed, unreceived orders."""
+    return Subquery(
+        PurchaseOrderLine.objects.filter(medicine=OuterRef('pk'), order__status=PurchaseOrder.ORDERED)
+        .order_by().values('medicine')
+        .annotate(total=Sum('quantity')).values('total')
+    )
+
+
+def last_unit_cost():
+    """Correlated subquery: unit cost of the outer medicine's latest purchase."""
+    return Subquery(
+        Purchase.objects.filter(medicine=OuterRef('pk'), quantity__gt=0)
+        .order_by('-purchase_date', '-id')
+        .annotate(unit=ExpressionWrapper(
+            F('total_price') * Value(Decimal('1.00')) / F('quantity'),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        ))
+        .values('unit')[:1]
+    )
+
+
+def suggestions():
+    """Medicines at or below their reorder point, annotated with the ``suggested`` order quantity."""
+    return (
+        Medicine.objects.filter(stock__lte=F('reorder_point'), forecast__isnull=False)
+        .annotate(on_order=Coalesce(on_order(), 0))
+        .annotate(suggested=F('forecast__order_up_to') - F('stock') - F('on_order'))
+        .filter(suggested__gt=0)
+    )
+
+
+def draft_orders():
+    """Replace the draft purchase orders with fresh ones, one per supplier. Returns the orders."""
+    rows = suggestions().annotate(unit_cost=last_unit_cost()).values_list(
+        'pk', 'supplier_id', 'suggested', 'unit_cost',
+    )
+    by_supplier = defaultdict(list)
+    for medicine_id, supplier_id, quantity, unit_cost in rows.iterator(chunk_size=2000):
+        cost = Decimal(unit_cost).quantize(CENT) if unit_cost is not None else None
+        by_supplier[supplier_id].append((medicine_id, quantity, cost))
+    with transaction.atomic():
+        PurchaseOrder.objects.filter(status=PurchaseOrder.DRAFT).delete()
+        orders = PurchaseOrder.objects.bulk_create([
+            PurchaseOrder(supplier_id=supplier_id, notes='Drafted by the reorder engine')
+            for supplier_id in by_supplier
+        ])
+        PurchaseOrderLine.objects.bulk_create([
+            PurchaseOrderLine(order=order, medicine_id=medicine_id, quantity=quantity, unit_cost=cost)
+            for order, lines in zip(orders, by_supplier.values())
+            for medicine_id, quantity, cost in lines
+        ], batch_size=2000)
+    return orders
+
+
+# ─── Order workflow ───────────────────────────────────────────────────────────
+def _locked(order_id, *statuses):
+    order = PurchaseOrder.objects.select_for_update().get(pk=order_id)
+    if order.status not in statuses:
+        raise OrderStateError(f'PO #{order.pk} is {order.get_status_display().lower()}.')
+    return order
+
+
+def place_order(order_id, ordered_on=None):
+    with transaction.atomic():
+        order = _locked(order_id, PurchaseOrder.DRAFT)
+        order.status, order.ordered_on = PurchaseOrder.ORDERED, ordered_on or timezone.now().date()
+        order.save(update_fields=['status', 'ordered_on'])
+    return order
+
+
+def receive_order(order_id, received_on=None):
+    """Record a Purchase per line – moving stock in as new batches – and close the order."""
+    received_on = received_on or timezone.now().date()
+    with transaction.atomic():
+        order = _locked(order_id, PurchaseOrder.ORDERED)
+        for line in order.lines.all():
+            Purchase(
+                medicine_id=line.medicine_id, supplier_id=order.supplier_id, quantity=line.quantity,
+                total_price=(line.unit_cost or 0) * line.quantity, purchase_date=received_on,
+                order=order, notes=f'PO #{order.pk}',
+            ).save()
+        order.status, order.received_on = PurchaseOrder.RECEIVED, received_on
+        order.save(update_fields=['status', 'received_on'])
+    return order
+
+
+def cancel_order(order_id):
+    with transaction.atomic():
+        order = _locked(order_id, PurchaseOrder.DRAFT, PurchaseOrder.ORDERED)
+        order.status = PurchaseOrder.CANCELLED
+        order.save(update_fields=['status'])
+    return order
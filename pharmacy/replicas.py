@@ -0,0 +1,99 @@
+"""
+PharmaFlow Read Replicas
+------------------------
+Sends the reads of read-only requests to replica databases, everything
+else to ``default``.
+
+``ReplicaMiddleware`` marks a request as replica-safe when it is a GET /
+HEAD, its view is not decorated with ``@primary_only`` and the session has
+not written recently: every POST / PUT / PATCH / DELETE pins the session to
+the primary for ``REPLICA_STICKY_SECONDS``, so a user always reads their
+own writes even while the replicas lag behind. ``ReplicaRouter`` then
+picks a random replica alias (``DATABASE_REPLICA_URLS`` in settings) for
+each read made during such a request. Reads inside a transaction on the
+primary, writes and migrations always use ``default``.
+
+Management commands that only report can opt in with ``with reading():``.
+Without replicas configured all of this is a no-op.
+"""
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+SESSION_KEY = '_primary_until'
+
+_reading = ContextVar('pharmacy_replica_reads', default=False)
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias != DEFAULT_DB_ALIAS]
+
+
+def _sticky_seconds():
+    return getattr(settings, 'REPLICA_STICKY_SECONDS', 15)
+
+
+@contextmanager
+def reading():
+    """Route reads in this block to the replicas."""
+    token = _reading.set(True)
+    try:
+        yield
+    finally:
+        _reading.reset(token)
+
+
+def primary_only(view):
+    """View decorator: always read from the primary (e.g. read-modify-write GETs)."""
+    view.primary_only = True
+    return view
+
+
+# ─── Router ───────────────────────────────────────────────────────────────────
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = replica_aliases()
+        if not replicas or not _reading.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Every alias holds the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema through replication
+        return db == DEFAULT_DB_ALIAS
+
+
+# ─── Middleware ───────────────────────────────────────────────────────────────
+class ReplicaMiddleware:
+    """Goes after SessionMiddleware."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _reading.set(False)
+        try:
+            response = self.get_response(request)
+        finally:
+            _reading.reset(token)
+        if request.method not in ('GET', 'HEAD', 'OPTIONS') and replica_aliases():
+            request.session[SESSION_KEY] = time.time() + _sticky_seconds()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        _reading.set(
+            request.method in ('GET', 'HEAD')
+            and bool(replica_aliases())
+            and not getattr(view_func, 'primary_only', False)
+            and request.session.get(SESSION_KEY, 0) < time.time()
+        )
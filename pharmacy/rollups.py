@@ -0,0 +1,248 @@
+"""
+PharmaFlow Rollups
+------------------
+Per day × medicine summary rows (DailyRollup) of quantity sold, revenue,
+quantity purchased and cost, so reports and dashboard totals read a few
+thousand pre-aggregated rows instead of every Sale / Purchase.
+
+Sale and Purchase ``save()`` / ``delete()`` push their change through
+``sync_sale`` / ``sync_purchase``; bulk write paths (checkout, imports) call
+``add_sales`` / ``add_purchases``. Each call costs a fixed handful of
+queries per day touched – one SELECT, at most one INSERT and one
+``UPDATE ... SET x = x + CASE medicine_id ... END``. ``rebuild()``
+recomputes a date range from the source tables month by month.
+"""
+import datetime
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Case, DecimalField, F, IntegerField, Sum, Value, When
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.utils import timezone
+
+from . import archive
+from .models import DailyRollup, Medicine, Purchase, Sale
+
+FIELDS = ('sold_qty', 'revenue', 'sales_count', 'purchased_qty', 'cost', 'purchases_count')
+MONEY  = {'revenue', 'cost'}
+ALIASES = tuple(f'c{i}' for i in range(len(FIELDS) + 3))   # rebuild: day, medicine, category, FIELDS…
+
+
+def _day(value):
+    """DateField values can still be a datetime before the instance is reloaded."""
+    if isinstance(value, datetime.datetime):
+        return timezone.localdate(value) if timezone.is_aware(value) else value.date()
+    return value
+
+
+def _zero():
+    return [0, Decimal('0'), 0, 0, Decimal('0'), 0]
+
+
+# ─── Incremental updates ──────────────────────────────────────────────────────
+def apply(deltas):
+    """
+    Add ``{(day, medicine_id): [sold_qty, revenue, sales_count, purchased_qty,
+    cost, purchases_count]}`` to the rollup rows, creating missing ones.
+    """
+    by_day = defaultdict(dict)
+    for (day, medicine_id), values in deltas.items():
+        if any(values):
+            by_day[_day(day)][medicine_id] = values
+    for day, rows in by_day.items():
+        with transaction.atomic():
+            _apply_day(day, rows)
+
+
+def _apply_day(day, rows):
+    existing = set(
+        DailyRollup.objects.filter(day=day, medicine_id__in=rows).values_list('medicine_id', flat=True)
+    )
+    missing = rows.keys() - existing
+    if missing:
+        categories = dict(Medicine.objects.filter(pk__in=missing).values_list('pk', 'category'))
+        new = [
+            DailyRollup(day=day, medicine_id=pk, category=categories[pk], **dict(zip(FIELDS, rows[pk])))
+            for pk in missing if pk in categories
+        ]
+        try:
+            with transaction.atomic():
+                DailyRollup.objects.bulk_create(new)
+        except IntegrityError:
+            # Another writer created some of these rows first: add to them instead
+            DailyRollup.objects.bulk_create(
+                [DailyRollup(day=day, medicine_id=r.medicine_id, category=r.category) for r in new],
+                ignore_conflicts=True,
+            )
+            existing |= {r.medicine_id for r in new}
+    if not existing:
+        return
+    updates = {}
+    for index, field in enumerate(FIELDS):
+        values = {pk: rows[pk][index] for pk in existing if rows[pk][index]}
+        if values:
+            output = DecimalField(max_digits=14, decimal_places=2) if field in MONEY else IntegerField()
+            updates[field] = F(field) + Case(
+                *[When(medicine_id=pk, then=Value(v)) for pk, v in values.items()],
+                default=Value(0), output_field=output,
+            )
+    DailyRollup.objects.filter(day=day, medicine_id__in=existing).update(**updates)
+
+
+def _line_deltas(before, after, offset):
+    """Deltas for a line changing from ``before`` to ``after`` – each
+    ``(medicine_id, quantity, date, total)`` or None."""
+    deltas = defaultdict(_zero)
+    for row, sign in ((before, -1), (after, +1)):
+        if row:
+            medicine_id, quantity, day, total = row
+            values = deltas[(_day(day), medicine_id)]
+            values[offset]     += sign * quantity
+            values[offset + 1] += sign * Decimal(total)
+            values[offset + 2] += sign
+    return deltas
+
+
+def sync_sale(before, after):
+    apply(_line_deltas(before, after, 0))
+
+
+def sync_purchase(before, after):
+    apply(_line_deltas(before, after, 3))
+
+
+def _bulk_deltas(rows, offset):
+    deltas = defaultdict(_zero)
+    for medicine_id, quantity, day, total in rows:
+        values = deltas[(_day(day), medicine_id)]
+        values[offset]     += quantity
+        values[offset + 1] += Decimal(total)
+        values[offset + 2] += 1
+    return deltas
+
+
+def add_sales(sales):
+    """Record Sale objects created with bulk_create."""
+    apply(_bulk_deltas((s.rollup_row() for s in sales), 0))
+
+
+def add_purchases(purchases):
+    """Record Purchase objects created with bulk_create."""
+    apply(_bulk_deltas((p.rollup_row() for p in purchases), 3))
+
+
+# ─── Rebuild ──────────────────────────────────────────────────────────────────
+def _months(start, end):
+    month = start.replace(day=1)
+    while month <= end:
+        following = (month + datetime.timedelta(days=32)).replace(day=1)
+        yield max(month, start), min(following - datetime.timedelta(days=1), end)
+        month = following
+
+
+def rebuild(start=None, end=None):
+    """
+    Recompute the rollup rows between ``start`` and ``end`` (default: all
+    history) from Sale and Purchase, one month per transaction, leaving
+    archived months alone. Returns the number of rows written.
+    """
+    closed = archive.closed_until()
+    if start is None:
+        start = min(filter(None, [
+            Sale.objects.order_by('sale_date').values_list('sale_date', flat=True).first(),
+            Purchase.objects.order_by('purchase_date').values_list('purchase_date', flat=True).first(),
+        ]), default=None)
+        stale = DailyRollup.objects.filter(day__gte=closed) if closed else DailyRollup.objects.all()
+        if start is None:
+            stale.delete()
+            return 0
+        stale.filter(day__lt=start).delete()
+    if closed:
+        # The rollups are all that is left of archived months
+        start = max(start, closed)
+    end = end or timezone.now().date()
+    written = 0
+    for first, last in _months(start, end):
+        with transaction.atomic():
+            DailyRollup.objects.filter(day__range=(first, last)).delete()
+            written += _rebuild_range(first, last)
+    return written
+
+
+def _rebuild_range(first, last):
+    """INSERT … SELECT the rollup rows for one range from a UNION ALL of both sides."""
+    money, integer = DecimalField(max_digits=14, decimal_places=2), IntegerField()
+    one, zero, nil = Value(1, integer), Value(0, integer), Value(0, money)
+    sides = (
+        (Sale,     'sale_date',     (F('quantity'), F('total_price'), one, zero, nil, zero)),
+        (Purchase, 'purchase_date', (zero, nil, zero, F('quantity'), F('total_price'), one)),
+    )
+    selects = [
+        model.objects.filter(**{f'{date_field}__range': (first, last)}).order_by().values(
+            **dict(zip(ALIASES, (F(date_field), F('medicine_id'), F('medicine__category')) + values))
+        )
+        for model, date_field, values in sides
+    ]
+    union_sql, params = selects[0].union(selects[1], all=True).query.sql_with_params()
+    qn = connection.ops.quote_name
+    columns = ('day', 'medicine_id', 'category') + FIELDS
+    totals  = ', '.join(f'SUM({a})' for a in ALIASES[3:])
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {qn(DailyRollup._meta.db_table)} ({', '.join(qn(c) for c in columns)}) "
+            f"SELECT c0, c1, c2, {totals} FROM ({union_sql}) lines "
+            f"GROUP BY c0, c1, c2",
+            params,
+        )
+        return cursor.rowcount
+
+
+# ─── Reports ──────────────────────────────────────────────────────────────────
+PERIODS = {'day': None, 'week': TruncWeek, 'month': TruncMonth}
+
+
+def totals(start=None, end=None):
+    qs = DailyRollup.objects.all()
+    if start:
+        qs = qs.filter(day__gte=start)
+    if end:
+        qs = qs.filter(day__lte=end)
+    return qs
+
+
+def revenue_by_period(start, end, period='day'):
+    """[{'period', 'total_revenue', 'total_cost', 'units', 'sales'}] in date order."""
+    trunc = PERIODS[period]
+    qs = totals(start, end).order_by()
+    qs = qs.annotate(period=trunc('day')) if trunc else qs.annotate(period=F('day'))
+    return list(
+        qs.values('period')
+        .annotate(total_revenue=Sum('revenue'), total_cost=Sum('cost'), units=Sum('sold_qty'), sales=Sum('sales_count'))
+        .order_by('period')
+    )
+
+
+def top_sellers(start, end, limit=10, by='total_revenue'):
+    """Best-selling medicines by ``total_revenue`` or ``units``."""
+    return list(
+        totals(start, end).order_by()
+        .values('medicine_id', 'medicine__name', 'category')
+        .annotate(total_revenue=Sum('revenue'), units=Sum('sold_qty'))
+        .filter(units__gt=0)
+        .order_by(f'-{by}', 'medicine__name')[:limit]
+    )
+
+
+def category_mix(start, end):
+    rows = list(
+        totals(start, end).order_by()
+        .values('category')
+        .annotate(total_revenue=Sum('revenue'), units=Sum('sold_qty'))
+        .filter(units__gt=0)
+        .order_by('-total_revenue')
+    )
+    grand = sum((r['total_revenue'] for r in rows), Decimal('0'))
+    for r in rows:
+        r['share'] = round(r['total_revenue'] * 100 / grand, 1) if grand else 0
+    return rows
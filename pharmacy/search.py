@@ -0,0 +1,100 @@
+"""
+PharmaFlow Search
+-----------------
+Name search for medicines, customers and suppliers.
+
+On PostgreSQL the ``name`` columns carry ``pg_trgm`` GIN indexes on
+``UPPER(name)`` (migration 0003), which serve both Django's ``icontains``
+and the trigram ``%`` similarity operator, so matches are index scans and
+results are ranked by trigram similarity. Other backends fall back to
+``icontains`` ranked by prefix match.
+"""
+from django.db import connections
+from django.db.models import BooleanField, Case, FloatField, Func, Q, Value, When
+from django.db.models.functions import Upper
+
+from .models import Medicine, Supplier, Customer
+
+AUTOCOMPLETE_LIMIT     = 10
+AUTOCOMPLETE_MAX_LIMIT = 25
+
+
+class TrigramMatch(Func):
+    """``lhs % rhs`` – true when the trigram similarity exceeds pg_trgm.similarity_threshold."""
+    arg_joiner   = ' %% '
+    template     = '(%(expressions)s)'
+    output_field = BooleanField()
+
+
+def _is_postgres(queryset):
+    return connections[queryset.db].vendor == 'postgresql'
+
+
+def matching_categories(q):
+    """Category keys whose key or label contains ``q`` (resolved in Python, not SQL)."""
+    q = q.lower()
+    return [key for key, label in Medicine.CATEGORY_CHOICES if q in key or q in label.lower()]
+
+
+# ─── Filtering ────────────────────────────────────────────────────────────────
+def filter_medicines(queryset, q):
+    """The medicine_list search: name substring, or a category matching ``q``."""
+    condition = Q(name__icontains=q)
+    categories = matching_categories(q)
+    if categories:
+        condition |= Q(category__in=categories)
+    return queryset.filter(condition)
+
+
+def ranked(queryset, q, field='name'):
+    """
+    ``queryset`` narrowed to rows whose ``field`` matches ``q``, annotated with
+    ``rank`` and ordered best-first (ties by name, then pk).
+    """
+    q = q.strip()
+    if not q:
+        return queryset.none()
+    if _is_postgres(queryset):
+        from django.contrib.postgres.search import TrigramSimilarity
+
+        upper_q = Value(q.upper())
+        return queryset.filter(
+            Q(**{f'{field}__icontains': q}) | Q(TrigramMatch(Upper(field), upper_q))
+        ).annotate(
+            rank=TrigramSimilarity(Upper(field), upper_q),
+        ).order_by('-rank', field, 'pk')
+
+    return queryset.filter(**{f'{field}__icontains': q}).annotate(
+        rank=Case(
+            When(**{f'{field}__iexact': q}, then=Value(1.0)),
+            When(**{f'{field}__istartswith': q}, then=Value(0.5)),
+            default=Value(0.1),
+            output_field=FloatField(),
+        ),
+    ).order_by('-rank', field, 'pk')
+
+
+# ─── Autocomplete ─────────────────────────────────────────────────────────────
+def _medicine_result(m):
+    return {
+        'id': m.pk, 'text': m.name, 'price': str(m.price),
+        'stock': m.stock, 'expiry_date': m.expiry_date.isoformat(),
+    }
+
+
+def _contact_result(obj):
+    return {'id': obj.pk, 'text': obj.name, 'phone': obj.phone}
+
+
+AUTOCOMPLETE = {
+    'medicine': (Medicine.objects.only('id', 'name', 'price', 'stock', 'expiry_date'), _medicine_result),
+    'customer': (Customer.objects.only('id', 'name', 'phone'),                         _contact_result),
+    'supplier': (Supplier.objects.only('id', 'name', 'phone'),                         _contact_result),
+}
+
+
+def autocomplete(kind, q, limit=AUTOCOMPLETE_LIMIT):
+    """Top ``limit`` ranked matches for ``q`` as JSON-ready dicts."""
+    queryset, to_result = AUTOCOMPLETE[kind]
+    limit = max(1, min(int(limit), AUTOCOMPLETE_MAX_LIMIT))
+    return [to_result(obj) for obj in ranked(queryset.all(), q)[:limit]]
@@ -0,0 +1,50 @@
+"""
+PharmaFlow Sessions
+-------------------
+``cached_db`` sessions whose cache copies live at most
+``SESSION_CACHE_TIMEOUT`` seconds. Reads are served from the cache; every
+write still goes to ``django_session`` first, so a cache miss (a restart,
+another worker) falls back to the database.
+
+Django's ``cached_db`` keeps the cache copy for the whole session age.
+With a per-process cache such as the default local-memory one, a worker
+that did not handle a logout would then keep the ended session alive
+until it expires. Capping the copy bounds that to a short window while
+keeping almost every request off the session table.
+
+Expired rows are removed in batches by ``manage.py purge_sessions``.
+"""
+from django.conf import settings
+from django.contrib.sessions.backends import cached_db
+
+
+def timeout():
+    return getattr(settings, 'SESSION_CACHE_TIMEOUT', 60)
+
+
+class _CappedCache:
+    """Cache proxy that never stores an entry for longer than ``timeout()``."""
+
+    def __init__(self, cache):
+        self._cache = cache
+
+    def __getattr__(self, name):
+        return getattr(self._cache, name)
+
+    def __contains__(self, key):
+        return key in self._cache
+
+    def _cap(self, seconds):
+        return timeout() if seconds is None else min(seconds, timeout())
+
+    def set(self, key, value, timeout=None, version=None):
+        return self._cache.set(key, value, self._cap(timeout), version)
+
+    async def aset(self, key, value, timeout=None, version=None):
+        return await self._cache.aset(key, value, self._cap(timeout), version)
+
+
+class SessionStore(cached_db.SessionStore):
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        self._cache = _CappedCache(self._cache)
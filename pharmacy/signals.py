@@ -0,0 +1,103 @@
+"""
+PharmaFlow Signal Handlers
+--------------------------
+Keeps derived data (cached dashboard stats, template fragments and users,
+rollup categories) in step with model writes, and publishes the writes to
+the live dashboard (see events.py).
+Connected in PharmacyConfig.ready().
+"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from . import auth, dashboard, events, fragments
+from .models import Medicine, Supplier, Customer, Purchase, Invoice, Sale, StockMovement, DailyRollup, Tombstone
+
+
+@receiver(post_save, sender=Medicine)
+@receiver(post_delete, sender=Medicine)
+@receiver(post_save, sender=Supplier)
+@receiver(post_delete, sender=Supplier)
+@receiver(post_save, sender=Customer)
+@receiver(post_delete, sender=Customer)
+@receiver(post_save, sender=Purchase)
+@receiver(post_delete, sender=Purchase)
+@receiver(post_save, sender=Invoice)
+@receiver(post_save, sender=Sale)
+@receiver(post_delete, sender=Sale)
+@receiver(post_save, sender=StockMovement)
+def invalidate_dashboard(sender, **kwargs):
+    # Drop the entry once the write is visible, so a concurrent dashboard
+    # load cannot re-cache pre-commit numbers.
+    transaction.on_commit(dashboard.invalidate_stats)
+
+
+@receiver(post_save, sender=Sale)
+def publish_sale(sender, instance, created, **kwargs):
+    # Bulk paths (checkout, POS sync) call events.sales_recorded themselves
+    if created:
+        events.sales_recorded([instance])
+    else:
+        events.stats_changed()
+
+
+@receiver(post_save, sender=Purchase)
+def publish_purchase(sender, instance, created, **kwargs):
+    if created:
+        events.purchases_recorded([instance])
+    else:
+        events.stats_changed()
+
+
+@receiver(post_save, sender=Medicine)
+@receiver(post_delete, sender=Medicine)
+@receiver(post_delete, sender=Sale)
+@receiver(post_delete, sender=Purchase)
+def publish_stats(sender, **kwargs):
+    # Stock changes are published by stock.py
+    events.stats_changed()
+
+
+@receiver(post_save, sender=Supplier)
+@receiver(post_delete, sender=Supplier)
+@receiver(post_save, sender=Customer)
+@receiver(post_delete, sender=Customer)
+def publish_directory(sender, created=True, **kwargs):
+    # Only additions and removals move the dashboard's counts
+    if created:
+        events.stats_changed()
+
+
+@receiver(post_save, sender=Supplier)
+@receiver(post_delete, sender=Supplier)
+def invalidate_medicine_rows(sender, **kwargs):
+    # Cached medicine list rows show the supplier's name
+    transaction.on_commit(fragments.invalidate_rows)
+
+
+@receiver(post_delete, sender=Medicine)
+@receiver(post_delete, sender=Supplier)
+@receiver(post_delete, sender=Customer)
+@receiver(post_delete, sender=Purchase)
+@receiver(post_delete, sender=Sale)
+def record_tombstone(sender, instance, **kwargs):
+    # Lists the row in /api/<kind>/deleted/ for clients syncing with ?since=
+    Tombstone.objects.create(model_name=sender._meta.model_name, object_id=instance.pk)
+
+
+@receiver(post_save, sender=Medicine)
+def recategorise_rollups(sender, instance, created, **kwargs):
+    # Rollup rows carry a copy of the category for grouping
+    if not created:
+        DailyRollup.objects.filter(medicine=instance).exclude(category=instance.category).update(
+            category=instance.category
+        )
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def invalidate_cached_user(sender, instance, **kwargs):
+    # Drop it again after commit, in case a request re-cached the old row meanwhile
+    auth.invalidate_user(instance.pk)
+    transaction.on_commit(lambda: auth.invalidate_user(instance.pk))
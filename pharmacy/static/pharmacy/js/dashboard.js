@@ -0,0 +1,100 @@
+/* PharmaFlow – dashboard.js: live counters over Server-Sent Events */
+
+document.addEventListener('DOMContentLoaded', () => {
+
+  const root = document.getElementById('live-dashboard');
+  if (!root || !window.EventSource) return;
+
+  const RECENT = 6;
+  const LABELS = { ok: 'back in stock', low: 'low on stock', out: 'out of stock' };
+  const BADGES = { ok: 'badge-ok', low: 'badge-low', out: 'badge-out' };
+
+  // ── Counters ───────────────────────────────────────────────────
+  function setCounter(key, value) {
+    document.querySelectorAll(`[data-live="${key}"]`).forEach(el => {
+      const decimals = Number(el.dataset.decimals || 0);
+      el.textContent = Number(value).toFixed(decimals);
+    });
+  }
+
+  function addToCounter(key, amount) {
+    const el = document.querySelector(`[data-live="${key}"]`);
+    if (el) setCounter(key, Number(el.textContent.replace(/,/g, '')) + Number(amount));
+  }
+
+  // ── Recent activity ────────────────────────────────────────────
+  function cell(text, style) {
+    const td = document.createElement('td');
+    td.textContent = text;
+    if (style) td.style.cssText = style;
+    return td;
+  }
+
+  function truncate(text, n) {
+    return text.length > n ? text.slice(0, n - 1) + '…' : text;
+  }
+
+  function prependRows(kind, rows, party) {
+    const body = document.querySelector(`[data-live-rows="${kind}"]`);
+    if (!body) return;
+    rows.slice().reverse().forEach(row => {
+      const tr = document.createElement('tr');
+      const name = cell(truncate(row.medicine, 22));
+      name.className = 'fw-500';
+      tr.append(name, cell(truncate(row[party] || '—', 18), 'color:var(--slate);'),
+                cell(row.quantity), cell(`Rs ${row.total}`));
+      body.prepend(tr);
+    });
+    while (body.rows.length > RECENT) body.deleteRow(-1);
+  }
+
+  // ── Stock status changes ───────────────────────────────────────
+  const toasts = document.getElementById('live-stock');
+
+  function announce(change) {
+    if (!toasts || !window.bootstrap) return;
+    const toast = document.createElement('div');
+    toast.className = 'toast align-items-center';
+    toast.setAttribute('role', 'status');
+    const body = document.createElement('div');
+    body.className = 'toast-body d-flex justify-content-between align-items-center gap-3';
+    const link = document.createElement('a');
+    link.href = `/medicines/${change.id}/`;
+    link.className = 'text-decoration-none text-dark fw-500';
+    link.textContent = change.name;
+    const badge = document.createElement('span');
+    badge.className = `badge ${BADGES[change.status]}`;
+    badge.textContent = `${LABELS[change.status]} · ${change.stock}`;
+    body.append(link, badge);
+    toast.append(body);
+    toasts.append(toast);
+    toast.addEventListener('hidden.bs.toast', () => toast.remove());
+    new bootstrap.Toast(toast, { delay: 6000 }).show();
+  }
+
+  // ── Stream ─────────────────────────────────────────────────────
+  const source = new EventSource(root.dataset.eventsUrl);
+  const read = handler => message => handler(JSON.parse(message.data));
+
+  source.addEventListener('stats', read(stats => {
+    Object.entries(stats).forEach(([key, value]) => setCounter(key, value));
+  }));
+
+  source.addEventListener('sale', read(sales => {
+    addToCounter('total_sales', sales.count);
+    addToCounter('revenue_total', sales.total);
+    prependRows('sale', sales.rows, 'customer');
+  }));
+
+  source.addEventListener('purchase', read(purchases => {
+    prependRows('purchase', purchases.rows, 'supplier');
+  }));
+
+  source.addEventListener('stock', read(stock => {
+    setCounter('out_of_stock_count', stock.out_of_stock_count);
+    setCounter('low_stock_count', stock.low_stock_count);
+    stock.changes.forEach(announce);
+  }));
+
+  window.addEventListener('pagehide', () => source.close());
+});
@@ -44,6 +44,44 @@ document.addEventListener('DOMContentLoaded', () => {
     }
   });
 
+  // ── Autocomplete selects (medicine / customer / supplier) ─────
+  // The server renders only the selected option; matches are fetched
+  // from the autocomplete endpoint as the user types.
+  document.querySelectorAll('select[data-autocomplete]').forEach(select => {
+    const input = document.createElement('input');
+    input.type = 'search';
+    input.className = 'form-control form-control-sm mb-1';
+    input.placeholder = 'Type to search…';
+    input.autocomplete = 'off';
+    select.before(input);
+
+    let timer = null;
+    let controller = null;
+    input.addEventListener('input', () => {
+      clearTimeout(timer);
+      timer = setTimeout(async () => {
+        const q = input.value.trim();
+        if (!q) return;
+        controller?.abort();
+        controller = new AbortController();
+        const url = `${select.dataset.autocompleteUrl}?type=${select.dataset.autocomplete}&q=${encodeURIComponent(q)}`;
+        try {
+          const resp = await fetch(url, { signal: controller.signal, headers: { 'Accept': 'application/json' } });
+          const { results } = await resp.json();
+          select.replaceChildren(...results.map(r => {
+            const opt = new Option(r.stock !== undefined ? `${r.text} (${r.stock} in stock)` : r.text, r.id);
+            if (r.price !== undefined) opt.dataset.price = r.price;
+            return opt;
+          }));
+          if (!results.length) select.append(new Option('No matches', ''));
+          select.dispatchEvent(new Event('change'));
+        } catch (err) {
+          if (err.name !== 'AbortError') console.error(err);
+        }
+      }, 200);
+    });
+  });
+
   // ── Purchase/Sale: auto-fill price from medicine selection ─────
   const medicineSelect = document.getElementById('id_medicine');
   const priceInput     = document.getElementById('id_total_price');
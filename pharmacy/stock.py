@@ -0,0 +1,162 @@
+"""
+PharmaFlow Stock Engine
+-----------------------
+Every change to ``Medicine.stock`` goes through here. Each change is a
+single conditional ``UPDATE`` – stock is only taken out ``WHERE stock >= qty``
+– so concurrent sales at two counters cannot oversell, plus one row in the
+append-only StockMovement ledger. ``Medicine.stock`` can be rebuilt from the
+ledger in one bulk statement.
+"""
+from collections import defaultdict
+from itertools import chain
+
+from django.db import transaction
+from django.db.models import F, Func, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import events
+from .models import Medicine, StockMovement
+
+
+class _ShortUpdate(Exception):
+    """A conditional stock UPDATE matched fewer rows than it targeted."""
+
+
+class InsufficientStock(Exception):
+    def __init__(self, medicine_id, requested, available):
+        self.medicine_id = medicine_id
+        self.requested   = requested
+        self.available   = available
+        super().__init__(
+            f"Insufficient stock: {requested} units requested, only {available} available."
+        )
+
+
+# ─── Movements ────────────────────────────────────────────────────────────────
+def apply_movement(medicine_id, quantity, reason, reference=''):
+    """
+    Add ``quantity`` (negative to remove) to a medicine's stock and append the
+    movement to the ledger, atomically. Raises InsufficientStock instead of
+    letting stock go below zero.
+    """
+    with transaction.atomic():
+        target = Medicine.objects.filter(pk=medicine_id)
+        if quantity < 0:
+            target = target.filter(stock__gte=-quantity)
+        if not target.update(stock=F('stock') + quantity, updated=timezone.now()):
+            available = Medicine.objects.filter(pk=medicine_id).values_list('stock', flat=True).first()
+            if available is None:
+                raise Medicine.DoesNotExist(f'Medicine {medicine_id} does not exist.')
+            raise InsufficientStock(medicine_id, -quantity, available)
+        events.stock_moved({medicine_id: quantity})
+        return StockMovement.objects.create(
+            medicine_id=medicine_id, quantity=quantity, reason=reason, reference=reference,
+        )
+
+
+def sync(reason, reference, before, after, sign):
+    """
+    Move stock for a transaction line that changed from ``before`` to
+    ``after`` – each a ``(medicine_id, quantity)`` pair, or None when the line
+    is being created / deleted. ``sign`` is +1 for stock in, -1 for stock out.
+    """
+    deltas = defaultdict(int)
+    if before:
+        deltas[before[0]] -= sign * before[1]
+    if after:
+        deltas[after[0]] += sign * after[1]
+    with transaction.atomic():
+        # Fixed order so two edits touching the same medicines cannot deadlock
+        for medicine_id, quantity in sorted(deltas.items()):
+            if quantity:
+                apply_movement(medicine_id, quantity, reason, reference)
+
+
+class PerRow(Func):
+    """
+    ``CASE id WHEN … THEN value … END`` for a ``{pk: value}`` mapping.
+
+    Same SQL as ``Case(*[When(pk=…, then=…)])``, but rendered directly: a
+    ``When`` per row builds and compiles a lookup each, which dominates a
+    thousand-row bulk update. Values are integers unless ``output_field``
+    says otherwise.
+    """
+
+    def __init__(self, values, output_field=None):
+        super().__init__(F('pk'), output_field=output_field or IntegerField())
+        self.values = values
+
+    def as_sql(self, compiler, connection, **extra_context):
+        pk, params = compiler.compile(self.source_expressions[0])
+        prep = self.output_field.get_db_prep_value
+        return (
+            f"CASE {pk}{' WHEN %s THEN %s' * len(self.values)} END",
+            (*params, *chain.from_iterable((key, prep(v, connection)) for key, v in self.values.items())),
+        )
+
+
+def _per_row(values):
+    """CASE id WHEN … THEN value … END for a ``{medicine_id: value}`` mapping."""
+    return PerRow(values)
+
+
+def apply_movements(deltas, reason, reference=''):
+    """
+    Apply ``{medicine_id: quantity}`` in one ``UPDATE ... SET stock = stock +
+    CASE id ... END WHERE id IN (...) AND stock >= CASE ...`` and bulk-insert
+    the ledger rows. All-or-nothing: if any medicine would go negative,
+    nothing changes and InsufficientStock names the first offender.
+    """
+    deltas = {pk: qty for pk, qty in deltas.items() if qty}
+    if not deltas:
+        return []
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                updated = Medicine.objects.filter(
+                    pk__in=deltas, stock__gte=_per_row({pk: max(-qty, 0) for pk, qty in deltas.items()}),
+                ).update(stock=F('stock') + _per_row(deltas), updated=timezone.now())
+                if updated != len(deltas):
+                    raise _ShortUpdate
+        except _ShortUpdate:
+            # Re-read with the partial UPDATE rolled back, so the rows it did
+            # change are not mistaken for the short ones
+            available = dict(Medicine.objects.filter(pk__in=deltas).values_list('pk', 'stock'))
+            for pk, qty in sorted(deltas.items()):
+                if pk not in available:
+                    raise Medicine.DoesNotExist(f'Medicine {pk} does not exist.')
+                if available[pk] + qty < 0:
+                    raise InsufficientStock(pk, -qty, available[pk])
+            # Stock moved again between the UPDATE and the re-read
+            pk, qty = min(deltas.items(), key=lambda item: item[1])
+            raise InsufficientStock(pk, -qty, available[pk])
+        events.stock_moved(deltas)
+        return StockMovement.objects.bulk_create([
+            StockMovement(medicine_id=pk, quantity=qty, reason=reason, reference=reference)
+            for pk, qty in deltas.items()
+        ])
+
+
+# ─── Rebuild ──────────────────────────────────────────────────────────────────
+def ledger_totals():
+    """Correlated subquery: sum of ledger movements for the outer medicine."""
+    return Subquery(
+        StockMovement.objects.filter(medicine=OuterRef('pk'))
+        .order_by().values('medicine')
+        .annotate(total=Sum('quantity')).values('total')
+    )
+
+
+def drift():
+    """Medicines whose stock disagrees with the ledger, annotated ``ledger_stock``."""
+    return Medicine.objects.annotate(
+        ledger_stock=Coalesce(ledger_totals(), 0),
+    ).exclude(stock=F('ledger_stock'))
+
+
+def rebuild_stock():
+    """Reset every drifted Medicine.stock to its ledger total in one UPDATE."""
+    return Medicine.objects.filter(pk__in=drift().values('pk')).update(
+        stock=Coalesce(ledger_totals(), 0), updated=timezone.now(),
+    )
@@ -0,0 +1,195 @@
+"""
+PharmaFlow Stocktake
+--------------------
+Physical counts of the whole store or of one category, reviewed against
+system stock and applied as adjustment movements.
+
+Counts are typed in or uploaded in bulk (``record``). Rows are resolved to
+medicines and upserted in chunks, with a fixed number of queries per chunk.
+Each count keeps the system stock read when it was recorded (``expected``):
+it means "this many units on the shelf at that moment", and applying it
+moves stock by ``counted - expected``. Sales made while the store was being
+counted are therefore not undone – the same rule as a stock edit on the
+medicine form.
+
+The review is set-based: ``summary`` is one aggregate over the count rows
+and ``lines`` / ``uncounted`` are plain (pageable) querysets. ``apply``
+locks the stocktake and, in one transaction, moves stock with
+``stock.apply_movements`` and the batches with ``batches.adjust_many``,
+``CHUNK_SIZE`` medicines at a time. Medicines in scope that were not
+counted are left alone.
+"""
+import re
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, Exists, F, OuterRef, Q, Sum
+from django.utils import timezone
+
+from . import batches, dashboard, importers, stock
+from .models import Medicine, StockMovement, Stocktake, StocktakeCount
+
+CHUNK_SIZE = 1000
+
+# ``medicine, counted`` – commas, semicolons or tabs (pasted spreadsheet cells)
+LINE = re.compile(r'^\s*(?P<medicine>.+?)\s*[,;\t]\s*(?P<counted>[^,;\t]*?)\s*$')
+
+
+class StocktakeError(Exception):
+    """A stocktake cannot make the requested change."""
+
+
+def _locked(stocktake_id, *statuses):
+    stocktake = Stocktake.objects.select_for_update().get(pk=stocktake_id)
+    if stocktake.status not in statuses:
+        raise StocktakeError(f'{stocktake} is {stocktake.get_status_display().lower()}.')
+    return stocktake
+
+
+# ─── Counting ─────────────────────────────────────────────────────────────────
+def parse_lines(text):
+    """(line number, row) pairs from pasted ``medicine, counted`` lines."""
+    for line, raw in enumerate(text.splitlines(), start=1):
+        if raw.strip():
+            match = LINE.match(raw)
+            yield line, match.groupdict() if match else {'medicine': raw.strip(), 'counted': ''}
+
+
+def read_upload(fileobj, filename):
+    """(line number, row) pairs from a .csv / .xlsx with ``medicine`` (name or id) and ``counted`` columns."""
+    for line, row in importers.read_rows(fileobj, filename):
+        yield line, {'medicine': row.get('medicine', row.get('medicine_id', '')), 'counted': row.get('counted', '')}
+
+
+def _clean(row):
+    key = str(row.get('medicine') or '').strip()
+    if not key:
+        raise ValueError('Missing medicine.')
+    try:
+        counted = Decimal(str(row.get('counted', '')).strip())
+    except InvalidOperation:
+        counted = None
+    if counted is None or counted < 0 or counted != counted.to_integral_value():
+        raise ValueError('counted: must be a whole number, 0 or more.')
+    return key, int(counted)
+
+
+def record(stocktake_id, rows):
+    """
+    Record ``(line, {'medicine': name or id, 'counted': n})`` rows and return
+    an ImportResult: ``created`` medicines counted for the first time,
+    ``updated`` recounts (the new count replaces the old one). A medicine on
+    several lines – stock kept on more than one shelf – gets their sum.
+    """
+    result, cleaned = importers.ImportResult(), []
+    for line, row in rows:
+        try:
+            cleaned.append((line, *_clean(row)))
+        except ValueError as exc:
+            result.error(line, str(exc))
+
+    with transaction.atomic():
+        stocktake = _locked(stocktake_id, Stocktake.OPEN)
+        counts    = defaultdict(int)
+        for chunk in importers.chunked(cleaned, CHUNK_SIZE):
+            keys  = {key for _, key, _ in chunk}
+            found = {}
+            for pk, name, category in Medicine.objects.filter(
+                Q(name__in=keys) | Q(pk__in={int(key) for key in keys if key.isdigit()}),
+            ).values_list('pk', 'name', 'category'):
+                found.setdefault(str(pk), (pk, name, category))
+                found[name] = (pk, name, category)
+            for line, key, counted in chunk:
+                if key not in found:
+                    result.error(line, f"Unknown medicine '{key}'.")
+                elif stocktake.category and found[key][2] != stocktake.category:
+                    result.error(line, f"'{found[key][1]}' is not in this stocktake's category.")
+                else:
+                    counts[found[key][0]] += counted
+
+        now = timezone.now()
+        for chunk in importers.chunked(sorted(counts.items()), CHUNK_SIZE):
+            chunk    = dict(chunk)
+            existing = set(stocktake.counts.filter(medicine_id__in=chunk).values_list('medicine_id', flat=True))
+            lines    = [
+                StocktakeCount(stocktake=stocktake, medicine_id=pk, counted=chunk[pk], expected=expected, counted_at=now)
+                for pk, expected in Medicine.objects.filter(pk__in=chunk).values_list('pk', 'stock')
+            ]
+            StocktakeCount.objects.bulk_create(
+                lines, update_conflicts=True,
+                unique_fields=['stocktake', 'medicine'], update_fields=['counted', 'expected', 'counted_at'],
+            )
+            result.updated += len(existing)
+            result.created += len(lines) - len(existing)
+    result.errors.sort()
+    return result
+
+
+# ─── Review ───────────────────────────────────────────────────────────────────
+def summary(stocktake):
+    """Counts, over / short lines and units, and the value of the variance, in one query."""
+    variance = F('counted') - F('expected')
+    over, short = Q(counted__gt=F('expected')), Q(counted__lt=F('expected'))
+    totals = stocktake.counts.aggregate(
+        lines=Count('pk'),
+        over=Count('pk', filter=over),
+        short=Count('pk', filter=short),
+        units_over=Sum(variance, filter=over),
+        units_short=Sum(F('expected') - F('counted'), filter=short),
+        value=Sum(variance * F('medicine__price'), output_field=DecimalField(max_digits=16, decimal_places=2)),
+    )
+    return {
+        'counted':     totals['lines'],
+        'over':        totals['over'],
+        'short':       totals['short'],
+        'units_over':  totals['units_over'] or 0,
+        'units_short': totals['units_short'] or 0,
+        'value':       totals['value'] or Decimal('0'),
+    }
+
+
+def lines(stocktake, variance_only=True):
+    qs = stocktake.counts.select_related('medicine')
+    return qs.exclude(counted=F('expected')) if variance_only else qs
+
+
+def uncounted(stocktake):
+    """Medicines in scope without a count."""
+    return stocktake.medicines().exclude(
+        Exists(StocktakeCount.objects.filter(stocktake=stocktake, medicine=OuterRef('pk')))
+    )
+
+
+# ─── Workflow ─────────────────────────────────────────────────────────────────
+def apply(stocktake_id):
+    """Move every counted medicine's stock by its variance, and close the stocktake."""
+    with transaction.atomic():
+        stocktake = _locked(stocktake_id, Stocktake.OPEN)
+        deltas = {
+            pk: counted - expected
+            for pk, counted, expected in lines(stocktake).values_list('medicine_id', 'counted', 'expected')
+        }
+        for chunk in importers.chunked(sorted(deltas.items()), CHUNK_SIZE):
+            chunk = dict(chunk)
+            try:
+                stock.apply_movements(chunk, StockMovement.ADJUSTMENT, f'Stocktake #{stocktake.pk}')
+                batches.adjust_many(chunk)
+            except stock.InsufficientStock as exc:
+                name = Medicine.objects.filter(pk=exc.medicine_id).values_list('name', flat=True).first()
+                raise StocktakeError(
+                    f"Only {exc.available} units of '{name}' are left, fewer than its count removes "
+                    f"({exc.requested}) – it has sold since it was counted. Recount it."
+                ) from exc
+        stocktake.status, stocktake.applied, stocktake.adjusted = Stocktake.APPLIED, timezone.now(), len(deltas)
+        stocktake.save(update_fields=['status', 'applied', 'adjusted'])
+    transaction.on_commit(dashboard.invalidate_stats)
+    return stocktake
+
+
+def cancel(stocktake_id):
+    with transaction.atomic():
+        stocktake = _locked(stocktake_id, Stocktake.OPEN)
+        stocktake.status = Stocktake.CANCELLED
+        stocktake.save(update_fields=['status'])
+    return stocktake
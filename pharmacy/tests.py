@@ -0,0 +1,232 @@
+"""
+PharmaFlow Tests
+----------------
+Stock integrity across the write paths: oversells are refused without
+side effects, a replayed POS batch records every sale once, and stock,
+batches and customer counters never drift from the rows they summarise.
+"""
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from . import batches, checkout, counters, pos, stock
+from .models import Customer, Invoice, Medicine, Purchase, Sale, StockMovement, Supplier
+
+
+class StockTestCase(TestCase):
+    def setUp(self):
+        self.today    = timezone.now().date()
+        self.supplier = Supplier.objects.create(name='Himal Pharma')
+        self.medicine = self.new_medicine('Paracetamol 500mg Tablet', stock=10)
+        self.other    = self.new_medicine('Amoxicillin 250mg Capsule', stock=5)
+        self.customer = Customer.objects.create(name='Asha Rai')
+
+    def new_medicine(self, name, stock):
+        return Medicine.objects.create(
+            name=name, supplier=self.supplier, price=Decimal('2.50'), stock=stock,
+            expiry_date=self.today + timedelta(days=365),
+        )
+
+    def stock_of(self, medicine):
+        return Medicine.objects.values_list('stock', flat=True).get(pk=medicine.pk)
+
+    def sell(self, quantity, medicine=None, customer=None):
+        medicine = medicine or self.medicine
+        sale = Sale(medicine=medicine, customer=customer, quantity=quantity, total_price=medicine.price * quantity)
+        sale.save()
+        return sale
+
+    def assertNoDrift(self):
+        self.assertQuerySetEqual(stock.drift(), [], msg='stock disagrees with the ledger')
+        self.assertQuerySetEqual(batches.drift(), [], msg='stock disagrees with the batches')
+        suppliers, customers = counters.drift()
+        self.assertQuerySetEqual(suppliers, [], msg='supplier counters drifted')
+        self.assertQuerySetEqual(customers, [], msg='customer counters drifted')
+
+
+# ─── Oversell ─────────────────────────────────────────────────────────────────
+class OversellTests(StockTestCase):
+    def test_apply_movements_refuses_oversell(self):
+        with self.assertRaises(stock.InsufficientStock) as raised:
+            stock.apply_movements({self.other.pk: -1, self.medicine.pk: -11}, StockMovement.SALE, 'Test')
+        self.assertEqual(
+            (raised.exception.medicine_id, raised.exception.requested, raised.exception.available),
+            (self.medicine.pk, 11, 10),
+        )
+        # All-or-nothing: the medicine that had enough is untouched too
+        self.assertEqual((self.stock_of(self.medicine), self.stock_of(self.other)), (10, 5))
+        self.assertFalse(StockMovement.objects.filter(reason=StockMovement.SALE).exists())
+        self.assertNoDrift()
+
+    def test_apply_movements_allows_selling_out(self):
+        stock.apply_movements({self.medicine.pk: -10}, StockMovement.SALE, 'Test')
+        self.assertEqual(self.stock_of(self.medicine), 0)
+
+    def test_sale_save_refuses_oversell(self):
+        with self.assertRaises(stock.InsufficientStock):
+            self.sell(11)
+        self.assertFalse(Sale.objects.exists())
+        self.assertNoDrift()
+
+    def test_checkout_refuses_oversell(self):
+        with self.assertRaises(checkout.CheckoutError) as raised:
+            checkout.checkout([(self.medicine.pk, 6), (self.other.pk, 6)], customer=self.customer)
+        self.assertEqual(raised.exception.errors, [
+            "Insufficient stock. Only 5 units of 'Amoxicillin 250mg Capsule' available.",
+        ])
+        self.assertFalse(Invoice.objects.exists())
+        self.assertFalse(Sale.objects.exists())
+        self.assertNoDrift()
+
+    def test_checkout_refuses_stock_sold_after_validation(self):
+        validate = checkout.validate
+
+        def validate_then_sell(basket):
+            medicines = validate(basket)
+            self.sell(8)   # another till sells first
+            return medicines
+
+        with mock.patch.object(checkout, 'validate', validate_then_sell):
+            with self.assertRaises(checkout.CheckoutError) as raised:
+                checkout.checkout([(self.medicine.pk, 3), (self.other.pk, 1)], customer=self.customer)
+        self.assertEqual(raised.exception.errors, [
+            "Insufficient stock. Only 2 units of 'Paracetamol 500mg Tablet' available.",
+        ])
+        self.assertFalse(Invoice.objects.exists())
+        self.assertEqual(Sale.objects.count(), 1)
+        self.assertEqual((self.stock_of(self.medicine), self.stock_of(self.other)), (2, 5))
+        self.assertNoDrift()
+
+    def test_checkout_records_every_line(self):
+        invoice = checkout.checkout([(self.medicine.pk, 3), (self.other.pk, 5), (self.medicine.pk, 1)], self.customer)
+        self.assertEqual(invoice.total_price, Decimal('22.50'))
+        self.assertEqual(
+            sorted(invoice.lines.values_list('medicine_id', 'quantity')),
+            sorted([(self.medicine.pk, 4), (self.other.pk, 5)]),
+        )
+        self.assertEqual((self.stock_of(self.medicine), self.stock_of(self.other)), (6, 0))
+        self.assertNoDrift()
+
+
+# ─── POS replay ───────────────────────────────────────────────────────────────
+class PosReplayTests(StockTestCase):
+    def items(self):
+        return [
+            {'key': 'till2-0001', 'medicine': self.medicine.pk, 'quantity': 2, 'customer': self.customer.pk},
+            {'key': 'till2-0002', 'medicine': self.other.pk, 'quantity': 1},
+            {'key': 'till2-0003', 'medicine': self.medicine.pk, 'quantity': 3, 'total_price': '6.00'},
+        ]
+
+    def test_replay_records_each_sale_once(self):
+        first = pos.ingest(self.items())
+        self.assertEqual([r['status'] for r in first], ['created'] * 3)
+
+        replay = pos.ingest(self.items())
+        self.assertEqual([r['status'] for r in replay], ['duplicate'] * 3)
+        self.assertEqual([r['sale'] for r in replay], [r['sale'] for r in first])
+        self.assertEqual(Sale.objects.count(), 3)
+        self.assertEqual((self.stock_of(self.medicine), self.stock_of(self.other)), (5, 4))
+        self.customer.refresh_from_db()
+        self.assertEqual((self.customer.sale_count, self.customer.total_spent), (1, Decimal('5.00')))
+        self.assertNoDrift()
+
+    def test_partial_replay_adds_only_new_sales(self):
+        items = self.items()
+        pos.ingest(items[:2])
+        results = pos.ingest(items)
+        self.assertEqual([r['status'] for r in results], ['duplicate', 'duplicate', 'created'])
+        self.assertEqual(Sale.objects.count(), 3)
+        self.assertNoDrift()
+
+    def test_key_repeated_within_a_batch(self):
+        item = self.items()[0]
+        results = pos.ingest([item, dict(item)])
+        self.assertEqual([r['status'] for r in results], ['created', 'duplicate'])
+        self.assertEqual(results[0]['sale'], results[1]['sale'])
+        self.assertEqual(self.stock_of(self.medicine), 8)
+
+    def test_short_medicine_sells_in_order_until_out(self):
+        items = [{'key': f'till2-{n}', 'medicine': self.medicine.pk, 'quantity': 4} for n in range(3)]
+        items.append({'key': 'till2-other', 'medicine': self.other.pk, 'quantity': 5})
+        results = pos.ingest(items)
+        self.assertEqual([r['status'] for r in results], ['created', 'created', 'rejected', 'created'])
+        self.assertEqual((self.stock_of(self.medicine), self.stock_of(self.other)), (2, 0))
+        # A rejected sale is not remembered: it can be replayed once there is stock
+        Purchase(medicine=self.medicine, supplier=self.supplier, quantity=2, total_price=Decimal('3.00')).save()
+        self.assertEqual(pos.ingest(items[2:3])[0]['status'], 'created')
+        self.assertEqual(self.stock_of(self.medicine), 0)
+        self.assertNoDrift()
+
+
+# ─── Drift ────────────────────────────────────────────────────────────────────
+class DriftTests(StockTestCase):
+    def test_sale_create_edit_delete(self):
+        sale = self.sell(4, customer=self.customer)
+        self.assertEqual(self.stock_of(self.medicine), 6)
+        self.assertNoDrift()
+
+        sale.quantity, sale.total_price = 7, Decimal('17.50')
+        sale.save()
+        self.assertEqual(self.stock_of(self.medicine), 3)
+        self.assertNoDrift()
+
+        # Moving the sale to another medicine and customer
+        walk_in = Customer.objects.create(name='Bikash Thapa')
+        sale.medicine, sale.customer, sale.quantity, sale.total_price = self.other, walk_in, 2, Decimal('5.00')
+        sale.save()
+        self.assertEqual((self.stock_of(self.medicine), self.stock_of(self.other)), (10, 3))
+        self.assertNoDrift()
+
+        sale.sale_date = self.today - timedelta(days=3)
+        sale.save()
+        self.assertNoDrift()
+
+        sale.delete()
+        self.assertEqual((self.stock_of(self.medicine), self.stock_of(self.other)), (10, 5))
+        self.assertNoDrift()
+
+    def test_purchase_create_edit_delete(self):
+        purchase = Purchase(
+            medicine=self.medicine, supplier=self.supplier, quantity=20, total_price=Decimal('30.00'),
+            lot_number='L-2031', expiry_date=self.today + timedelta(days=90),
+        )
+        purchase.save()
+        self.assertEqual(self.stock_of(self.medicine), 30)
+        self.assertNoDrift()
+
+        purchase.quantity = 12
+        purchase.save()
+        self.assertEqual(self.stock_of(self.medicine), 22)
+        self.assertNoDrift()
+
+        purchase.medicine = self.other
+        purchase.save()
+        self.assertEqual((self.stock_of(self.medicine), self.stock_of(self.other)), (10, 17))
+        self.assertNoDrift()
+
+        purchase.delete()
+        self.assertEqual((self.stock_of(self.medicine), self.stock_of(self.other)), (10, 5))
+        self.assertNoDrift()
+
+    def test_sold_purchase_cannot_be_deleted(self):
+        purchase = Purchase(medicine=self.other, quantity=10, total_price=Decimal('15.00'))
+        purchase.save()
+        self.sell(14, medicine=self.other)
+        with self.assertRaises(stock.InsufficientStock):
+            purchase.delete()
+        self.assertTrue(Purchase.objects.filter(pk=purchase.pk).exists())
+        self.assertEqual(self.stock_of(self.other), 1)
+        self.assertNoDrift()
+
+    def test_mixed_writes(self):
+        checkout.checkout([(self.medicine.pk, 2), (self.other.pk, 2)], customer=self.customer)
+        pos.ingest([{'key': 'till1-0001', 'medicine': self.other.pk, 'quantity': 1, 'customer': self.customer.pk}])
+        Purchase(medicine=self.other, supplier=self.supplier, quantity=6, total_price=Decimal('9.00')).save()
+        sale = self.sell(3, customer=self.customer)
+        sale.customer = None
+        sale.save()
+        Sale.objects.filter(invoice__isnull=False).first().delete()
+        self.assertNoDrift()
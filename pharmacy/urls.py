@@ -10,6 +10,7 @@ urlpatterns = [
 
     # Dashboard
     path('', views.home, name='home'),
+    path('dashboard/events/', views.dashboard_events, name='dashboard_events'),
 
     # Medicines
     path('medicines/',                  views.medicine_list,   name='medicine_list'),
@@ -38,8 +39,38 @@ urlpatterns = [
     # Sales
     path('sales/',                      views.sale_list,       name='sale_list'),
     path('sales/add/',                  views.sale_add,        name='sale_add'),
+    path('sales/checkout/',             views.sale_checkout,   name='sale_checkout'),
+    path('sales/sync/',                 views.pos_sync,        name='pos_sync'),
     path('sales/<int:pk>/delete/',      views.sale_delete,     name='sale_delete'),
 
+    # Reports
+    path('reports/', views.reports, name='reports'),
+
+    # Stocktakes
+    path('stocktakes/',                 views.stocktake_list,   name='stocktake_list'),
+    path('stocktakes/<int:pk>/',        views.stocktake_detail, name='stocktake_detail'),
+    path('stocktakes/<int:pk>/update/', views.stocktake_update, name='stocktake_update'),
+
+    # Reordering
+    path('reorder/',                    views.reorder_list,    name='reorder_list'),
+    path('reorder/orders/<int:pk>/',    views.order_update,    name='order_update'),
+
+    # Bulk import
+    path('import/', views.data_import, name='data_import'),
+
+    # Exports
+    path('export/<slug:kind>.csv', views.data_export, name='data_export'),
+
+    # JSON API
+    path('api/<slug:kind>/', views.api_list, name='api_list'),
+    path('api/<slug:kind>/deleted/', views.api_deleted, name='api_deleted'),
+
+    # Search
+    path('search/autocomplete/', views.autocomplete, name='autocomplete'),
+
+    # Metrics
+    path('metrics/', views.metrics, name='metrics'),
+
     # Contact
     path('contact/', views.contact, name='contact'),
 ]
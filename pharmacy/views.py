@@ -13,18 +13,36 @@ def register_view(request):
 """
 PharmaFlow Views
 """
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, logout
+from django.contrib.auth.views import redirect_to_login
+from django.core.handlers.asgi import ASGIRequest
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Q, Sum, Count, F
+from django.db import transaction
+from django.db.models import Count, F, Prefetch, Q, Sum
 from django.urls import reverse
 from django.utils import timezone
-
-from .models import Medicine, Supplier, Customer, Purchase, Sale, ContactSubmission
+from django.utils.crypto import constant_time_compare
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_date
+from django.utils.http import http_date
+
+from . import api, batches, checkout, dashboard, events, exports, fragments, importers, instrumentation, pos, reorder, rollups, search, stock, stocktake
+from .pagination import paginate
+from .replicas import primary_only
+from .models import (
+    Medicine, Supplier, Customer, Purchase, Sale, StockMovement, PurchaseOrder, PurchaseOrderLine, Stocktake,
+    ContactSubmission,
+)
 from .forms import (
     LoginForm, MedicineForm, SupplierForm, CustomerForm,
-    PurchaseForm, SaleForm, ContactForm
+    PurchaseForm, SaleForm, CheckoutForm, ImportForm, StocktakeForm, StocktakeCountForm, ContactForm
 )
 
 
@@ -50,60 +68,80 @@ def logout_view(request):
 # ─── Dashboard / Home ──────────────────────────────────────────────────────────
 @login_required
 def home(request):
-    today = timezone.now().date()
     ctx = {
-        'total_medicines':  Medicine.objects.count(),
-        'total_suppliers':  Supplier.objects.count(),
-        'total_customers':  Customer.objects.count(),
-        'total_sales':      Sale.objects.count(),
-        'low_stock':        Medicine.objects.filter(stock__gt=0, stock__lte=20),
-        'out_of_stock':     Medicine.objects.filter(stock=0),
-        'expired':          Medicine.objects.filter(expiry_date__lt=today),
-        'expiring_soon':    Medicine.objects.filter(
-                                expiry_date__gte=today,
-                                expiry_date__lte=today.replace(day=today.day)
-                            ),
-        'recent_sales':     Sale.objects.select_related('medicine', 'customer').order_by('-created')[:6],
-        'recent_purchases': Purchase.objects.select_related('medicine', 'supplier').order_by('-created')[:6],
-        'revenue_total':    Sale.objects.aggregate(t=Sum('total_price'))['t'] or 0,
-        'purchase_total':   Purchase.objects.aggregate(t=Sum('total_price'))['t'] or 0,
+        # Taken first: the live stream replays anything committed after it
+        'events_cursor': events.bus.cursor(),
+        **dashboard.get_stats(),
+        **dashboard.alert_lists(),
+        **dashboard.recent_activity(),
+        'fragments': fragments.context(fragments.ALERTS),
     }
     return render(request, 'pharmacy/home.html', ctx)
 
 
+@primary_only
+async def dashboard_events(request):
+    """Live dashboard deltas as Server-Sent Events (see events.py); needs the ASGI server."""
+    user = await request.auser()
+    if not user.is_authenticated:
+        return redirect_to_login(request.get_full_path())
+    if not isinstance(request, ASGIRequest):
+        # A WSGI worker would buffer the endless stream; 204 tells EventSource not to retry
+        return HttpResponse(status=204)
+    cursor   = request.headers.get('Last-Event-ID') or request.GET.get('after')
+    response = StreamingHttpResponse(events.stream(cursor), content_type='text/event-stream')
+    response['Cache-Control']     = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 # ─── Medicines ─────────────────────────────────────────────────────────────────
 @login_required
 def medicine_list(request):
     q        = request.GET.get('q', '').strip()
     category = request.GET.get('category', '')
     status   = request.GET.get('status', '')
-    qs       = Medicine.objects.select_related('supplier')
+    expiring = request.GET.get('expiring', '')
+    today    = timezone.now().date()
+    qs       = Medicine.objects.select_related('supplier').annotate(expired_stock=batches.expired_stock(today))
     if q:
-        qs = qs.filter(Q(name__icontains=q) | Q(category__icontains=q))
+        qs = search.filter_medicines(qs, q)
     if category:
         qs = qs.filter(category=category)
-    today = timezone.now().date()
     if status == 'expired':
-        qs = qs.filter(expiry_date__lt=today)
+        qs = qs.filter(expired_stock=True)
     elif status == 'low':
-        qs = qs.filter(stock__gt=0, stock__lte=20)
+        qs = qs.filter(stock__gte=1, stock__lte=F('reorder_point'))
     elif status == 'out':
         qs = qs.filter(stock=0)
+    horizons = dashboard.horizons()
+    if expiring.isdigit() and int(expiring) in horizons:
+        qs = qs.filter(batches.expiring_stock(int(expiring), today))
+    else:
+        expiring = ''
+    page = paginate(request, qs)
     return render(request, 'pharmacy/medicine_list.html', {
-        'medicines': qs,
+        'medicines': page.object_list,
+        'page': page,
         'q': q,
         'category': category,
         'status': status,
+        'expiring': expiring,
+        'horizons': horizons,
         'categories': Medicine.CATEGORY_CHOICES,
         'today': today,
+        'fragments': fragments.context(fragments.ROWS),
     })
 
 
 @login_required
 def medicine_detail(request, pk):
-    med = get_object_or_404(Medicine, pk=pk)
+    med = get_object_or_404(
+        Medicine.objects.select_related('supplier', 'forecast').annotate(expired_stock=batches.expired_stock()), pk=pk,
+    )
     return render(request, 'pharmacy/medicine_detail.html', {
         'med': med,
+        'batches': med.batches.filter(remaining__gt=0).select_related('purchase').order_by('expiry_date', 'id'),
         'recent_sales': med.sales.select_related('customer').order_by('-sale_date')[:10],
         'recent_purchases': med.purchases.select_related('supplier').order_by('-purchase_date')[:10],
     })
@@ -124,9 +162,23 @@ def medicine_edit(request, pk):
     med  = get_object_or_404(Medicine, pk=pk)
     form = MedicineForm(request.POST or None, instance=med)
     if request.method == 'POST' and form.is_valid():
-        form.save()
-        messages.success(request, f"'{med.name}' updated.")
-        return redirect('medicine_list')
+        # A stock edit is recorded as an adjustment relative to what the user
+        # saw (posted back with the form), so sales made while the form was
+        # open are not overwritten.
+        shown_stock = form.cleaned_data['shown_stock']
+        adjustment  = form.cleaned_data['stock'] - (form.initial['stock'] if shown_stock is None else shown_stock)
+        try:
+            with transaction.atomic():
+                med = form.save(commit=False)
+                med.save(update_fields=[f for f in form.Meta.fields if f != 'stock'] + ['updated'])
+                if adjustment:
+                    stock.apply_movement(med.pk, adjustment, StockMovement.ADJUSTMENT, 'Manual edit')
+                    batches.adjust(med.pk, adjustment)
+        except stock.InsufficientStock as exc:
+            form.add_error('stock', str(exc))
+        else:
+            messages.success(request, f"'{med.name}' updated.")
+            return redirect('medicine_list')
     return render(request, 'pharmacy/medicine_form.html', {
         'form': form, 'title': f'Edit – {med.name}', 'action': 'Save Changes', 'med': med
     })
@@ -146,13 +198,26 @@ def medicine_delete(request, pk):
 
 
 # ─── Suppliers ─────────────────────────────────────────────────────────────────
+# ?sort= → keyset ordering; each one is backed by an index on the counter
+SUPPLIER_SORTS = {
+    'name':      ['name'],
+    'medicines': ['-medicine_count'],
+}
+
+
 @login_required
 def supplier_list(request):
-    q  = request.GET.get('q', '').strip()
-    qs = Supplier.objects.annotate(med_count=Count('medicines'))
+    q    = request.GET.get('q', '').strip()
+    sort = request.GET.get('sort', '')
+    qs   = Supplier.objects.all()
     if q:
         qs = qs.filter(Q(name__icontains=q) | Q(email__icontains=q))
-    return render(request, 'pharmacy/supplier_list.html', {'suppliers': qs, 'q': q})
+    if sort not in SUPPLIER_SORTS:
+        sort = 'name'
+    page = paginate(request, qs, ordering=SUPPLIER_SORTS[sort])
+    return render(request, 'pharmacy/supplier_list.html', {
+        'suppliers': page.object_list, 'page': page, 'q': q, 'sort': sort,
+    })
 
 
 @login_required
@@ -192,13 +257,37 @@ def supplier_delete(request, pk):
 
 
 # ─── Customers ─────────────────────────────────────────────────────────────────
+CUSTOMER_SORTS = {
+    'name':   ['name'],
+    'sales':  ['-sale_count'],
+    'spend':  ['-total_spent'],
+    'recent': ['-last_purchase'],
+}
+CUSTOMER_ACTIVE_DAYS = (30, 90, 365)
+
+
 @login_required
 def customer_list(request):
-    q  = request.GET.get('q', '').strip()
-    qs = Customer.objects.annotate(sale_count=Count('sale'))
+    q      = request.GET.get('q', '').strip()
+    sort   = request.GET.get('sort', '')
+    active = request.GET.get('active', '')
+    qs     = Customer.objects.all()
     if q:
         qs = qs.filter(Q(name__icontains=q) | Q(email__icontains=q) | Q(phone__icontains=q))
-    return render(request, 'pharmacy/customer_list.html', {'customers': qs, 'q': q})
+    if active.isdigit() and int(active) in CUSTOMER_ACTIVE_DAYS:
+        qs = qs.filter(last_purchase__gte=timezone.now().date() - timedelta(days=int(active)))
+    else:
+        active = ''
+    if sort not in CUSTOMER_SORTS:
+        sort = 'name'
+    if sort == 'recent':
+        # Keyset paging needs non-null columns; customers who never bought sort nowhere
+        qs = qs.filter(last_purchase__isnull=False)
+    page = paginate(request, qs, ordering=CUSTOMER_SORTS[sort])
+    return render(request, 'pharmacy/customer_list.html', {
+        'customers': page.object_list, 'page': page, 'q': q, 'sort': sort,
+        'active': active, 'active_days': CUSTOMER_ACTIVE_DAYS,
+    })
 
 
 @login_required
@@ -240,10 +329,13 @@ def customer_delete(request, pk):
 # ─── Purchases ─────────────────────────────────────────────────────────────────
 @login_required
 def purchase_list(request):
-    qs = Purchase.objects.select_related('medicine', 'supplier').order_by('-purchase_date')
+    page  = paginate(request, Purchase.objects.select_related('medicine', 'supplier'))
+    stats = dashboard.get_stats()
     return render(request, 'pharmacy/purchase_list.html', {
-        'purchases': qs,
-        'total': qs.aggregate(t=Sum('total_price'))['t'] or 0,
+        'purchases': page.object_list,
+        'page': page,
+        'count': stats['total_purchases'],
+        'total': stats['purchase_total'],
     })
 
 
@@ -261,10 +353,12 @@ def purchase_add(request):
 def purchase_delete(request, pk):
     p = get_object_or_404(Purchase, pk=pk)
     if request.method == 'POST':
-        # Reverse the stock addition
-        Medicine.objects.filter(pk=p.medicine_id).update(stock=F('stock') - p.quantity)
-        p.delete()
-        messages.success(request, "Purchase record removed and stock adjusted.")
+        try:
+            p.delete()
+        except stock.InsufficientStock as exc:
+            messages.error(request, f"Purchase not removed – its units have already been sold. {exc}")
+        else:
+            messages.success(request, "Purchase record removed and stock adjusted.")
         return redirect('purchase_list')
     return render(request, 'pharmacy/confirm_delete.html', {
         'object': p, 'type': 'Purchase', 'cancel_url': reverse('purchase_list')
@@ -274,10 +368,13 @@ def purchase_delete(request, pk):
 # ─── Sales ─────────────────────────────────────────────────────────────────────
 @login_required
 def sale_list(request):
-    qs = Sale.objects.select_related('medicine', 'customer').order_by('-sale_date')
+    page  = paginate(request, Sale.objects.select_related('medicine', 'customer'))
+    stats = dashboard.get_stats()
     return render(request, 'pharmacy/sale_list.html', {
-        'sales': qs,
-        'total': qs.aggregate(t=Sum('total_price'))['t'] or 0,
+        'sales': page.object_list,
+        'page': page,
+        'count': stats['total_sales'],
+        'total': stats['revenue_total'],
     })
 
 
@@ -285,17 +382,103 @@ def sale_list(request):
 def sale_add(request):
     form = SaleForm(request.POST or None)
     if request.method == 'POST' and form.is_valid():
-        s = form.save()
-        messages.success(request, f"Sale recorded: {s.quantity} × {s.medicine}")
-        return redirect('sale_list')
+        try:
+            s = form.save()
+        except stock.InsufficientStock as exc:
+            form.add_error(None, str(exc))
+        else:
+            messages.success(request, f"Sale recorded: {s.quantity} × {s.medicine}")
+            return redirect('sale_list')
     return render(request, 'pharmacy/sale_form.html', {'form': form, 'title': 'Record Sale', 'action': 'Record'})
 
 
+@login_required
+def sale_checkout(request):
+    """Multi-line sale: HTML basket form, or JSON ``{customer, invoice_date, notes, lines: [{medicine, quantity}]}``."""
+    if request.method == 'POST' and request.content_type == 'application/json':
+        return _checkout_json(request)
+
+    form  = CheckoutForm(request.POST or None)
+    lines = list(zip(request.POST.getlist('medicine'), request.POST.getlist('quantity')))
+    if request.method == 'POST' and form.is_valid():
+        try:
+            invoice = checkout.checkout(
+                lines, customer=form.cleaned_data['customer'],
+                invoice_date=form.cleaned_data['invoice_date'], notes=form.cleaned_data['notes'],
+            )
+        except ValueError:
+            form.add_error(None, 'Every line needs a medicine and a whole-number quantity.')
+        except checkout.CheckoutError as exc:
+            for error in exc.errors:
+                form.add_error(None, error)
+        else:
+            messages.success(request, f"Invoice #{invoice.pk} recorded – Rs {invoice.total_price}")
+            return redirect('sale_list')
+
+    # Re-show the posted basket (one query for all its medicines)
+    ids = [m for m, _ in lines if m.isdigit()]
+    meds = Medicine.objects.only('id', 'name', 'price').in_bulk(ids)
+    basket = [
+        {'medicine': meds[int(m)], 'quantity': q}
+        for m, q in lines if m.isdigit() and int(m) in meds
+    ]
+    return render(request, 'pharmacy/checkout.html', {'form': form, 'basket': basket, 'title': 'New Invoice'})
+
+
+def _checkout_json(request):
+    try:
+        data  = json.loads(request.body)
+        lines = [(line['medicine'], line['quantity']) for line in data.get('lines', [])]
+        customer = Customer.objects.get(pk=data['customer']) if data.get('customer') else None
+        invoice = checkout.checkout(
+            lines, customer=customer,
+            invoice_date=parse_date(data['invoice_date']) if data.get('invoice_date') else None,
+            notes=data.get('notes', ''),
+        )
+    except checkout.CheckoutError as exc:
+        return JsonResponse({'errors': exc.errors}, status=400)
+    except (ValueError, KeyError, TypeError, AttributeError, Customer.DoesNotExist):
+        return JsonResponse({'errors': ['Malformed checkout request.']}, status=400)
+    return JsonResponse({
+        'invoice': invoice.pk,
+        'total_price': str(invoice.total_price),
+        'lines': [
+            {'sale': pk, 'medicine': med, 'quantity': qty, 'total_price': str(total)}
+            for pk, med, qty, total in invoice.lines.values_list('pk', 'medicine_id', 'quantity', 'total_price')
+        ],
+    }, status=201)
+
+
+# A fixed number of queries per batch of up to pos.MAX_BATCH sales (SQLite splits the bulk inserts)
+@instrumentation.query_budget(60)
+@login_required
+def pos_sync(request):
+    """
+    Offline sales replayed by a POS terminal: POST JSON ``{terminal, sales:
+    [{key, medicine, quantity, total_price?, sale_date?, customer?, notes?}]}``.
+    Safe to retry – sales whose key was already recorded come back as duplicates.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'errors': ['POST a JSON batch of sales.']}, status=405)
+    try:
+        data  = json.loads(request.body)
+        items = data['sales']
+        if not isinstance(items, list):
+            raise TypeError
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'errors': ['Malformed sync request.']}, status=400)
+    if len(items) > pos.MAX_BATCH:
+        return JsonResponse({'errors': [f'At most {pos.MAX_BATCH} sales per batch.']}, status=400)
+    terminal = str(data.get('terminal') or '').strip()
+    results  = pos.ingest(items, reference=f"POS sync {terminal}".strip()[:100])
+    summary  = {status: sum(r['status'] == status for r in results) for status in ('created', 'duplicate', 'rejected')}
+    return JsonResponse({**summary, 'results': results})
+
+
 @login_required
 def sale_delete(request, pk):
     s = get_object_or_404(Sale, pk=pk)
     if request.method == 'POST':
-        Medicine.objects.filter(pk=s.medicine_id).update(stock=F('stock') + s.quantity)
         s.delete()
         messages.success(request, "Sale record removed and stock restored.")
         return redirect('sale_list')
@@ -304,6 +487,270 @@ def sale_delete(request, pk):
     })
 
 
+# ─── Reports ───────────────────────────────────────────────────────────────────
+REPORT_DEFAULT_DAYS = {'day': 90, 'week': 26 * 7, 'month': 365}
+
+
+@login_required
+def reports(request):
+    """Revenue over time, top sellers and category mix, all read from DailyRollup."""
+    period = request.GET.get('period', 'day')
+    if period not in rollups.PERIODS:
+        period = 'day'
+    try:
+        end   = parse_date(request.GET.get('end', '')) or timezone.now().date()
+        start = parse_date(request.GET.get('start', '')) or end - timedelta(days=REPORT_DEFAULT_DAYS[period])
+    except ValueError:
+        return HttpResponseBadRequest('Invalid date.')
+
+    series = rollups.revenue_by_period(start, end, period)
+    peak   = max((row['total_revenue'] for row in series), default=0)
+    for row in series:
+        row['bar'] = round(row['total_revenue'] * 100 / peak) if peak else 0
+    summary = rollups.totals(start, end).aggregate(
+        revenue=Sum('revenue'), cost=Sum('cost'), units=Sum('sold_qty'), sales=Sum('sales_count'),
+    )
+    categories = dict(Medicine.CATEGORY_CHOICES)
+    mix = rollups.category_mix(start, end)
+    for row in mix:
+        row['label'] = categories.get(row['category'], row['category'])
+    return render(request, 'pharmacy/reports.html', {
+        'period': period, 'periods': list(rollups.PERIODS), 'start': start, 'end': end,
+        'series': series, 'summary': summary,
+        'top_sellers': rollups.top_sellers(start, end),
+        'category_mix': mix,
+    })
+
+
+# ─── Reordering ────────────────────────────────────────────────────────────────
+@login_required
+def reorder_list(request):
+    """Draft and placed purchase orders; POST regenerates the drafts."""
+    if request.method == 'POST':
+        orders = reorder.draft_orders()
+        messages.success(request, f"{len(orders)} draft order{'s' if len(orders) != 1 else ''} generated.")
+        return redirect('reorder_list')
+    orders = (
+        PurchaseOrder.objects.filter(status__in=[PurchaseOrder.DRAFT, PurchaseOrder.ORDERED])
+        .select_related('supplier')
+        .prefetch_related(Prefetch('lines', queryset=PurchaseOrderLine.objects.select_related('medicine').order_by('medicine__name')))
+        .order_by('status', 'supplier__name', 'pk')
+    )
+    return render(request, 'pharmacy/reorder.html', {
+        'orders': orders,
+        'low_count': Medicine.objects.filter(stock__gte=1, stock__lte=F('reorder_point')).count(),
+        'out_count': Medicine.objects.filter(stock=0).count(),
+    })
+
+
+@login_required
+def order_update(request, pk):
+    """Place, receive or cancel a purchase order (POST ``action``)."""
+    actions = {'place': reorder.place_order, 'receive': reorder.receive_order, 'cancel': reorder.cancel_order}
+    action  = request.POST.get('action')
+    if request.method == 'POST' and action in actions:
+        get_object_or_404(PurchaseOrder, pk=pk)
+        try:
+            order = actions[action](pk)
+        except reorder.OrderStateError as exc:
+            messages.error(request, str(exc))
+        else:
+            messages.success(request, f"{order} updated.")
+    return redirect('reorder_list')
+
+
+# ─── Stocktakes ────────────────────────────────────────────────────────────────
+@login_required
+def stocktake_list(request):
+    """Stocktakes, newest first; POST starts a new one."""
+    form = StocktakeForm(request.POST or None)
+    if request.method == 'POST' and form.is_valid():
+        new = form.save()
+        messages.success(request, f"{new} started.")
+        return redirect('stocktake_detail', pk=new.pk)
+    page = paginate(request, Stocktake.objects.annotate(counted=Count('counts')))
+    return render(request, 'pharmacy/stocktake_list.html', {'form': form, 'stocktakes': page.object_list, 'page': page})
+
+
+# Bulk counts and apply run a fixed number of queries per stocktake.CHUNK_SIZE medicines
+@instrumentation.query_budget(250)
+@login_required
+def stocktake_detail(request, pk):
+    """Enter or upload counts (POST) and review them against system stock."""
+    take   = get_object_or_404(Stocktake, pk=pk)
+    form   = StocktakeCountForm(request.POST or None, request.FILES or None)
+    result = None
+    if request.method == 'POST' and form.is_valid():
+        upload = form.cleaned_data['file']
+        try:
+            rows = stocktake.read_upload(upload.file, upload.name) if upload else \
+                stocktake.parse_lines(form.cleaned_data['counts'])
+            result = stocktake.record(take.pk, rows)
+        except (ValueError, stocktake.StocktakeError) as exc:
+            form.add_error(None, str(exc))
+        else:
+            level = messages.success if not result.skipped else messages.warning
+            level(request, f"{result.created} counted, {result.updated} recounted, {result.skipped} skipped.")
+            if not result.skipped:
+                return redirect('stocktake_detail', pk=take.pk)
+
+    show = request.GET.get('show', '')
+    if show == 'uncounted':
+        rows = stocktake.uncounted(take)
+    else:
+        show = show if show == 'all' else 'variance'
+        rows = stocktake.lines(take, variance_only=show == 'variance')
+    page     = paginate(request, rows)
+    summary  = stocktake.summary(take)
+    in_scope = take.medicines().count()
+    return render(request, 'pharmacy/stocktake_detail.html', {
+        'stocktake': take, 'form': form, 'result': result, 'show': show, 'summary': summary,
+        'in_scope': in_scope, 'uncounted': max(in_scope - summary['counted'], 0),
+        'rows': page.object_list, 'page': page,
+    })
+
+
+@instrumentation.query_budget(250)
+@login_required
+def stocktake_update(request, pk):
+    """Apply or cancel a stocktake (POST ``action``)."""
+    actions = {'apply': stocktake.apply, 'cancel': stocktake.cancel}
+    action  = request.POST.get('action')
+    if request.method == 'POST' and action in actions:
+        get_object_or_404(Stocktake, pk=pk)
+        try:
+            take = actions[action](pk)
+        except stocktake.StocktakeError as exc:
+            messages.error(request, str(exc))
+        else:
+            if take.status == Stocktake.APPLIED:
+                messages.success(request, f"{take} applied: {take.adjusted} medicine{'s' if take.adjusted != 1 else ''} adjusted.")
+            else:
+                messages.info(request, f"{take} cancelled.")
+    return redirect('stocktake_detail', pk=pk)
+
+
+# ─── Bulk import ───────────────────────────────────────────────────────────────
+@login_required
+def data_import(request):
+    form   = ImportForm(request.POST or None, request.FILES or None)
+    result = None
+    if request.method == 'POST' and form.is_valid():
+        upload = form.cleaned_data['file']
+        try:
+            result = importers.import_file(form.cleaned_data['kind'], upload.file, upload.name)
+        except ValueError as exc:
+            form.add_error('file', str(exc))
+        else:
+            level = messages.success if not result.skipped else messages.warning
+            level(request, f"Import finished: {result.created} created, {result.updated} updated, {result.skipped} skipped.")
+    return render(request, 'pharmacy/import.html', {'form': form, 'result': result})
+
+
+# ─── Exports ───────────────────────────────────────────────────────────────────
+@login_required
+def data_export(request, kind):
+    if kind not in exports.EXPORTS:
+        raise Http404
+    try:
+        start = parse_date(request.GET.get('start', ''))
+        end   = parse_date(request.GET.get('end', ''))
+    except ValueError:
+        return HttpResponseBadRequest('Invalid date.')
+    category = request.GET.get('category') or None
+    compress = request.GET.get('gzip') == '1'
+    try:
+        rows = exports.export_rows(kind, start, end, category)
+    except exports.ArchivedToFile as exc:
+        return HttpResponseBadRequest(str(exc))
+
+    response = StreamingHttpResponse(
+        exports.csv_stream(rows, compress=compress),
+        content_type='application/gzip' if compress else 'text/csv',
+    )
+    response['Content-Disposition'] = f'attachment; filename="{exports.filename(kind, start, end, compress)}"'
+    return response
+
+
+# ─── JSON API ──────────────────────────────────────────────────────────────────
+@login_required
+def api_list(request, kind):
+    """Read-only JSON list with field selection, ``?since=`` deltas and conditional GET."""
+    if kind not in api.RESOURCES:
+        raise Http404
+    resource = api.RESOURCES[kind]
+    try:
+        names = api.select_fields(resource, request.GET.get('fields', ''))
+        since = api.parse_since(request.GET.get('since', ''))
+    except api.InvalidQuery as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    return _api_page(
+        request, kind, resource.validators(),
+        lambda cursor, per_page: api.page(kind, names, since, cursor, per_page),
+    )
+
+
+@login_required
+def api_deleted(request, kind):
+    """Ids removed from an API resource (deleted or archived), with ``?since=`` deltas and conditional GET."""
+    if kind not in api.RESOURCES:
+        raise Http404
+    try:
+        since = api.parse_since(request.GET.get('since', ''))
+    except api.InvalidQuery as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    return _api_page(
+        request, f'{kind}/deleted', api.RESOURCES[kind].removal_validators(),
+        lambda cursor, per_page: api.removals(kind, since, cursor, per_page),
+    )
+
+
+def _api_page(request, kind, validators, get_page):
+    """304 if the client's validators still match, else the page ``get_page(cursor, per_page)`` as JSON."""
+    etag = api.etag(kind, validators, request.GET.urlencode())
+    last_modified = int(validators[0].timestamp()) if validators[0] else None
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        per_page = request.GET.get('per_page', '')
+        page = get_page(request.GET.get('cursor'), per_page if per_page.isdigit() else None)
+        params = request.GET.copy()
+        if page.has_next:
+            params['cursor'] = page.next_cursor
+        response = JsonResponse({
+            'results': page.rows,
+            'next': request.build_absolute_uri(f'?{params.urlencode()}') if page.has_next else None,
+        })
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+# ─── Search ────────────────────────────────────────────────────────────────────
+@login_required
+def autocomplete(request):
+    kind  = request.GET.get('type', 'medicine')
+    q     = request.GET.get('q', '').strip()
+    limit = request.GET.get('limit', '')
+    if kind not in search.AUTOCOMPLETE:
+        return JsonResponse({'error': f"Unknown type '{kind}'."}, status=400)
+    results = search.autocomplete(
+        kind, q, int(limit) if limit.isdigit() else search.AUTOCOMPLETE_LIMIT
+    )
+    return JsonResponse({'results': results})
+
+
+# ─── Metrics ───────────────────────────────────────────────────────────────────
+def metrics(request):
+    """Prometheus scrape target: bearer METRICS_TOKEN, or a signed-in staff user."""
+    token = settings.METRICS_TOKEN
+    auth  = request.headers.get('Authorization', '')
+    if not (token and constant_time_compare(auth, f'Bearer {token}')) and not request.user.is_staff:
+        return HttpResponse('Forbidden', status=403, content_type='text/plain')
+    return HttpResponse(instrumentation.render_metrics(), content_type='text/plain; version=0.0.4')
+
+
 # ─── Contact ───────────────────────────────────────────────────────────────────
 def contact(request):
     form = ContactForm(request.POST or None)
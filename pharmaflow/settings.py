@@ -1,5 +1,5 @@
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
 import dj_database_url
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -21,7 +21,9 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'pharmacy.instrumentation.InstrumentationMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'pharmacy.replicas.ReplicaMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -51,13 +53,27 @@ WSGI_APPLICATION = 'pharmaflow.wsgi.application'
 
 DATABASE_URL = config('DATABASE_URL', default=None)
 
+# Persistent connections are checked before reuse, so a connection the
+# server or a failover dropped is replaced instead of failing the request.
+# DB_POOL_SIZE > 0 switches PostgreSQL to Django's connection pool instead
+# (needs psycopg 3: `pip install "psycopg[binary,pool]"`).
+DB_CONN_MAX_AGE       = config('DB_CONN_MAX_AGE',       default=600,  cast=int)
+DB_CONN_HEALTH_CHECKS = config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool)
+DB_POOL_SIZE          = config('DB_POOL_SIZE',          default=0,    cast=int)
+
+
+def _database(url):
+    return dj_database_url.parse(
+        url,
+        conn_max_age=DB_CONN_MAX_AGE,
+        conn_health_checks=DB_CONN_HEALTH_CHECKS,
+        ssl_require=not url.startswith('sqlite'),
+    )
+
+
 if DATABASE_URL:
     DATABASES = {
-        'default': dj_database_url.parse(
-            DATABASE_URL,
-            conn_max_age=600,
-            ssl_require=True,
-        )
+        'default': _database(DATABASE_URL)
     }
 else:
     DATABASES = {
@@ -68,9 +84,93 @@ else:
             'PASSWORD': config('DB_PASSWORD', default='postgres'),
             'HOST':     config('DB_HOST',     default='localhost'),
             'PORT':     config('DB_PORT',     default='5000'),
+            'CONN_MAX_AGE':       DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': DB_CONN_HEALTH_CHECKS,
         }
     }
 
+# Read replicas (comma-separated URLs), used for the reads of read-only
+# requests and reports; see pharmacy/replicas.py. After a write the session
+# reads from the primary for REPLICA_STICKY_SECONDS.
+DATABASE_REPLICA_URLS = config('DATABASE_REPLICA_URLS', default='', cast=Csv())
+for _n, _url in enumerate(DATABASE_REPLICA_URLS, 1):
+    DATABASES[f'replica{_n}'] = dict(_database(_url), TEST={'MIRROR': 'default'})
+
+if DB_POOL_SIZE:
+    for _db in DATABASES.values():
+        if _db['ENGINE'] == 'django.db.backends.postgresql':
+            # The pool replaces persistent connections
+            _db['CONN_MAX_AGE'] = 0
+            _db.setdefault('OPTIONS', {})['pool'] = {'min_size': 1, 'max_size': DB_POOL_SIZE}
+
+DATABASE_ROUTERS       = ['pharmacy.replicas.ReplicaRouter']
+REPLICA_STICKY_SECONDS = config('REPLICA_STICKY_SECONDS', default=15, cast=int)
+
+CACHES = {
+    'default': {
+        'BACKEND':  config('CACHE_BACKEND',  default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='pharmaflow'),
+    },
+    # Kept apart so fragment churn never evicts sessions
+    'sessions': {
+        'BACKEND':  config('SESSION_CACHE_BACKEND',  default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('SESSION_CACHE_LOCATION', default='pharmaflow-sessions'),
+    },
+}
+
+# Sessions and the signed-in user are read from the cache, so a request
+# does not query django_session or auth_user. Cache copies live at most
+# SESSION_CACHE_TIMEOUT / USER_CACHE_TIMEOUT seconds; writes always reach
+# the database. Purge expired sessions nightly with `manage.py purge_sessions`.
+SESSION_ENGINE          = 'pharmacy.sessions'
+SESSION_CACHE_ALIAS     = 'sessions'
+SESSION_CACHE_TIMEOUT   = config('SESSION_CACHE_TIMEOUT', default=60, cast=int)
+AUTHENTICATION_BACKENDS = ['pharmacy.auth.CachedModelBackend']
+USER_CACHE_TIMEOUT      = config('USER_CACHE_TIMEOUT',    default=60, cast=int)
+
+# Seconds the home dashboard counters stay cached (writes invalidate sooner).
+DASHBOARD_CACHE_TIMEOUT = config('DASHBOARD_CACHE_TIMEOUT', default=300, cast=int)
+
+# Seconds cached template fragments (medicine list rows, dashboard alert
+# panels) are kept; writes move them to a new version sooner.
+FRAGMENT_CACHE_TIMEOUT = config('FRAGMENT_CACHE_TIMEOUT', default=3600, cast=int)
+
+# "Expiring within N days" windows on the dashboard and medicine list filter;
+# counts come from the nightly `manage.py snapshot_expiry`.
+EXPIRY_HORIZONS = config('EXPIRY_HORIZONS', default='30,60,90', cast=Csv(int))
+
+# Reorder engine (`manage.py reorder`): demand history, target service level,
+# lead time for suppliers without received orders, and days of demand each
+# order should cover beyond its lead time.
+REORDER_HISTORY_DAYS      = config('REORDER_HISTORY_DAYS',      default=90,   cast=int)
+REORDER_SERVICE_LEVEL     = config('REORDER_SERVICE_LEVEL',     default=0.95, cast=float)
+REORDER_DEFAULT_LEAD_DAYS = config('REORDER_DEFAULT_LEAD_DAYS', default=7,    cast=int)
+REORDER_REVIEW_DAYS       = config('REORDER_REVIEW_DAYS',       default=14,   cast=int)
+
+# Months before the current one kept in the hot Sale / Purchase tables;
+# `manage.py archive_history` moves older ones to the archive.
+ARCHIVE_KEEP_MONTHS = config('ARCHIVE_KEEP_MONTHS', default=12, cast=int)
+
+# Admin changelists for the big tables (sales, purchases, ledger): seconds
+# a filtered row count is cached, and months offered by the month filter.
+ADMIN_COUNT_CACHE_TIMEOUT = config('ADMIN_COUNT_CACHE_TIMEOUT', default=60, cast=int)
+ADMIN_RECENT_MONTHS       = config('ADMIN_RECENT_MONTHS',       default=12, cast=int)
+
+# Live dashboard (/dashboard/events/, served by pharmaflow/asgi.py): events
+# kept for reconnecting streams, and seconds between counter refreshes that
+# also keep idle connections open.
+LIVE_EVENTS_BUFFER    = config('LIVE_EVENTS_BUFFER',    default=500, cast=int)
+LIVE_EVENTS_HEARTBEAT = config('LIVE_EVENTS_HEARTBEAT', default=15,  cast=int)
+
+# Keyset pagination for list views (?per_page= is capped at MAX_PAGE_SIZE).
+PAGE_SIZE     = config('PAGE_SIZE',     default=50,  cast=int)
+MAX_PAGE_SIZE = config('MAX_PAGE_SIZE', default=200, cast=int)
+
+# Per-request query/timing instrumentation, exported on /metrics/.
+INSTRUMENTATION = config('INSTRUMENTATION', default=True, cast=bool)
+QUERY_BUDGET    = config('QUERY_BUDGET',    default=30,   cast=int)   # 0 disables the check
+METRICS_TOKEN   = config('METRICS_TOKEN',   default='')               # Bearer token for scrapers; staff only if unset
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},